@@ -1,23 +1,272 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
+from PIL import Image
 import numpy as np
 import os
+import sys
+import threading
 from pathlib import Path
 
+# base_en_ligne.py, arbre_kd.py et sources_images.py se trouvent à la racine du dépôt
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
 
-class ImageSearchEngine:
+from base_en_ligne import ArbreEnLigne, IndexEnLigne  # noqa: E402
+from sources_images import lire_manifeste  # noqa: E402
+
+# tkinter n'est importé qu'à la création de l'interface (voir importer_interface) :
+# LocalStatsEngine reste utilisable sans affichage
+tk = filedialog = messagebox = ImageTk = None
+
+# Utiliser automatiquement le dossier "images" du projet
+IMAGE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp", ".gif"]
+
+
+def importer_interface():
+    global tk, filedialog, messagebox, ImageTk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from PIL import ImageTk
+
+
+class LocalStatsEngine:
+    """Calculs du moteur (descripteur, indexation, recherche), sans interface"""
+
+    def __init__(self, image_folder=IMAGE_FOLDER, block_size=8):
+        self.image_folder = image_folder
+        self.database_descriptors = {}  # {chemin: descripteur}
+        self.block_size = block_size  # Taille du bloc N×N
+        # Arbre k-d des descripteurs, construit à la demande (voir search_tree)
+        self._tree = None
+        self._tree_base = None
+        self._lock = threading.RLock()  # add_image, remove_image... et compactage
+
+    def convert_to_grayscale(self, image_path):
+
+        img = Image.open(image_path).convert("L")  # 'L' = niveaux de gris
+        return np.array(img)
+
+    def compute_local_descriptor(self, image_array):
+        """
+        calculer le descripteur de texture basé sur la moyenne et l'ecart type local
+
+        Étapes:
+        1 Diviser l'image en blocs N×N
+        2 Pour chaque bloc, calculer la moyenne (μ)
+        3 Pour chaque bloc, calculer l'écart-type (σ)
+        4 Concaténer tous les (μ, σ) pour former le descripteur
+        """
+        N = self.block_size
+        height, width = image_array.shape
+
+        # Redimensionner pour avoir des blocs complets
+        new_height = (height // N) * N
+        new_width = (width // N) * N
+        image_array = image_array[:new_height, :new_width]
+
+        means = []
+        stds = []
+
+        # Parcourir l'image bloc par bloc
+        for i in range(0, new_height, N):
+            for j in range(0, new_width, N):
+                #! Extraire le bloc
+                block = image_array[i : i + N, j : j + N]
+
+                #! 2- Calculer la moyenne locale (μ)
+                mu = np.mean(block)
+
+                #!  3- Calculer l'écart-type local (σ)
+                sigma = np.std(block)
+
+                means.append(mu)
+                stds.append(sigma)
+
+        #!  4- Construire le descripteur
+        #  les statistiques globales des moyennes et écarts-types
+        descriptor = np.array(
+            [
+                np.mean(means),  # Moyenne des moyennes
+                np.std(means),  # Écart-type des moyennes
+                np.mean(stds),  # Moyenne des écarts-types
+                np.std(stds),  # Écart-type des écarts-types
+            ]
+        )
+        return descriptor
+
+    def index_folder(self, folder=None):
+        """
+        Calcule le descripteur de chaque image du dossier
+
+        Les copies d'une même image (même SHA-1 dans le manifeste de
+        normalisation du dossier, voir sources_images.lire_manifeste)
+        reprennent le descripteur de la première sans être relues.
+
+        Returns:
+            int: Nombre d'images indexées
+        """
+        folder = folder or self.image_folder
+        self.database_descriptors = {}
+        manifest = lire_manifeste(folder)
+        by_hash = {}  # {sha1: descripteur}
+
+        for filename in os.listdir(folder):
+            filepath = os.path.join(folder, filename)
+            if os.path.isfile(filepath) and Path(filename).suffix.lower() in EXTENSIONS:
+                sha1 = manifest.get(filename, {}).get("sha1")
+                if sha1 in by_hash:
+                    self.database_descriptors[filepath] = by_hash[sha1]
+                    continue
+                try:
+                    # Convertir en niveaux de gris
+                    gray_image = self.convert_to_grayscale(filepath)
+                    # Calculer le descripteur
+                    descriptor = self.compute_local_descriptor(gray_image)
+                    self.database_descriptors[filepath] = descriptor
+                    if sha1 is not None:
+                        by_hash[sha1] = descriptor
+                except Exception as e:
+                    print(f"Erreur avec {filename}: {e}")
+
+        return len(self.database_descriptors)
+
+    def add_image(self, source, image_id=None):
+        """
+        Indexe une image de plus (ou remplace celle de même identifiant),
+        sans reconstruire l'arbre (tampon d'insertion)
+
+        Args:
+            source: Chemin de l'image, ou image déjà chargée (tableau numpy)
+            image_id: Identifiant dans la base (le chemin par défaut,
+                obligatoire pour un tableau)
+
+        Returns:
+            bool: True si l'image a été indexée
+        """
+        if isinstance(source, np.ndarray) and image_id is None:
+            raise ValueError("image_id obligatoire pour une image en mémoire")
+        image_id = source if image_id is None else image_id
+        try:
+            if isinstance(source, np.ndarray):
+                gray_image = source if source.ndim == 2 else np.array(Image.fromarray(source).convert("L"))
+            else:
+                gray_image = self.convert_to_grayscale(source)
+            descriptor = self.compute_local_descriptor(gray_image)
+        except Exception as e:
+            print(f"Erreur avec {image_id}: {e}")
+            return False
+
+        with self._lock:
+            tree = self._current_tree()
+            self.database_descriptors[image_id] = descriptor
+            if tree is not None:
+                tree.ajouter(image_id, descriptor)
+        return True
+
+    def remove_image(self, image_id):
+        """
+        Retire une image de la base (ignorée par l'arbre jusqu'au compactage)
+
+        Returns:
+            bool: True si l'image était indexée
+        """
+        with self._lock:
+            tree = self._current_tree()
+            if self.database_descriptors.pop(image_id, None) is None:
+                return False
+            if tree is not None:
+                tree.supprimer(image_id)
+        return True
+
+    def update_image(self, image_id, source=None):
+        """Recalcule le descripteur d'une image (relue depuis image_id par défaut)"""
+        if image_id not in self.database_descriptors:
+            raise KeyError(image_id)
+        return self.add_image(image_id if source is None else source, image_id)
+
+    def compact(self, wait=True):
+        """Intègre le tampon à l'arbre et retire les images supprimées (en arrière-plan si wait=False)"""
+        tree = self._current_tree()
+        if tree is not None:
+            tree.compacter(wait)
+
+    def _current_tree(self):
+        """Arbre construit pour la base actuelle, ou None (à reconstruire)"""
+        if (
+            self._tree is None
+            or self._tree_base is not self.database_descriptors
+            or len(self._tree) != len(self.database_descriptors)
+        ):
+            return None
+        return self._tree
+
+    def search_tree(self):
+        """
+        Arbre k-d des descripteurs de la base (ArbreEnLigne, clés = chemins),
+        tenu à jour par add_image / remove_image, reconstruit si la base a changé
+        """
+        with self._lock:
+            if self._current_tree() is None:
+                points = np.array(list(self.database_descriptors.values())).reshape(-1, 4)
+                self._tree = IndexEnLigne(
+                    ArbreEnLigne(list(self.database_descriptors), points, dimension=4), self._lock
+                )
+                self._tree_base = self.database_descriptors
+            return self._tree.structure
+
+    def euclidean_distance(self, desc1, desc2):
+        """Calculer la distance euclidienne entre deux descripteurs"""
+        return np.sqrt(np.sum((desc1 - desc2) ** 2))
+
+    def search(self, query_image_path, top_k=10):
+        """
+        Returns:
+            list: Liste de tuples (chemin, distance), les plus similaires en premier
+        """
+        # Calculer le descripteur de l'image requête
+        query_gray = self.convert_to_grayscale(query_image_path)
+        query_descriptor = self.compute_local_descriptor(query_gray)
+        return self.search_descriptor(query_descriptor, top_k)
+
+    def search_descriptor(self, query_descriptor, top_k=10):
+        """
+        Les top_k descripteurs les plus proches (exact, arbre k-d au lieu
+        de comparer toutes les images de la base)
+        """
+        tree = self.search_tree()
+        distances, ids = tree.plus_proches(query_descriptor, top_k)
+        return [(tree.cles[i], float(d)) for i, d in zip(ids, distances)]
+
+    def search_radius(self, query_image_path, radius):
+        """Toutes les images à une distance <= radius, les plus proches en premier"""
+        query_descriptor = self.compute_local_descriptor(self.convert_to_grayscale(query_image_path))
+        tree = self.search_tree()
+        distances, ids = tree.dans_rayon(query_descriptor, radius)
+        return [(tree.cles[i], float(d)) for i, d in zip(ids, distances)]
+
+    def search_batch(self, query_image_paths, top_k=10):
+        """search() pour plusieurs images requêtes : une liste de résultats par requête"""
+        queries = np.array(
+            [self.compute_local_descriptor(self.convert_to_grayscale(p)) for p in query_image_paths]
+        ).reshape(-1, 4)
+        tree = self.search_tree()
+        distances, ids = tree.plus_proches(queries, top_k)
+        return [
+            [(tree.cles[i], float(d)) for i, d in zip(ligne_ids, ligne) if i >= 0]
+            for ligne, ligne_ids in zip(distances, ids)
+        ]
+
+
+class ImageSearchEngine(LocalStatsEngine):
     def __init__(self, root):
+        importer_interface()
+        super().__init__()
         self.root = root
         self.root.title("Moteur de Recherche d'Images - Moyenne & Écart-type Local")
         self.root.geometry("1000x700")
 
         # Variables
-        # Utiliser automatiquement le dossier "images" du projet
-        self.image_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
         self.query_image_path = ""
-        self.database_descriptors = {}  # {chemin: descripteur}
-        self.block_size = 8  # Taille du bloc N×N
 
         self.setup_ui()
 
@@ -119,88 +368,17 @@ class ImageSearchEngine:
         self.query_image_label.config(image=photo, text="")
         self.query_image_label.image = photo
 
-    def convert_to_grayscale(self, image_path):
-
-        img = Image.open(image_path).convert("L")  # 'L' = niveaux de gris
-        return np.array(img)
-
-    def compute_local_descriptor(self, image_array):
-        """
-        calculer le descripteur de texture basé sur la moyenne et l'ecart type local
-
-        Étapes:
-        1 Diviser l'image en blocs N×N
-        2 Pour chaque bloc, calculer la moyenne (μ)
-        3 Pour chaque bloc, calculer l'écart-type (σ)
-        4 Concaténer tous les (μ, σ) pour former le descripteur
-        """
-        N = self.block_size
-        height, width = image_array.shape
-
-        # Redimensionner pour avoir des blocs complets
-        new_height = (height // N) * N
-        new_width = (width // N) * N
-        image_array = image_array[:new_height, :new_width]
-
-        means = []
-        stds = []
-
-        # Parcourir l'image bloc par bloc
-        for i in range(0, new_height, N):
-            for j in range(0, new_width, N):
-                #! Extraire le bloc
-                block = image_array[i : i + N, j : j + N]
-
-                #! 2- Calculer la moyenne locale (μ)
-                mu = np.mean(block)
-
-                #!  3- Calculer l'écart-type local (σ)
-                sigma = np.std(block)
-
-                means.append(mu)
-                stds.append(sigma)
-
-        #!  4- Construire le descripteur
-        #  les statistiques globales des moyennes et écarts-types
-        descriptor = np.array(
-            [
-                np.mean(means),  # Moyenne des moyennes
-                np.std(means),  # Écart-type des moyennes
-                np.mean(stds),  # Moyenne des écarts-types
-                np.std(stds),  # Écart-type des écarts-types
-            ]
-        )
-        return descriptor
-
     def index_images(self):
         if not os.path.exists(self.image_folder):
             messagebox.showerror("Erreur", f"Le dossier '{self.image_folder}' n'existe pas!")
             return
 
-        self.database_descriptors = {}
-        extensions = [".jpg", ".jpeg", ".png", ".bmp", ".gif"]
-
-        for filename in os.listdir(self.image_folder):
-            filepath = os.path.join(self.image_folder, filename)
-            if os.path.isfile(filepath) and Path(filename).suffix.lower() in extensions:
-                try:
-                    # Convertir en niveaux de gris
-                    gray_image = self.convert_to_grayscale(filepath)
-                    # Calculer le descripteur
-                    descriptor = self.compute_local_descriptor(gray_image)
-                    self.database_descriptors[filepath] = descriptor
-                except Exception as e:
-                    print(f"Erreur avec {filename}: {e}")
+        self.index_folder()
 
         messagebox.showinfo(
             "Indexation", f"{len(self.database_descriptors)} images indexées!"
         )
 
-    def euclidean_distance(self, desc1, desc2):
-        """Calculer la distance euclidienne entre deux descripteurs"""
-        return np.sqrt(np.sum((desc1 - desc2) ** 2))
-
-
     def search_similar_images(self):
         """Rechercher les images similaires à l'image requête"""
         if not self.query_image_path:
@@ -215,21 +393,8 @@ class ImageSearchEngine:
             )
             return
 
-        # Calculer le descripteur de l'image requête
-        query_gray = self.convert_to_grayscale(self.query_image_path)
-        query_descriptor = self.compute_local_descriptor(query_gray)
-
-        # Calculer les distances avec toutes les images de la base
-        distances = []
-        for filepath, descriptor in self.database_descriptors.items():
-            dist = self.euclidean_distance(query_descriptor, descriptor)
-            distances.append((filepath, dist))
-
-        # Trier par distance (les plus similaires en premier)
-        distances.sort(key=lambda x: x[1])
-
         # Afficher les résultats
-        self.display_results(distances[:10])  # Top 10 résultats
+        self.display_results(self.search(self.query_image_path, top_k=10))  # Top 10 résultats
 
     def display_results(self, results):
         # Effacer les anciens résultats
@@ -270,6 +435,7 @@ class ImageSearchEngine:
 
 
 if __name__ == "__main__":
+    importer_interface()
     root = tk.Tk()
     app = ImageSearchEngine(root)
     root.mainloop()
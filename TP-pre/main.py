@@ -1,17 +1,41 @@
-import pywt
 import cv2
-import matplotlib.pyplot as plt
 import numpy as np
 import os
-from matplotlib.widgets import Button
+import sys
+import threading
 from pathlib import Path
 
+# instrumentation.py et base_en_ligne.py se trouvent à la racine du dépôt
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from base_en_ligne import ArbreEnLigne, IndexEnLigne  # noqa: E402
+from instrumentation import profiler  # noqa: E402
+
+# pywt et matplotlib sont importés à la première utilisation (démarrage rapide,
+# pas d'affichage nécessaire pour indexer ou rechercher)
+
 class TextureSearchEngine:
-    def __init__(self, dataset_folder='dataset'):
+    def __init__(self, dataset_folder='dataset', auto_load=True):
         self.dataset_folder = dataset_folder
         self.image_paths = []
         self.features_db = []
-        self.load_dataset()
+        # Arbre k-d de features_db, construit à la demande (voir search_tree) ;
+        # add_image / remove_image le modifient, features_db et image_paths
+        # sont mis à jour au compactage
+        self._tree = None
+        self._tree_base = None
+        self._lock = threading.RLock()
+        # Sans effet si le profilage est désactivé (voir instrumentation.py)
+        profiler.instrument(
+            self,
+            extract_texture_features="extraction",
+            build_features_database="indexation",
+            search="recherche",
+        )
+        if auto_load:
+            self.load_dataset()
         
     def load_dataset(self):
         """Charger toutes les images du dossier dataset"""
@@ -27,52 +51,70 @@ class TextureSearchEngine:
         print(f"✓ {len(self.image_paths)} images chargées depuis {self.dataset_folder}")
         
     def extract_texture_features(self, image_path):
-        """Extraire les caractéristiques de texture avec wavedec2"""
-        # Charger l'image en niveaux de gris
-        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        if image is None:
-            return None
+        """Extraire les caractéristiques de texture avec wavedec2 (chemin ou image déjà chargée)"""
+        import pywt
+
+        if isinstance(image_path, np.ndarray):
+            image = image_path if image_path.ndim == 2 else cv2.cvtColor(image_path, cv2.COLOR_BGR2GRAY)
+        else:
+            # Charger l'image en niveaux de gris
+            with profiler.stage("charger_image"):
+                image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                profiler.count("echecs_decodage")
+                return None
+            profiler.count("images_decodees")
+            profiler.count("octets_decodes", image.nbytes)
+            profiler.track_array("image", image)
         
         # Redimensionner pour uniformiser
-        image = cv2.resize(image, (256, 256))
+        with profiler.stage("redimensionnement"):
+            image = cv2.resize(image, (256, 256))
         
         # Décomposition en ondelettes à 3 niveaux
-        coeffs = pywt.wavedec2(image, 'haar', level=3)
+        with profiler.stage("wavedec2"):
+            coeffs = pywt.wavedec2(image, 'haar', level=3)
         
         # Extraire les statistiques de chaque sous-bande
-        features = []
-        
-        # Approximation (LL)
-        cA = coeffs[0]
-        features.extend([
-            np.mean(cA),
-            np.std(cA),
-            np.median(cA)
-        ])
-        
-        # Détails (LH, HL, HH) pour chaque niveau
-        for (cH, cV, cD) in coeffs[1:]:
-            for coeff in [cH, cV, cD]:
-                features.extend([
-                    np.mean(np.abs(coeff)),
-                    np.std(coeff),
-                    np.max(np.abs(coeff))
-                ])
-        
-        return np.array(features)
+        with profiler.stage("statistiques"):
+            features = []
+            
+            # Approximation (LL)
+            cA = coeffs[0]
+            features.extend([
+                np.mean(cA),
+                np.std(cA),
+                np.median(cA)
+            ])
+            
+            # Détails (LH, HL, HH) pour chaque niveau
+            for (cH, cV, cD) in coeffs[1:]:
+                for coeff in [cH, cV, cD]:
+                    features.extend([
+                        np.mean(np.abs(coeff)),
+                        np.std(coeff),
+                        np.max(np.abs(coeff))
+                    ])
+        
+        return profiler.track_array("descripteur", np.array(features))
     
     def build_features_database(self):
         """Construire la base de données de caractéristiques"""
         print("Construction de la base de données de caractéristiques...")
         self.features_db = []
+        valid_paths = []
         
         for i, img_path in enumerate(self.image_paths):
             features = self.extract_texture_features(img_path)
             if features is not None:
                 self.features_db.append(features)
+                valid_paths.append(img_path)
+                profiler.count("images_indexees")
             print(f"  Traitement: {i+1}/{len(self.image_paths)}", end='\r')
         
-        self.features_db = np.array(self.features_db)
+        # Garder image_paths aligné avec features_db (images illisibles ignorées)
+        self.image_paths = valid_paths
+        self.features_db = profiler.track_array("features_db", np.array(self.features_db))
         print(f"\n✓ Base de données construite avec {len(self.features_db)} images")
     
     def calculate_similarity(self, features1, features2):
@@ -83,6 +125,75 @@ class TextureSearchEngine:
         similarity = 1 / (1 + distance)
         return similarity
     
+    def add_image(self, image_path, image_id=None):
+        """
+        Ajouter une image à la base (ou remplacer celle de même chemin) sans
+        la reconstruire : tampon de l'arbre k-d, intégré à features_db au
+        compactage (image_id obligatoire pour une image déjà chargée)
+        """
+        if isinstance(image_path, np.ndarray) and image_id is None:
+            raise ValueError("image_id obligatoire pour une image en mémoire")
+        image_id = image_path if image_id is None else image_id
+        if len(self.features_db) == 0 and self.image_paths:
+            self.build_features_database()  # Images chargées mais pas encore indexées
+        features = self.extract_texture_features(image_path)
+        if features is None:
+            return False
+        
+        with self._lock:
+            if len(self.features_db) == 0:
+                self.image_paths = [image_id]
+                self.features_db = features[None, :]  # Arbre construit à la première recherche
+            else:
+                self._online_tree().ajouter(image_id, features)
+        profiler.count("images_indexees")
+        return True
+    
+    def remove_image(self, image_id):
+        """Retirer une image (ignorée par les recherches, retirée de features_db au compactage)"""
+        with self._lock:
+            if len(self.features_db) == 0:
+                return False
+            return self._online_tree().supprimer(image_id)
+    
+    def update_image(self, image_id, image_path=None):
+        """Recalculer les caractéristiques d'une image (relue depuis image_id par défaut)"""
+        with self._lock:
+            if len(self.features_db) == 0 or image_id not in self.search_tree():
+                raise KeyError(image_id)
+        return self.add_image(image_id if image_path is None else image_path, image_id)
+    
+    def compact(self, wait=True):
+        """Intégrer le tampon de l'arbre à features_db et retirer les images supprimées"""
+        if len(self.features_db):
+            self._online_tree().compacter(wait)
+    
+    def _after_compaction(self, tree):
+        # Appelé sous self._lock : features_db et image_paths = contenu de l'arbre
+        paths, features = tree.contenu()
+        self.image_paths = paths
+        self.features_db = features
+        self._tree_base = features
+    
+    def _online_tree(self):
+        with self._lock:
+            self.search_tree()
+            return self._tree
+    
+    def search_tree(self):
+        """Arbre k-d de features_db (ArbreEnLigne, clés = chemins), reconstruit si la base a été remplacée"""
+        with self._lock:
+            if self._tree is None or self._tree_base is not self.features_db:
+                with profiler.stage("arbre_kd"):
+                    features = np.asarray(self.features_db)
+                    self._tree = IndexEnLigne(
+                        ArbreEnLigne(self.image_paths, features.reshape(len(features), -1)),
+                        self._lock,
+                        apres_compaction=self._after_compaction,
+                    )
+                self._tree_base = self.features_db
+            return self._tree.structure
+    
     def search(self, query_image_path, top_k=5):
         """Rechercher les images les plus similaires"""
         # Extraire les caractéristiques de l'image requête
@@ -92,19 +203,48 @@ class TextureSearchEngine:
             print("Erreur lors du chargement de l'image requête")
             return []
         
-        # Calculer les similarités
-        similarities = []
-        for i, db_features in enumerate(self.features_db):
-            sim = self.calculate_similarity(query_features, db_features)
-            similarities.append((self.image_paths[i], sim))
-        
-        # Trier par similarité décroissante
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        
-        return similarities[:top_k]
+        return self.search_features(query_features, top_k)
+    
+    def search_features(self, query_features, top_k=5):
+        """
+        Les top_k images les plus similaires (exact : l'arbre k-d donne les
+        plus petites distances, donc les plus grandes similarités 1 / (1 + d))
+        """
+        if len(self.features_db) == 0:
+            return []
+        tree = self.search_tree()
+        with profiler.stage("score"):
+            distances, ids = tree.plus_proches(query_features, top_k)
+        return [(tree.cles[i], 1 / (1 + d)) for i, d in zip(ids, distances)]
+    
+    def search_radius(self, query_image_path, max_distance):
+        """Toutes les images à une distance <= max_distance (similarité >= 1 / (1 + max_distance))"""
+        query_features = self.extract_texture_features(query_image_path)
+        if query_features is None or len(self.features_db) == 0:
+            return []
+        tree = self.search_tree()
+        distances, ids = tree.dans_rayon(query_features, max_distance)
+        return [(tree.cles[i], 1 / (1 + d)) for i, d in zip(ids, distances)]
+    
+    def search_batch(self, query_image_paths, top_k=5):
+        """search() pour plusieurs images requêtes : une liste de résultats par requête"""
+        queries = [self.extract_texture_features(p) for p in query_image_paths]
+        valides = [i for i, q in enumerate(queries) if q is not None]
+        results = [[] for _ in query_image_paths]
+        if not valides or len(self.features_db) == 0:
+            return results
+        
+        tree = self.search_tree()
+        distances, ids = tree.plus_proches(np.array([queries[i] for i in valides]), top_k)
+        for i, ligne, ligne_ids in zip(valides, distances, ids):
+            results[i] = [(tree.cles[j], 1 / (1 + d)) for j, d in zip(ligne_ids, ligne) if j >= 0]
+        return results
     
     def visualize_search_results(self, query_image_path, top_k=6):
         """Visualiser les résultats de recherche"""
+        import matplotlib.pyplot as plt
+        import pywt
+
         results = self.search(query_image_path, top_k)
         
         # Créer la figure
@@ -158,6 +298,9 @@ class TextureSearchEngine:
     
     def interactive_compare(self):
         """Interface interactive pour comparer deux images"""
+        import matplotlib.pyplot as plt
+        from matplotlib.widgets import Button
+
         if len(self.image_paths) < 2:
             print("Pas assez d'images dans le dataset")
             return
@@ -208,6 +351,8 @@ class TextureSearchEngine:
     
     def update_comparison(self):
         """Mettre à jour l'affichage de comparaison"""
+        import pywt
+
         # Charger et afficher les images
         img1_path = self.image_paths[self.current_idx1]
         img2_path = self.image_paths[self.current_idx2]
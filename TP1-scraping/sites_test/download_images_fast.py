@@ -3,31 +3,10 @@ Script pour télécharger des vraies images depuis Picsum (Lorem Picsum)
 Service de placeholder d'images réelles
 """
 
-import requests
 import os
-from PIL import Image
-from io import BytesIO
 import time
 
-
-def download_image(url, filepath, text_overlay=None):
-    """Télécharge une image depuis une URL"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=30)
-        if response.status_code == 200:
-            img = Image.open(BytesIO(response.content))
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-            img.save(filepath, "JPEG", quality=90)
-            print(f"✓ {os.path.basename(filepath)}")
-            return True
-    except Exception as e:
-        print(f"✗ {os.path.basename(filepath)}: {e}")
-    return False
-
+from image_downloader import ImageDownloader, jobs_from_config
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -78,17 +57,14 @@ images_config = {
 print("📥 Téléchargement des images réelles...")
 print("=" * 50)
 
-for folder, images in images_config.items():
-    folder_path = os.path.join(base_dir, folder)
-    os.makedirs(folder_path, exist_ok=True)
-
-    site_name = folder.split("/")[0]
-    print(f"\n📂 {site_name}:")
-
-    for filename, url in images.items():
-        filepath = os.path.join(folder_path, filename)
-        download_image(url, filepath)
-        time.sleep(0.3)  # Petit délai pour éviter le rate limiting
+# Téléchargements en parallèle, débit limité par hôte (remplace le time.sleep)
+downloader = ImageDownloader(
+    quality=90, state_path=os.path.join(base_dir, ".downloads.json")
+)
+debut = time.perf_counter()
+resultats = downloader.download_many(jobs_from_config(base_dir, images_config))
+erreurs = sum(isinstance(r, Exception) for r in resultats.values())
+print(f"\n⏱️ {len(resultats)} images en {time.perf_counter() - debut:.2f}s ({erreurs} erreurs)")
 
 print("\n" + "=" * 50)
 print("✅ Toutes les images ont été téléchargées!")
@@ -0,0 +1,292 @@
+"""
+Module : Téléchargement concurrent des images
+==============================================
+
+Partagé par download_images_fast.py et telecharger_vraies_images.py :
+- Session HTTP unique (pool de connexions) et pool de threads borné
+- Nouvelles tentatives avec attente exponentielle (erreurs réseau, 429, 5xx,
+  flux interrompu en cours de téléchargement)
+- Limitation du débit par hôte au lieu de time.sleep() entre les appels
+- Écriture en flux directement sur le disque (fichier .part + rename) ;
+  l'image n'est décodée par PIL que si une conversion est nécessaire
+- Fichiers déjà à jour ignorés (ETag mémorisé -> 304, ou même taille)
+
+Utilisable en ligne de commande, par exemple contre le serveur local :
+    python image_downloader.py http://localhost:8000/site1/images/cat_sleeping.jpg --dest /tmp/images
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+MAX_WORKERS = 8
+TIMEOUT = (5, 30)
+MAX_RETRIES = 4
+BACKOFF = 0.5  # Attente initiale (secondes), doublée à chaque tentative
+PER_HOST_DELAY = 0.1  # Délai minimum entre deux requêtes vers un même hôte
+CHUNK_SIZE = 64 * 1024
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Erreurs pendant la lecture du corps (connexion coupée, délai dépassé)
+STREAM_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+
+
+class RateLimiter:
+    """Espace les requêtes vers un même hôte d'au moins `delay` secondes"""
+
+    def __init__(self, delay=PER_HOST_DELAY):
+        self.delay = delay
+        self._next_time = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.delay:
+            return
+        with self._lock:
+            maintenant = time.monotonic()
+            depart = max(maintenant, self._next_time.get(host, 0.0))
+            self._next_time[host] = depart + self.delay
+        if depart > maintenant:
+            time.sleep(depart - maintenant)
+
+
+def to_rgb(img):
+    """Convertit en RGB en collant la transparence sur un fond blanc"""
+    if img.mode in ("RGBA", "LA", "P"):
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        if img.mode == "P":
+            img = img.convert("RGBA")
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode != "RGB":
+        return img.convert("RGB")
+    return img
+
+
+class ImageDownloader:
+    """
+    Args:
+        max_size (tuple): Taille maximale (largeur, hauteur), ou None
+        quality (int): Qualité JPEG en cas de ré-encodage
+        state_path (str): Fichier JSON mémorisant les ETags entre deux exécutions
+    """
+
+    def __init__(
+        self,
+        max_workers=MAX_WORKERS,
+        max_size=None,
+        quality=90,
+        per_host_delay=PER_HOST_DELAY,
+        max_retries=MAX_RETRIES,
+        state_path=None,
+    ):
+        self.max_workers = max_workers
+        self.max_size = max_size
+        self.quality = quality
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(per_host_delay)
+        self.state_path = state_path
+        self.state = {}  # {chemin: {"url", "etag", "size"}}
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        if state_path and os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def _request(self, url, headers):
+        """GET en flux avec nouvelles tentatives et attente exponentielle"""
+        host = urllib.parse.urlsplit(url).netloc
+        for tentative in range(self.max_retries + 1):
+            self.limiter.wait(host)
+            try:
+                response = self.session.get(
+                    url, headers=headers, timeout=TIMEOUT, stream=True
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if tentative == self.max_retries:
+                    raise
+                attente = BACKOFF * 2**tentative
+            else:
+                if response.status_code not in RETRY_STATUS or tentative == self.max_retries:
+                    return response
+                response.close()
+                retry_after = response.headers.get("Retry-After", "")
+                attente = (
+                    float(retry_after)
+                    if retry_after.isdigit()
+                    else BACKOFF * 2**tentative
+                )
+            time.sleep(attente * (1 + random.random() / 2))
+
+    def _needs_conversion(self, path):
+        """Vrai si le fichier n'est pas déjà un JPEG RGB à la bonne taille"""
+        with Image.open(path) as img:  # Lit seulement l'en-tête
+            if img.format != "JPEG" or img.mode != "RGB":
+                return True
+            return bool(
+                self.max_size
+                and (img.width > self.max_size[0] or img.height > self.max_size[1])
+            )
+
+    def _convert(self, source, filepath):
+        with Image.open(source) as img:
+            img = to_rgb(img)
+            if self.max_size:
+                img.thumbnail(self.max_size, Image.Resampling.LANCZOS)
+            img.save(filepath, "JPEG", quality=self.quality)
+
+    def download(self, url, filepath):
+        """
+        Télécharge une image vers `filepath`
+
+        Returns:
+            str: "downloaded", "converted" ou "skipped"
+        """
+        headers = {}
+        connu = self.state.get(filepath)
+        existe = os.path.exists(filepath)
+        if existe and connu and connu.get("url") == url and connu.get("etag"):
+            headers["If-None-Match"] = connu["etag"]
+
+        for tentative in range(self.max_retries + 1):
+            if tentative:
+                time.sleep(BACKOFF * 2 ** (tentative - 1) * (1 + random.random() / 2))
+            with self._request(url, headers) as response:
+                if response.status_code == 304:
+                    return "skipped"
+                response.raise_for_status()
+
+                taille = response.headers.get("Content-Length")
+                etag = response.headers.get("ETag")
+                if existe and taille and int(taille) == os.path.getsize(filepath) and (
+                    not etag or not connu or connu.get("etag") in (None, etag)
+                ):
+                    statut = "skipped"
+                    break
+
+                tmp_path = f"{filepath}.part"
+                try:
+                    try:
+                        with open(tmp_path, "wb") as f:
+                            for chunk in response.iter_content(CHUNK_SIZE):
+                                f.write(chunk)
+                    except STREAM_ERRORS:
+                        # Flux interrompu : l'image entière est redemandée
+                        if tentative == self.max_retries:
+                            raise
+                        continue
+                    if self._needs_conversion(tmp_path):
+                        self._convert(tmp_path, filepath)
+                        statut = "converted"
+                    else:
+                        os.replace(tmp_path, filepath)
+                        statut = "downloaded"
+                    break
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+
+        with self._lock:
+            self.state[filepath] = {
+                "url": url,
+                "etag": etag,
+                "size": os.path.getsize(filepath),
+            }
+        return statut
+
+    def download_many(self, jobs, verbose=True):
+        """
+        Télécharge en parallèle une liste de (url, chemin)
+
+        Returns:
+            dict: {chemin: statut (str) ou Exception}
+        """
+        resultats = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self.download, url, filepath): filepath
+                for url, filepath in jobs
+            }
+            for future in as_completed(futures):
+                filepath = futures[future]
+                nom = os.path.basename(filepath)
+                try:
+                    resultats[filepath] = future.result()
+                    if verbose:
+                        print(f"✓ {nom} ({resultats[filepath]})")
+                except Exception as e:
+                    resultats[filepath] = e
+                    if verbose:
+                        print(f"✗ {nom}: {e}")
+        self.save_state()
+        return resultats
+
+    def save_state(self):
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+
+def jobs_from_config(base_dir, images_config):
+    """
+    Args:
+        images_config (dict): {dossier relatif: {nom de fichier: url}}
+
+    Returns:
+        list: Liste de (url, chemin) ; les dossiers sont créés
+    """
+    jobs = []
+    for folder, images in images_config.items():
+        folder_path = os.path.join(base_dir, folder)
+        os.makedirs(folder_path, exist_ok=True)
+        for filename, url in images.items():
+            jobs.append((url, os.path.join(folder_path, filename)))
+    return jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Téléchargement concurrent d'images")
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--dest", default=".")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    os.makedirs(args.dest, exist_ok=True)
+    downloader = ImageDownloader(
+        max_workers=args.workers,
+        state_path=os.path.join(args.dest, ".downloads.json"),
+    )
+    debut = time.perf_counter()
+    resultats = downloader.download_many(
+        [
+            (url, os.path.join(args.dest, os.path.basename(urllib.parse.urlsplit(url).path)))
+            for url in args.urls
+        ]
+    )
+    erreurs = sum(isinstance(r, Exception) for r in resultats.values())
+    print(
+        f"\n⏱️ {len(resultats)} images en {time.perf_counter() - debut:.2f}s"
+        f" ({erreurs} erreurs)"
+    )
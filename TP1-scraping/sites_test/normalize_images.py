@@ -0,0 +1,216 @@
+"""
+Module : Normalisation des images des sites
+============================================
+
+Étape de prétraitement indépendante du téléchargement, exécutée sur
+toute une arborescence avec un pool de processus :
+- Conversion en RGB (transparence collée sur fond blanc)
+- Réduction à 800x600 maximum (LANCZOS), qualité JPEG 85
+- Décodage JPEG réduit avec draft() : l'image est décodée directement
+  à 1/2, 1/4 ou 1/8 de sa taille quand c'est suffisant
+- Images déjà conformes laissées telles quelles
+- Écriture atomique (fichier temporaire + rename)
+
+Un manifeste JSON (manifest.json à la racine) décrit chaque image :
+dimensions, mode, taille et empreinte SHA-1. Les fichiers inchangés
+(même taille et même date) ne sont pas rouverts lors de l'exécution
+suivante. Les moteurs (dct_engine, tp_dct_comparaison_images, TP-4) le
+lisent à l'indexation d'un dossier (sources_images.lire_manifeste) : les
+copies d'une même image ne sont décodées qu'une fois.
+
+Usage :
+    python normalize_images.py                  # site*/images
+    python normalize_images.py ../../dataset --size 800x600 --workers 4
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from image_downloader import to_rgb
+
+TARGET_SIZE = (800, 600)
+QUALITY = 85
+MANIFEST_NAME = "manifest.json"
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"}
+JPEG_EXTENSIONS = {".jpg", ".jpeg"}
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _is_conform(img, path, target_size):
+    jpeg = os.path.splitext(path)[1].lower() in JPEG_EXTENSIONS
+    return (
+        img.mode == "RGB"
+        and (img.format == "JPEG") == jpeg
+        and img.width <= target_size[0]
+        and img.height <= target_size[1]
+    )
+
+
+def normalize_image(path, target_size=TARGET_SIZE, quality=QUALITY):
+    """
+    Normalise une image sur place si nécessaire
+
+    Returns:
+        dict: Entrée du manifeste (width, height, mode, bytes, mtime_ns,
+        sha1, normalized)
+    """
+    with Image.open(path) as img:
+        normalise = not _is_conform(img, path, target_size)
+        if normalise:
+            if img.format == "JPEG":
+                # Décodage à l'échelle réduite la plus proche (>= cible)
+                img.draft("RGB", target_size)
+            img = to_rgb(img)
+            img.thumbnail(target_size, Image.Resampling.LANCZOS)
+
+            extension = os.path.splitext(path)[1].lower()
+            tmp_path = f"{path}.tmp"
+            try:
+                if extension in JPEG_EXTENSIONS:
+                    img.save(tmp_path, "JPEG", quality=quality)
+                else:
+                    img.save(tmp_path, Image.registered_extensions()[extension])
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        width, height, mode = img.width, img.height, img.mode
+
+    stat = os.stat(path)
+    return {
+        "width": width,
+        "height": height,
+        "mode": mode,
+        "bytes": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": file_sha1(path),
+        "normalized": normalise,
+    }
+
+
+def _worker(args):
+    path, target_size, quality = args
+    try:
+        return path, normalize_image(path, target_size, quality)
+    except Exception as e:
+        return path, e
+
+
+def load_manifest(root):
+    """
+    Returns:
+        dict: Manifeste de `root` ({"target", "quality", "images"}), ou None
+    """
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def normalize_tree(root, target_size=TARGET_SIZE, quality=QUALITY, workers=None):
+    """
+    Normalise toutes les images de `root` (récursivement) et écrit le manifeste
+
+    Returns:
+        tuple: (manifeste, images analysées [chemin relatif],
+        erreurs {chemin: Exception})
+    """
+    target_size = tuple(target_size)
+    ancien = load_manifest(root) or {}
+    reutilisable = (
+        ancien.get("images", {})
+        if tuple(ancien.get("target", ())) == target_size
+        and ancien.get("quality") == quality
+        else {}
+    )
+
+    images = {}
+    a_traiter = []
+    for dossier, _, fichiers in os.walk(root):
+        for nom in fichiers:
+            if os.path.splitext(nom)[1].lower() not in EXTENSIONS:
+                continue
+            chemin = os.path.join(dossier, nom)
+            relatif = os.path.relpath(chemin, root).replace(os.sep, "/")
+            stat = os.stat(chemin)
+            entree = reutilisable.get(relatif)
+            if (
+                entree
+                and entree["bytes"] == stat.st_size
+                and entree["mtime_ns"] == stat.st_mtime_ns
+            ):
+                images[relatif] = entree  # Inchangé : pas besoin de rouvrir
+            else:
+                a_traiter.append(chemin)
+
+    analysees = []
+    erreurs = {}
+    if a_traiter:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            taches = [(chemin, target_size, quality) for chemin in a_traiter]
+            chunksize = max(1, len(taches) // ((workers or os.cpu_count() or 1) * 4))
+            for chemin, resultat in pool.map(_worker, taches, chunksize=chunksize):
+                if isinstance(resultat, Exception):
+                    erreurs[chemin] = resultat
+                else:
+                    relatif = os.path.relpath(chemin, root).replace(os.sep, "/")
+                    images[relatif] = resultat
+                    analysees.append(relatif)
+
+    manifeste = {
+        "target": list(target_size),
+        "quality": quality,
+        "images": dict(sorted(images.items())),
+    }
+    tmp_path = os.path.join(root, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifeste, f, indent=1)
+    os.replace(tmp_path, os.path.join(root, MANIFEST_NAME))
+    return manifeste, analysees, erreurs
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Normalisation des images")
+    parser.add_argument("roots", nargs="*")
+    parser.add_argument("--size", default="x".join(map(str, TARGET_SIZE)))
+    parser.add_argument("--quality", type=int, default=QUALITY)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    target_size = tuple(int(v) for v in args.size.lower().split("x"))
+    roots = args.roots or sorted(glob.glob(os.path.join(base_dir, "site*", "images")))
+
+    print("🖼️ Normalisation des images...")
+    print("=" * 50)
+    debut = time.perf_counter()
+    for root in roots:
+        manifeste, analysees, erreurs = normalize_tree(
+            root, target_size, args.quality, args.workers
+        )
+        reecrites = sum(manifeste["images"][r]["normalized"] for r in analysees)
+        nom = os.path.relpath(root, base_dir) if root.startswith(base_dir) else root
+        print(
+            f"📂 {nom}: {len(manifeste['images'])} images,"
+            f" {len(analysees)} analysées, {reecrites} réécrites"
+        )
+        for chemin, e in erreurs.items():
+            print(f"   ✗ {os.path.basename(chemin)}: {e}")
+    print("=" * 50)
+    print(f"✅ Terminé en {time.perf_counter() - debut:.2f}s")
@@ -1,17 +1,98 @@
 """
 Serveur local pour tester les 10 sites de test
 Lance un serveur HTTP sur le port 8000
+
+- Multi-threadé (un thread par connexion) avec keep-alive HTTP/1.1
+- ETag / Last-Modified et réponses 304
+- Requêtes Range (206) pour les images
+- Envoi des fichiers par sendfile (zéro copie)
+- Option --generate N : N sites synthétiques générés à la volée
+  (http://localhost:8000/gen1/index.html ... /genN/index.html)
 """
 
+import argparse
+import email.utils
+import glob
+import hashlib
 import http.server
-import socketserver
+import io
 import os
+import random
+import re
+import time
 
 PORT = 8000
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 
+GENERATED_RE = re.compile(r"^/gen(\d+)/(index|page(\d+))\.html$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Vocabulaire des pages synthétiques
+MOTS = (
+    "chat chien lion voiture moto avion fusée planète étoile forêt montagne océan "
+    "désert fleur jardin pizza sushi couscous tacos curry croissant guitare piano "
+    "concert musique football surf escalade château pont musée cathédrale tour "
+    "ordinateur téléphone drone tablette caméra robot nuit soleil neige pluie"
+).split()
+
+
+class GeneratedSites:
+    """Sites synthétiques déterministes, générés à la demande"""
+
+    def __init__(self, nb_sites, pages_per_site):
+        self.nb_sites = nb_sites
+        self.pages_per_site = pages_per_site
+        self.last_modified = time.time()
+        self.images = sorted(
+            "/" + os.path.relpath(p, DIRECTORY).replace(os.sep, "/")
+            for p in glob.glob(os.path.join(DIRECTORY, "site*", "images", "*.jpg"))
+        )
+
+    def page(self, site, num):
+        """Renvoie le HTML (bytes) de la page `num` (0 = index) du site, ou None"""
+        if not (1 <= site <= self.nb_sites and 0 <= num <= self.pages_per_site):
+            return None
+
+        rng = random.Random(site * 100003 + num)
+        theme = rng.sample(MOTS, 3)
+        titre = f"{theme[0].capitalize()} et {theme[1]} - site {site}"
+        if num:
+            titre += f" page {num}"
+
+        parties = [
+            "<!DOCTYPE html>",
+            '<html lang="fr">',
+            '<head><meta charset="UTF-8">',
+            f"<title>{titre}</title></head>",
+            "<body>",
+            f"<h1>{titre}</h1>",
+        ]
+        for _ in range(rng.randint(3, 8)):
+            alt = " ".join(rng.sample(MOTS, 2))
+            src = rng.choice(self.images) if self.images else f"/img/{alt}.jpg"
+            parties.append(f'<img src="{src}" alt="{alt}">')
+            parties.append(f"<p>{' '.join(rng.choices(MOTS + theme * 5, k=25))}.</p>")
+
+        # Liens vers d'autres pages du site et vers le site suivant (pour le crawler)
+        liens = {0, num + 1} | {
+            rng.randint(1, self.pages_per_site) for _ in range(3)
+        }
+        for cible in sorted(liens - {num}):
+            if cible <= self.pages_per_site:
+                nom = "index" if cible == 0 else f"page{cible}"
+                parties.append(f'<a href="{nom}.html">{nom}</a>')
+        if num == 0:
+            suivant = site % self.nb_sites + 1
+            parties.append(f'<a href="/gen{suivant}/index.html">site {suivant}</a>')
+
+        parties.append("</body></html>")
+        return "\n".join(parties).encode("utf-8")
+
 
 class MyHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    generated = None  # GeneratedSites (option --generate)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=DIRECTORY, **kwargs)
 
@@ -28,11 +109,162 @@ class MyHandler(http.server.SimpleHTTPRequestHandler):
             # Ignorer silencieusement les connexions fermées par le client
             pass
 
+    def _not_modified(self, etag, mtime):
+        """Vrai si le client possède déjà cette version (If-None-Match / If-Modified-Since)"""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            etags = [t.strip() for t in if_none_match.split(",")]
+            return "*" in etags or etag in etags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                date = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= date.timestamp()
+        return False
+
+    def _parse_range(self, etag, size):
+        """
+        Returns:
+            tuple: (début, longueur) demandés, None pour tout le contenu,
+            ou "invalide" si la plage ne peut pas être satisfaite
+        """
+        range_header = self.headers.get("Range")
+        if not range_header:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range != etag:
+            return None
+
+        match = RANGE_RE.match(range_header.strip())
+        if not match or match.groups() == ("", ""):
+            return None  # Plages multiples ou syntaxe inconnue : contenu complet
+        debut, fin = match.groups()
+        if debut == "":
+            # bytes=-N : les N derniers octets
+            debut, fin = max(0, size - int(fin)), size - 1
+        else:
+            debut = int(debut)
+            fin = min(int(fin), size - 1) if fin else size - 1
+        if debut >= size or debut > fin:
+            return "invalide"
+        return debut, fin - debut + 1
+
+    def _send_content(self, f, size, content_type, etag, mtime):
+        """Envoie les en-têtes (200, 206, 304 ou 416) et renvoie le fichier à copier"""
+        if self._not_modified(etag, mtime):
+            f.close()
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.date_time_string(mtime))
+            self.end_headers()
+            return None
+
+        plage = self._parse_range(etag, size)
+        if plage == "invalide":
+            f.close()
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        if plage is None:
+            self._plage = (0, size)
+            self.send_response(200)
+        else:
+            self._plage = plage
+            debut, longueur = plage
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {debut}-{debut + longueur - 1}/{size}"
+            )
+
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(self._plage[1]))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(mtime))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        return f
+
+    def send_head(self):
+        # Plage propre à chaque requête : une requête HEAD (sans copyfile) ou un
+        # dossier ne doit pas laisser sa plage à la requête suivante (keep-alive)
+        self._plage = (0, None)
+        chemin = self.path.split("?", 1)[0].split("#", 1)[0]
+
+        #! Pages synthétiques
+        match = GENERATED_RE.match(chemin)
+        if match and self.generated is not None:
+            site, _, num = match.groups()
+            contenu = self.generated.page(int(site), int(num or 0))
+            if contenu is None:
+                self.send_error(404, "File not found")
+                return None
+            etag = '"' + hashlib.md5(contenu).hexdigest() + '"'
+            return self._send_content(
+                io.BytesIO(contenu),
+                len(contenu),
+                "text/html; charset=utf-8",
+                etag,
+                self.generated.last_modified,
+            )
+
+        #! Fichiers du disque (les dossiers gardent le comportement par défaut)
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or path.endswith("/"):
+            return super().send_head()
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        fs = os.fstat(f.fileno())
+        etag = f'"{fs.st_mtime_ns:x}-{fs.st_size:x}"'
+        return self._send_content(
+            f, fs.st_size, self.guess_type(path), etag, fs.st_mtime
+        )
+
+    def copyfile(self, source, outputfile):
+        """Envoie la plage demandée ; sendfile (zéro copie) pour les vrais fichiers"""
+        debut, longueur = getattr(self, "_plage", (0, None))
+        self._plage = (0, None)
+        if longueur is None:
+            return super().copyfile(source, outputfile)
+
+        if isinstance(source, io.BytesIO):
+            outputfile.write(source.getbuffer()[debut : debut + longueur])
+        else:
+            self.connection.sendfile(source, offset=debut, count=longueur)
+
+
+class ThreadingServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local des sites de test")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--generate", type=int, default=0, help="Nombre de sites synthétiques"
+    )
+    parser.add_argument(
+        "--pages", type=int, default=20, help="Pages par site synthétique"
+    )
+    args = parser.parse_args()
+    PORT = args.port
+
     os.chdir(DIRECTORY)
+    if args.generate:
+        MyHandler.generated = GeneratedSites(args.generate, args.pages)
 
-    with socketserver.TCPServer(("", PORT), MyHandler) as httpd:
+    with ThreadingServer(("", PORT), MyHandler) as httpd:
         print("=" * 60)
         print(f"🌐 Serveur de test lancé sur http://localhost:{PORT}")
         print("=" * 60)
@@ -47,6 +279,12 @@ if __name__ == "__main__":
         print(f"   8. http://localhost:{PORT}/site8/index.html  - 🏄 Sports Extrêmes")
         print(f"   9. http://localhost:{PORT}/site9/index.html  - 🚀 Espace")
         print(f"  10. http://localhost:{PORT}/site10/index.html - 🎵 Musique")
+        if args.generate:
+            print(
+                f"\n🧪 {args.generate} sites synthétiques ({args.pages} pages chacun):"
+                f" http://localhost:{PORT}/gen1/index.html ..."
+                f" /gen{args.generate}/index.html"
+            )
         print("\n⚡ Appuyez sur Ctrl+C pour arrêter le serveur")
         print("=" * 60)
 
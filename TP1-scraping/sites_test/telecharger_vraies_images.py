@@ -3,45 +3,13 @@ Script pour télécharger des vraies images depuis internet
 pour les 5 sites de test
 """
 
-import requests
 import os
-from PIL import Image
-from io import BytesIO
-
-
-def download_image(url, filepath):
-    """Télécharge une image depuis une URL"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=15)
-        if response.status_code == 200:
-            img = Image.open(BytesIO(response.content))
-            # Convertir en RGB si nécessaire
-            if img.mode in ("RGBA", "LA", "P"):
-                background = Image.new("RGB", img.size, (255, 255, 255))
-                if img.mode == "P":
-                    img = img.convert("RGBA")
-                if img.mode in ("RGBA", "LA"):
-                    background.paste(img, mask=img.split()[-1])
-                else:
-                    background.paste(img)
-                img = background
-            elif img.mode != "RGB":
-                img = img.convert("RGB")
-
-            # Redimensionner si trop grande
-            img.thumbnail((800, 600), Image.Resampling.LANCZOS)
-            img.save(filepath, "JPEG", quality=85)
-            print(f"✓ Téléchargé: {os.path.basename(filepath)}")
-            return True
-    except Exception as e:
-        print(f"✗ Erreur {os.path.basename(filepath)}: {e}")
-    return False
+import time
 
+from image_downloader import ImageDownloader, jobs_from_config
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
+jobs = []  # (url, chemin), téléchargés ensemble en parallèle à la fin
 
 # ==================== SITE 1: CHATS ====================
 print("\n🐱 Téléchargement des images de chats...")
@@ -52,9 +20,7 @@ site1_images = {
     "black_cat.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/2/21/Black_Cat_Domestic.jpg/800px-Black_Cat_Domestic.jpg",
     "cat_garden.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/b/b6/Felis_catus-cat_on_snow.jpg/800px-Felis_catus-cat_on_snow.jpg",
 }
-os.makedirs(os.path.join(base_dir, "site1", "images"), exist_ok=True)
-for filename, url in site1_images.items():
-    download_image(url, os.path.join(base_dir, "site1", "images", filename))
+jobs += jobs_from_config(base_dir, {"site1/images": site1_images})
 
 # ==================== SITE 2: VOITURES ====================
 print("\n🏎️ Téléchargement des images de voitures...")
@@ -65,9 +31,7 @@ site2_images = {
     "mclaren_orange.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/6/6a/2015-03-03_Geneva_Motor_Show_3579.JPG/800px-2015-03-03_Geneva_Motor_Show_3579.JPG",
     "bugatti_blue.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/c/c9/Bugatti_Chiron_%28Lime_Rock%29.jpg/800px-Bugatti_Chiron_%28Lime_Rock%29.jpg",
 }
-os.makedirs(os.path.join(base_dir, "site2", "images"), exist_ok=True)
-for filename, url in site2_images.items():
-    download_image(url, os.path.join(base_dir, "site2", "images", filename))
+jobs += jobs_from_config(base_dir, {"site2/images": site2_images})
 
 # ==================== SITE 3: NATURE ====================
 print("\n🌿 Téléchargement des images de nature...")
@@ -79,9 +43,7 @@ site3_images = {
     "waterfall_tropical.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/d/d6/Niagara_Falls_from_Skylon_Tower_2023-06-27.jpg/800px-Niagara_Falls_from_Skylon_Tower_2023-06-27.jpg",
     "desert_dunes.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/3/34/Rub_al_Khali_002.JPG/800px-Rub_al_Khali_002.JPG",
 }
-os.makedirs(os.path.join(base_dir, "site3", "images"), exist_ok=True)
-for filename, url in site3_images.items():
-    download_image(url, os.path.join(base_dir, "site3", "images", filename))
+jobs += jobs_from_config(base_dir, {"site3/images": site3_images})
 
 # ==================== SITE 4: CUISINE ====================
 print("\n🍽️ Téléchargement des images de cuisine...")
@@ -93,9 +55,7 @@ site4_images = {
     "croissant_french.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/2/22/Croissant-Killer-Kropp.jpg/800px-Croissant-Killer-Kropp.jpg",
     "curry_indian.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/a/a3/Indian_Curry_Chicken.jpg/800px-Indian_Curry_Chicken.jpg",
 }
-os.makedirs(os.path.join(base_dir, "site4", "images"), exist_ok=True)
-for filename, url in site4_images.items():
-    download_image(url, os.path.join(base_dir, "site4", "images", filename))
+jobs += jobs_from_config(base_dir, {"site4/images": site4_images})
 
 # ==================== SITE 5: TECHNOLOGIE ====================
 print("\n💻 Téléchargement des images de technologie...")
@@ -107,9 +67,18 @@ site5_images = {
     "tablet_drawing.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/d/d0/IPad_Pro_12.9_inch_%284th_generation%29.png/400px-IPad_Pro_12.9_inch_%284th_generation%29.png",
     "drone_camera.jpg": "https://upload.wikimedia.org/wikipedia/commons/thumb/5/5a/DJI_Phantom_4_Pro_V2.0.jpg/800px-DJI_Phantom_4_Pro_V2.0.jpg",
 }
-os.makedirs(os.path.join(base_dir, "site5", "images"), exist_ok=True)
-for filename, url in site5_images.items():
-    download_image(url, os.path.join(base_dir, "site5", "images", filename))
+jobs += jobs_from_config(base_dir, {"site5/images": site5_images})
+
+# Conversion RGB + redimensionnement 800x600 seulement si nécessaire
+downloader = ImageDownloader(
+    max_size=(800, 600),
+    quality=85,
+    state_path=os.path.join(base_dir, ".downloads.json"),
+)
+debut = time.perf_counter()
+resultats = downloader.download_many(jobs)
+erreurs = sum(isinstance(r, Exception) for r in resultats.values())
+print(f"\n⏱️ {len(resultats)} images en {time.perf_counter() - debut:.2f}s ({erreurs} erreurs)")
 
 print("\n" + "=" * 50)
 print("✅ Téléchargement terminé!")
@@ -1,16 +1,90 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from bs4 import BeautifulSoup
-import requests
 import urllib.parse
+import json
 import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from fetcher import fetcher
+from image_index import ImageIndex
+from metrics import CONTENT_TYPE, Registry
+from page_cache import PageCache
+from crawler import Crawler
+from ranking import SearchIndex, encode_cursor, decode_cursor
+from response_cache import ResponseCache, normalize_query
+from tokenizer import fold_accents, html_fields, tokenize
+from vocabulary import Vocabulary
 
 app = Flask(__name__)
 CORS(app)
 
 # Caches globaux pour accélérer les recherches
-all_words_cache = set()
-html_cache = {}  # Cache des pages HTML pour éviter de re-télécharger
+# (jamais modifiés sur place : on remplace l'objet entier, ce qui est atomique)
+all_words_cache = Vocabulary()  # Vocabulaire compact (mots triés + df)
+html_cache = PageCache(fetcher)  # Cache LRU/TTL des pages HTML
+
+# Index de classement BM25F (reconstruit quand le cache HTML change)
+search_index = None
+search_index_lock = threading.Lock()
+
+# Cache des réponses de /api/search (invalidé quand html_cache.version change)
+response_cache = ResponseCache()
+
+# Taille de page par défaut / maximale, et images renvoyées par site
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_IMAGES_PER_SITE = 24
+
+# Délai maximum (en secondes) pour évaluer tous les sites d'une recherche
+SEARCH_DEADLINE = 3.0
+
+# Pool de processus pour l'analyse HTML (créé à la première recherche,
+# recréé si un processus du pool meurt)
+search_pool = None
+search_pool_lock = threading.Lock()
+
+# Index DCT des images des sites (recherche par l'exemple)
+image_index = ImageIndex(fetcher)
+
+# Taille maximale d'une image envoyée à /api/search/image
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+# Métriques exportées par /api/metrics (format Prometheus)
+metrics = Registry()
+REQUEST_LATENCY = metrics.histogram(
+    "iri_http_request_duration_seconds",
+    "Durée de traitement des requêtes HTTP, par route",
+    ["route", "method", "status"],
+)
+SITE_FETCH_TIME = metrics.histogram(
+    "iri_site_fetch_duration_seconds",
+    "Durée de téléchargement des pages (jusqu'aux en-têtes), par site",
+    ["site"],
+)
+SITE_PARSE_TIME = metrics.histogram(
+    "iri_site_parse_duration_seconds",
+    "Durée d'analyse HTML d'une page pendant une recherche, par site",
+    ["site"],
+)
+SUGGESTION_TIME = metrics.histogram(
+    "iri_suggestion_duration_seconds",
+    "Durée du calcul des suggestions (levenshtein ou prefix)",
+    ["path"],
+)
+LEVENSHTEIN_FALLBACKS = metrics.counter(
+    "iri_levenshtein_fallback_total",
+    "Recherches sans résultat ayant déclenché les suggestions Levenshtein",
+)
+WORD_CACHE_REQUESTS = metrics.counter(
+    "iri_word_cache_requests_total",
+    "Lectures du cache de mots (miss = vocabulaire à construire)",
+    ["result"],
+)
 
 
 def levenshtein_distance(s1, s2):
@@ -38,7 +112,7 @@ def levenshtein_distance(s1, s2):
     return previous_row[-1]
 
 
-def find_similar_words(query_word, word_list, max_distance=5 max_suggestions=10):
+def find_similar_words(query_word, word_list, max_distance=5, max_suggestions=10):
     query_lower = query_word.lower()
     suggestions = []
 
@@ -49,7 +123,6 @@ def find_similar_words(query_word, word_list, max_distance=5 max_suggestions=10)
             continue
 
         distance = levenshtein_distance(query_lower, word_lower)
-        print(f"Comparing '{query_lower}' with '{word_lower}': distance {distance}")
 
         #! Ajuster la distance max selon la longueur du mot
         adjusted_max = max_distance if len(query_lower) > 4 else 1
@@ -64,52 +137,49 @@ def find_similar_words(query_word, word_list, max_distance=5 max_suggestions=10)
     return [word for word, _ in suggestions[:max_suggestions]]
 
 
-#! site words
-def extract_words_from_site(url):
-    words = set()
-    try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+def site_label(url):
+    """Étiquette « site » des métriques : nom du site de départ (nombre borné)"""
+    site = site_for_url(url)
+    return site["name"] if site else "autre"
+
+
+def record_fetch(url, response):
+    SITE_FETCH_TIME.observe(response.elapsed.total_seconds(), site_label(url))
 
-        #! Mots du titre
-        title = soup.find("title")
-        if title:
-            words.update(title.get_text().lower().split())
 
-        #! Mots des alt des images
-        for img in soup.find_all("img"):
-            alt = img.get("alt", "")
-            if alt:
-                words.update(alt.lower().split())
+html_cache.on_fetch = record_fetch
 
-        #! Mots des paragraphes
-        for p in soup.find_all("p"):
-            words.update(p.get_text().lower().split())
 
-        #! Mots des titres h1, h2, h3
-        for tag in soup.find_all(["h1", "h2", "h3"]):
-            words.update(tag.get_text().lower().split())
+def get_html(url):
+    """Renvoie le HTML d'une page depuis le cache, ou le télécharge"""
+    return html_cache.get(url)
 
+
+#! site words
+def extract_words_from_site(url):
+    try:
+        fields = html_fields(BeautifulSoup(get_html(url), "html.parser"))
     except Exception:
-        pass
+        return set()
 
-    #! Filtrer les mots trop courts et nettoyer
-    cleaned_words = set()
-    for word in words:
-        # Nettoyer la ponctuation
-        clean = "".join(c for c in word if c.isalnum())
-        if len(clean) >= 3:
-            cleaned_words.add(clean)
+    #! Titre, alt des images, paragraphes et titres h1, h2, h3 en un seul texte
+    texts = [fields["title"]]
+    texts.extend(alt for _, alt in fields["images"])
+    texts.extend(fields["paragraphs"])
+    texts.extend(fields["headings"])
 
-    return cleaned_words
+    #! Mots normalisés (sans accents ni ponctuation) d'au moins 3 lettres
+    return set(tokenize("\n".join(texts), stem=False, min_length=3))
 
 
 def build_words_cache():
     global all_words_cache
-    all_words_cache = set()
-    for site in SITES:
-        all_words_cache.update(extract_words_from_site(site["url"]))
+    # Télécharger en parallèle les pages absentes du cache HTML
+    sites = list(SITES)
+    html_cache.load_many(site["url"] for site in sites)
+    all_words_cache = Vocabulary.build(
+        extract_words_from_site(site["url"]) for site in sites
+    )
     print(f"📚 Cache de mots construit: {len(all_words_cache)} mots uniques")
 
 
@@ -176,13 +246,26 @@ SITES = [
     },
 ]
 
+# Sites de départ ; SITES grandit avec les pages découvertes par le crawler
+# (ajouts en place sous sites_lock, jamais de suppression : un lecteur qui
+# parcourt la liste plusieurs fois en prend une copie, list(SITES))
+SEED_SITES = list(SITES)
+sites_lock = threading.Lock()
+sites_by_url = {site["url"]: site for site in SITES}
+next_site_id = max(site["id"] for site in SITES) + 1
+
 
 def check_words_in_text(text, words, mode="OR"):
     if not text:
         return False, []
 
-    text_lower = text.lower()
-    found_words = [word for word in words if word.lower() in text_lower]
+    # Comparaison mot à mot (et non sous-chaîne) : "chat" ne trouve pas "chateau"
+    text_tokens = set(tokenize(text))
+    found_words = []
+    for word in words:
+        word_tokens = tokenize(word)
+        if word_tokens and all(t in text_tokens for t in word_tokens):
+            found_words.append(word)
 
     if mode == "AND":
         # Tous les mots doivent être trouvés
@@ -192,27 +275,53 @@ def check_words_in_text(text, words, mode="OR"):
         return len(found_words) > 0, found_words
 
 
+def empty_result(error=None):
+    """Résultat d'un site sans correspondance (avec l'erreur éventuelle)"""
+    result = {
+        "found": False,
+        "methods": [],
+        "matched_words": [],
+        "images": [],
+        "page_title": "",
+    }
+    if error is not None:
+        result["error"] = error
+    return result
+
+
 def search_in_site(url, query_words, mode="OR"):
     try:
         # Utiliser le cache HTML si disponible
-        if url in html_cache:
-            html_content = html_cache[url]
-        else:
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            html_content = response.text
-            html_cache[url] = html_content  # Mettre en cache
+        html_content = get_html(url)
+    except Exception as e:
+        return empty_result(str(e))
+    return search_in_html(url, html_content, query_words, mode)
+
+
+def deadline_passed(deadline):
+    """deadline : échéance absolue time.time() (partagée entre processus) ou None"""
+    return deadline is not None and time.time() > deadline
 
-        soup = BeautifulSoup(html_content, "html.parser")
+
+def search_in_html(url, html_content, query_words, mode="OR", deadline=None):
+    """
+    Analyse une page déjà téléchargée (exécutée dans un processus du pool)
+
+    Renvoie None dès que l'échéance est dépassée : un processus dont la
+    recherche a expiré ne garde pas le pool occupé jusqu'à la fin de la page.
+    """
+    try:
+        if deadline_passed(deadline):
+            return None
+        fields = html_fields(BeautifulSoup(html_content, "html.parser"))
+        if deadline_passed(deadline):
+            return None
 
         found_methods = []
         all_matched_words = set()
 
         #! Récupérer le titre complet de la page
-        page_title = ""
-        title_tag = soup.find("title")
-        if title_tag:
-            page_title = title_tag.get_text().strip()
+        page_title = fields["title"]
 
         #!  Recherche dans le titre
         if page_title:
@@ -222,11 +331,10 @@ def search_in_site(url, query_words, mode="OR"):
                 all_matched_words.update(matched)
 
         #! Recherche dans les images (src et alt)
-        images = soup.find_all("img")
-        for img in images:
-            src = img.get("src", "")
-            alt = img.get("alt", "")
-
+        images = fields["images"]
+        for src, alt in images:
+            if deadline_passed(deadline):
+                return None
             #! Vérifier dans src
             found_src, matched_src = check_words_in_text(src, query_words, mode)
             if found_src and "url" not in found_methods:
@@ -240,9 +348,9 @@ def search_in_site(url, query_words, mode="OR"):
                 all_matched_words.update(matched_alt)
 
         #! Recherche dans les paragraphes
-        paragraphs = soup.find_all("p")
-        for p in paragraphs:
-            p_text = p.get_text()
+        for p_text in fields["paragraphs"]:
+            if deadline_passed(deadline):
+                return None
             found, matched = check_words_in_text(p_text, query_words, mode)
             if found:
                 if "text" not in found_methods:
@@ -253,9 +361,8 @@ def search_in_site(url, query_words, mode="OR"):
         #!  Si trouvé dans au moins une méthode, récupérer TOUTES les images
         if found_methods:
             all_images = []
-            for img in images:
-                src = img.get("src", "")
-                alt = img.get("alt", "Image")
+            for src, alt in images:
+                alt = alt or "Image"
 
                 # Convertir URL relative en absolue
                 if src and not src.startswith(("http://", "https://")):
@@ -274,32 +381,186 @@ def search_in_site(url, query_words, mode="OR"):
                 "page_title": page_title,
             }
 
-        return {
-            "found": False,
-            "methods": [],
-            "matched_words": [],
-            "images": [],
-            "page_title": "",
-        }
+        return empty_result()
 
     except Exception as e:
-        return {
-            "found": False,
-            "methods": [],
-            "matched_words": [],
-            "images": [],
-            "page_title": "",
-            "error": str(e),
-        }
+        return empty_result(str(e))
+
+
+def timed_search_in_html(url, html_content, query_words, mode="OR", deadline=None):
+    """search_in_html + sa durée (mesurée dans le processus du pool)"""
+    debut = time.perf_counter()
+    result = search_in_html(url, html_content, query_words, mode, deadline)
+    return result, time.perf_counter() - debut
+
+
+def get_search_index():
+    """Renvoie l'index de classement, reconstruit si le cache HTML a changé"""
+    global search_index
+    with search_index_lock:
+        if search_index is None or search_index.version != html_cache.version:
+            pages, version = html_cache.snapshot()
+            search_index = SearchIndex.build(pages, version, previous=search_index)
+        return search_index
+
+
+def get_search_pool():
+    global search_pool
+    with search_pool_lock:
+        if search_pool is None:
+            search_pool = ProcessPoolExecutor()
+        return search_pool
+
+
+def reset_search_pool(pool):
+    """Abandonne un pool cassé : la prochaine recherche en crée un nouveau"""
+    global search_pool
+    with search_pool_lock:
+        if search_pool is pool:
+            search_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_site_results(query_words, mode, deadline, sites=None):
+    """
+    Évalue tous les sites en parallèle dans le pool de processus
+
+    Les sites sont renvoyés dans l'ordre où leur évaluation se termine.
+    Les sites qui n'ont pas fini avant l'échéance sont renvoyés à la fin
+    avec un résultat None.
+
+    Yields:
+        tuple: (site, résultat ou None)
+    """
+    if sites is None:
+        sites = list(SITES)
+    fin = time.monotonic() + deadline
+    # Échéance vue par les processus du pool (horloge commune : time.time)
+    echeance = time.time() + deadline
+    pool = get_search_pool()
+    pages = html_cache.load_many(site["url"] for site in sites)
+
+    futures = {}
+    for site in sites:
+        page = pages[site["url"]]
+        if isinstance(page, Exception):
+            yield site, empty_result(str(page))
+        else:
+            args = (timed_search_in_html, site["url"], page, query_words, mode, echeance)
+            try:
+                future = pool.submit(*args)
+            except BrokenProcessPool:
+                # Pool cassé par une recherche précédente : un seul nouvel essai
+                reset_search_pool(pool)
+                pool = get_search_pool()
+                future = pool.submit(*args)
+            futures[future] = site
+
+    termines = set()
+    try:
+        for future in as_completed(futures, timeout=max(0.0, fin - time.monotonic())):
+            termines.add(future)
+            site = futures[future]
+            try:
+                result, duree = future.result()
+            except Exception as e:
+                # Processus mort (BrokenProcessPool) ou erreur dans le processus
+                if isinstance(e, BrokenProcessPool):
+                    reset_search_pool(pool)
+                yield site, empty_result(str(e) or type(e).__name__)
+                continue
+            if result is None:
+                # Arrêté à l'échéance dans le processus : hors délai
+                termines.discard(future)
+                continue
+            SITE_PARSE_TIME.observe(duree, site_label(site["url"]))
+            yield site, result
+    except FutureTimeoutError:
+        pass
+
+    for future, site in futures.items():
+        if future not in termines:
+            future.cancel()
+            yield site, None
+
+
+def evaluate_sites(query_words, mode, deadline):
+    """
+    Comme iter_site_results, mais renvoie les sites dans l'ordre de SITES
+
+    Returns:
+        list: Liste de tuples (site, résultat ou None)
+    """
+    sites = list(SITES)
+    par_id = {
+        site["id"]: result
+        for site, result in iter_site_results(query_words, mode, deadline, sites)
+    }
+    return [(site, par_id[site["id"]]) for site in sites]
+
+
+def build_site_result(site, result):
+    """Construit l'entrée de réponse d'un site trouvé"""
+    return {
+        "site_id": site["id"],
+        "site_name": (result["page_title"] if result["page_title"] else site["name"]),
+        "site_emoji": site["emoji"],
+        "site_url": site["url"],
+        "methods": result["methods"],
+        "matched_words": result["matched_words"],
+        "images": result["images"],
+        "total_images": len(result["images"]),
+    }
+
+
+def rank_images(site_result, image_scores):
+    """Trie les images d'un site par score et garde les MAX_IMAGES_PER_SITE premières"""
+    site_url = site_result["site_url"]
+    return sorted(
+        site_result["images"],
+        key=lambda img: image_scores.get((site_url, img["src"]), 0.0),
+        reverse=True,
+    )[:MAX_IMAGES_PER_SITE]
+
+
+def compute_suggestions(query_words):
+    """Cherche des mots proches (Levenshtein) quand aucun site ne correspond"""
+    debut = time.perf_counter()
+    LEVENSHTEIN_FALLBACKS.inc()
+
+    # Construire le cache si nécessaire
+    if not all_words_cache:
+        WORD_CACHE_REQUESTS.inc("miss")
+        build_words_cache()
+    else:
+        WORD_CACHE_REQUESTS.inc("hit")
+    words_cache = all_words_cache
+
+    # Trouver des mots similaires pour chaque mot de la requête
+    suggestions = []
+    for word in query_words:
+        similar = find_similar_words(fold_accents(word), words_cache)
+        for s in similar:
+            if s not in suggestions:
+                suggestions.append(s)
+
+    SUGGESTION_TIME.observe(time.perf_counter() - debut, "levenshtein")
+    # Limiter à 8 suggestions max
+    return suggestions[:8]
 
 
 @app.route("/api/sites", methods=["GET"])
 def get_sites():
-    return jsonify(SITES)
+    return jsonify(list(SITES))
 
 
-@app.route("/api/search", methods=["GET"])
-def search():
+def parse_search_args():
+    """
+    Lit et valide les paramètres q et mode de la requête
+
+    Returns:
+        tuple: (query, query_words, mode, erreur ou None)
+    """
     query = request.args.get("q", "").strip()
     mode = request.args.get("mode", "OR").upper()
 
@@ -308,39 +569,67 @@ def search():
         mode = "OR"
 
     if not query:
-        return jsonify(
-            {"error": "Veuillez entrer un terme de recherche", "results": []}
-        )
+        return query, [], mode, "Veuillez entrer un terme de recherche"
 
     # Séparer les mots de la requête
     query_words = [word.strip() for word in query.split() if word.strip()]
 
     if not query_words:
-        return jsonify(
-            {"error": "Veuillez entrer un terme de recherche valide", "results": []}
-        )
+        return query, [], mode, "Veuillez entrer un terme de recherche valide"
+
+    return query, query_words, mode, None
+
 
+@app.route("/api/search", methods=["GET"])
+def search():
+    query, query_words, mode, error = parse_search_args()
+    if error:
+        return jsonify({"error": error, "results": []})
+
+    try:
+        limit = min(max(int(request.args.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    cursor = request.args.get("cursor")
+
+    #! Réponse en cache pour la requête normalisée ?
+    key, words = normalize_query(query_words, mode)
+    key = (*key, limit, cursor)
+    cached = response_cache.get(key, html_cache.version)
+    if cached is None:
+        debut = time.perf_counter()
+        payload, version = run_search(words, mode, limit, cursor)
+        duree = time.perf_counter() - debut
+        if payload["timed_out_sites"]:
+            # Résultat partiel : ne pas le mettre en cache
+            return jsonify({"query": query, "query_words": query_words, **payload})
+        # Version des pages réellement utilisées (la recherche a pu en télécharger)
+        cached = response_cache.put(key, version, payload, duree)
+
+    # Mots tels que saisis : la clé de cache (et la recherche) les normalise
+    response = jsonify({"query": query, "query_words": query_words, **cached.payload})
+    response.set_etag(cached.etag_for(query, query_words))
+    return response.make_conditional(request)
+
+
+def run_search(query_words, mode, limit, cursor=None):
+    """
+    Évalue, classe et pagine une recherche (sans cache)
+
+    Returns:
+        tuple: (réponse, version du cache HTML de l'index de classement utilisé)
+    """
     results = []
     methods_count = {"title": 0, "url": 0, "alt": 0, "text": 0}
+    timed_out_sites = []
 
-    for site in SITES:
-        #! Rechercher dans chaque site
-        result = search_in_site(site["url"], query_words, mode)
+    for site, result in evaluate_sites(query_words, mode, SEARCH_DEADLINE):
+        if result is None:
+            timed_out_sites.append(site["id"])
+            continue
 
         if result["found"]:
-            results.append(
-                {
-                    "site_id": site["id"],
-                    "site_name": (
-                        result["page_title"] if result["page_title"] else site["name"]
-                    ),
-                    "site_emoji": site["emoji"],
-                    "site_url": site["url"],
-                    "methods": result["methods"],
-                    "matched_words": result["matched_words"],
-                    "images": result["images"],
-                }
-            )
+            results.append(build_site_result(site, result))
 
             # Compter les méthodes utilisées
             for method in result["methods"]:
@@ -348,36 +637,274 @@ def search():
                     methods_count[method] += 1
 
     # Si aucun résultat, chercher des suggestions avec Levenshtein
-    suggestions = []
-    if not results:
-        # Construire le cache si nécessaire
-        if not all_words_cache:
-            build_words_cache()
-
-        # Trouver des mots similaires pour chaque mot de la requête
-        for word in query_words:
-            similar = find_similar_words(word, all_words_cache)
-            for s in similar:
-                if s not in suggestions:
-                    suggestions.append(s)
+    suggestions = compute_suggestions(query_words) if not results else []
+
+    #! Classer les sites et leurs images (BM25F), puis paginer
+    index = get_search_index()
+    site_scores = index.score_sites(query_words)
+    image_scores = index.score_images(query_words)
+    results.sort(key=lambda r: site_scores.get(r["site_url"], 0.0), reverse=True)
+
+    offset, version = decode_cursor(cursor)
+    if version is not None and version != index.version:
+        offset = 0  # L'index a changé depuis la page précédente
+    page = results[offset : offset + limit]
+
+    for r in page:
+        r["score"] = round(site_scores.get(r["site_url"], 0.0), 4)
+        r["images"] = rank_images(r, image_scores)
+
+    next_cursor = None
+    if offset + limit < len(results):
+        next_cursor = encode_cursor(offset + limit, index.version)
+
+    payload = {
+        "search_mode": mode,
+        "total_sites": len(results),
+        "total_images": sum(r["total_images"] for r in results),
+        "methods_count": methods_count,
+        "results": page,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "suggestions": suggestions,
+        "timed_out_sites": timed_out_sites,
+    }
+    return payload, index.version
+
+
+@app.route("/api/search/stream", methods=["GET"])
+def search_stream():
+    """
+    Recherche en flux NDJSON : une ligne par site trouvé, dès qu'il est évalué,
+    puis une ligne de résumé (methods_count, suggestions, sites hors délai)
+    """
+    query, query_words, mode, error = parse_search_args()
+    if error:
+        return jsonify({"error": error, "results": []})
+
+    def generate():
+        index = get_search_index()
+        site_scores = index.score_sites(query_words)
+        image_scores = index.score_images(query_words)
+
+        methods_count = {"title": 0, "url": 0, "alt": 0, "text": 0}
+        timed_out_sites = []
+        total_sites = 0
+        total_images = 0
+
+        for site, result in iter_site_results(query_words, mode, SEARCH_DEADLINE):
+            if result is None:
+                timed_out_sites.append(site["id"])
+                continue
+            if not result["found"]:
+                continue
+
+            site_result = build_site_result(site, result)
+            site_result["score"] = round(site_scores.get(site["url"], 0.0), 4)
+            site_result["images"] = rank_images(site_result, image_scores)
+            total_sites += 1
+            total_images += site_result["total_images"]
+            for method in result["methods"]:
+                if method in methods_count:
+                    methods_count[method] += 1
 
-        # Limiter à 8 suggestions max
-        suggestions = suggestions[:8]
+            yield json.dumps({"type": "site", **site_result}) + "\n"
 
-    return jsonify(
-        {
+        suggestions = compute_suggestions(query_words) if not total_sites else []
+        summary = {
+            "type": "summary",
             "query": query,
             "query_words": query_words,
             "search_mode": mode,
-            "total_sites": len(results),
-            "total_images": sum(len(r["images"]) for r in results),
+            "total_sites": total_sites,
+            "total_images": total_images,
             "methods_count": methods_count,
-            "results": results,
             "suggestions": suggestions,
+            "timed_out_sites": timed_out_sites,
+        }
+        yield json.dumps(summary) + "\n"
+
+    return Response(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
+def build_image_index():
+    """Indexe (une fois par version du cache HTML) les images des pages de SITES"""
+    sites = list(SITES)
+    pages = html_cache.load_many(site["url"] for site in sites)
+    image_index.build(
+        {url: page for url, page in pages.items() if not isinstance(page, Exception)},
+        html_cache.version,
+    )
+    print(f"🖼️ Index d'images construit: {len(image_index)} images")
+
+
+@app.route("/api/search/image", methods=["POST"])
+def search_image():
+    """
+    Recherche par l'exemple : images des sites les plus proches (DCT)
+    de l'image envoyée (champ multipart "image", ou corps brut)
+    """
+    fichier = request.files.get("image")
+    data = fichier.read() if fichier else request.get_data()
+    if not data:
+        return jsonify({"error": "Veuillez envoyer une image", "results": []}), 400
+
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), MAX_LIMIT)
+    except ValueError:
+        limit = 10
+
+    # Cache HTML modifié depuis la construction : reconstruction en
+    # arrière-plan, les recherches utilisent l'ancienne matrice en attendant
+    if not image_index.building and (
+        not image_index.ready or image_index.version != html_cache.version
+    ):
+        threading.Thread(target=build_image_index, daemon=True).start()
+    if not image_index.ready:
+        return (
+            jsonify({"error": "Index d'images en construction", "results": []}),
+            503,
+            {"Retry-After": "2"},
+        )
+
+    start_time = time.perf_counter()
+    try:
+        results = image_index.search(data, limit)
+    except (OSError, ValueError):  # ValueError : aussi pour une image trop grande
+        return jsonify({"error": "Image invalide", "results": []}), 400
+
+    for result in results:
+        site = sites_by_url.get(result["page_url"])
+        result["site_name"] = site["name"] if site else result["page_url"]
+        result["site_emoji"] = site["emoji"] if site else "🔗"
+
+    return jsonify(
+        {
+            "results": results,
+            "total_indexed": len(image_index),
+            "search_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
         }
     )
 
 
+def site_for_url(url):
+    """Site de départ dont le dossier contient l'URL (ou None)"""
+    for site in SEED_SITES:
+        if url.startswith(site["url"].rsplit("/", 1)[0] + "/"):
+            return site
+    return None
+
+
+# Pages trouvées par le crawler, ajoutées au cache HTML par lots de
+# CRAWL_BATCH : une seule nouvelle version du cache (et donc une seule
+# reconstruction des index) par lot au lieu d'une par page
+CRAWL_BATCH = 200
+crawl_pending = []
+crawl_pending_lock = threading.Lock()
+
+
+def register_page(url, html_content):
+    """Met de côté une page trouvée par le crawler (ajoutée au prochain lot)"""
+    # Analyse hors verrou
+    title = BeautifulSoup(html_content, "html.parser").find("title")
+    name = title.get_text().strip() if title else url
+    with crawl_pending_lock:
+        crawl_pending.append((url, html_content, name))
+        lot = None
+        if len(crawl_pending) >= CRAWL_BATCH:
+            lot = crawl_pending[:]
+            crawl_pending.clear()
+    if lot:
+        flush_crawl_batch(lot)
+
+
+def flush_crawl_batch(lot=None):
+    """Ajoute un lot de pages du crawler au cache HTML et à la liste des sites"""
+    global next_site_id
+    if lot is None:
+        with crawl_pending_lock:
+            lot = crawl_pending[:]
+            crawl_pending.clear()
+    if not lot:
+        return
+    html_cache.put_many({url: html_content for url, html_content, _ in lot})
+    with sites_lock:
+        for url, _, name in lot:
+            if url in sites_by_url:
+                continue
+            parent = site_for_url(url)
+            nouveau = {
+                "id": next_site_id,
+                "url": url,
+                "name": name,
+                "emoji": parent["emoji"] if parent else "🔗",
+            }
+            next_site_id += 1
+            sites_by_url[url] = nouveau
+            SITES.append(nouveau)
+
+
+crawler = Crawler(fetcher, on_page=register_page)
+# Un seul crawl à la fois (pris sans attendre par /api/crawl)
+crawl_lock = threading.Lock()
+
+
+def run_crawl(seeds=None):
+    """Crawl depuis `seeds` (URLs), ou depuis les sites de départ ; libère crawl_lock"""
+    try:
+        stats = crawler.crawl(seeds or [site["url"] for site in SEED_SITES])
+        flush_crawl_batch()
+        print(f"🕷️ Crawl terminé: {stats} - {len(SITES)} sites")
+    finally:
+        crawl_lock.release()
+
+
+@app.route("/api/crawl", methods=["GET", "POST"])
+def crawl():
+    """
+    POST : lance un crawl incrémental en arrière-plan, depuis les URLs
+    {"seeds": [...]} du corps JSON (par défaut les sites de départ) ;
+    GET : état du crawler
+    """
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        seeds = body.get("seeds") if isinstance(body, dict) else None
+        if seeds is not None and (
+            not isinstance(seeds, list) or not all(isinstance(u, str) for u in seeds)
+        ):
+            return jsonify({"error": "seeds doit être une liste d'URLs"}), 400
+        if crawl_lock.acquire(blocking=False):
+            crawler.running = True
+            threading.Thread(target=run_crawl, args=(seeds,), daemon=True).start()
+    return jsonify(
+        {"running": crawler.running, "stats": crawler.stats, "total_sites": len(SITES)}
+    )
+
+
+@app.route("/api/suggest", methods=["GET"])
+def suggest():
+    """Autocomplétion : mots du vocabulaire commençant par `prefix`"""
+    prefix = fold_accents(request.args.get("prefix", "").strip())
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    if not prefix:
+        return jsonify({"prefix": prefix, "suggestions": []})
+
+    debut = time.perf_counter()
+    words_cache = all_words_cache
+    WORD_CACHE_REQUESTS.inc("hit" if words_cache else "miss")
+    suggestions = [
+        {"word": word, "df": df} for word, df in words_cache.complete(prefix, limit)
+    ]
+    SUGGESTION_TIME.observe(time.perf_counter() - debut, "prefix")
+    return jsonify({"prefix": prefix, "suggestions": suggestions})
+
+
 @app.route("/api/health", methods=["GET"])
 def health():
     return jsonify(
@@ -386,39 +913,104 @@ def health():
             "message": "API du moteur de recherche opérationnelle",
             "cache_words": len(all_words_cache),
             "cache_pages": len(html_cache),
+            "cache_bytes": html_cache.total_bytes,
+            "response_cache": response_cache.stats(),
+            "image_index": image_index.stats(),
         }
     )
 
 
+@app.before_request
+def start_timer():
+    # Dans l'environ WSGI plutôt que `g` : chaque accès à un proxy Flask coûte ~1 µs
+    request.environ["iri.request_start"] = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    # Réponses en flux (/api/search/stream) : mesuré jusqu'au début de l'envoi
+    req = request._get_current_object()
+    debut = req.environ.get("iri.request_start")
+    if debut is not None:
+        # Motif de la route (borné) plutôt que l'URL ; "<inconnue>" pour les 404
+        route = req.url_rule.rule if req.url_rule else "<inconnue>"
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - debut, route, req.method, str(response.status_code)
+        )
+    return response
+
+
+metrics.collect(
+    "iri_html_cache_requests_total",
+    "counter",
+    "Lectures du cache HTML (miss = page à télécharger)",
+    lambda: {("result", "hit"): html_cache.hits, ("result", "miss"): html_cache.misses},
+)
+metrics.collect(
+    "iri_response_cache_requests_total",
+    "counter",
+    "Lectures du cache des réponses de /api/search",
+    lambda: {
+        ("result", "hit"): response_cache.hits,
+        ("result", "miss"): response_cache.misses,
+    },
+)
+metrics.collect("iri_html_cache_pages", "gauge", "Pages dans le cache HTML", lambda: len(html_cache))
+metrics.collect(
+    "iri_html_cache_bytes", "gauge", "Octets de HTML en cache", lambda: html_cache.total_bytes
+)
+metrics.collect(
+    "iri_word_cache_words", "gauge", "Mots du vocabulaire", lambda: len(all_words_cache)
+)
+metrics.collect("iri_image_index_images", "gauge", "Images indexées", lambda: len(image_index))
+metrics.collect("iri_sites", "gauge", "Sites interrogés par les recherches", lambda: len(SITES))
+
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Métriques au format texte Prometheus"""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+
 @app.route("/api/clear-cache", methods=["POST"])
 def clear_cache():
-    """Vide les caches et les reconstruit"""
-    global html_cache, all_words_cache
-    html_cache = {}
-    all_words_cache = set()
-    preload_caches()
-    return jsonify({"status": "ok", "message": "Caches vidés et reconstruits"})
+    """Vide les caches et les reconstruit en arrière-plan"""
+    global all_words_cache
+    html_cache.clear()
+    response_cache.clear()
+    all_words_cache = Vocabulary()
+    threading.Thread(target=preload_caches, daemon=True).start()
+    return jsonify({"status": "ok", "message": "Caches vidés, reconstruction lancée"})
+
 
+def preload_caches(images=True):
+    """
+    Pré-charge les pages HTML et le cache de mots au démarrage
 
-def preload_caches():
-    """Pré-charge les pages HTML et le cache de mots au démarrage"""
-    global html_cache, all_words_cache
+    Args:
+        images (bool): Construire aussi l'index DCT des images
+    """
     print(" Pré-chargement des caches...")
 
-    # Pré-charger toutes les pages HTML
-    for site in SITES:
-        try:
-            response = requests.get(site["url"], timeout=5)
-            response.raise_for_status()
-            html_cache[site["url"]] = response.text
+    # Pré-charger toutes les pages HTML en parallèle
+    sites = list(SITES)
+    pages = html_cache.load_many(site["url"] for site in sites)
+    for site in sites:
+        page = pages[site["url"]]
+        if isinstance(page, Exception):
+            print(f"   {site['name']} - Erreur: {page}")
+        else:
             print(f"   {site['name']} chargé")
-        except Exception as e:
-            print(f"   {site['name']} - Erreur: {e}")
 
-    # Construire le cache de mots
+    # Construire le cache de mots et l'index de classement
     build_words_cache()
+    get_search_index()
     print(f" Caches prêts! {len(html_cache)} pages, {len(all_words_cache)} mots")
 
+    # Index DCT des images (téléchargement de toutes les images des sites)
+    if images:
+        build_image_index()
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,114 @@
+"""
+Benchmark de la collecte des métriques
+=======================================
+
+Mesure le coût ajouté par /api/metrics sur le chemin des requêtes :
+- Histogram.observe et Counter.inc (un thread, puis N threads en concurrence)
+- before_request + after_request de Flask (client de test, route /api/sites),
+  comparé à la même route sans les deux fonctions de mesure
+- Export complet (render) avec beaucoup de séries
+
+Utilisation :
+    python bench_metrics.py --iterations 200000 --threads 8
+"""
+
+import argparse
+import threading
+import time
+
+from metrics import Registry
+
+
+def par_appel(fonction, iterations):
+    """Durée moyenne d'un appel, en nanosecondes"""
+    debut = time.perf_counter()
+    for _ in range(iterations):
+        fonction()
+    return (time.perf_counter() - debut) / iterations * 1e9
+
+
+def en_concurrence(fonction, iterations, nb_threads):
+    """Durée moyenne d'un appel quand nb_threads appellent en même temps (ns)"""
+    depart = threading.Barrier(nb_threads + 1)
+
+    def boucle():
+        depart.wait()
+        for _ in range(iterations):
+            fonction()
+
+    threads = [threading.Thread(target=boucle) for _ in range(nb_threads)]
+    for t in threads:
+        t.start()
+    depart.wait()
+    debut = time.perf_counter()
+    for t in threads:
+        t.join()
+    return (time.perf_counter() - debut) / (iterations * nb_threads) * 1e9
+
+
+def mesurer_flask(iterations):
+    """Latence de /api/sites (client de test) avec et sans les hooks de mesure"""
+    import app as backend
+
+    client = backend.app.test_client()
+    requete = lambda: client.get("/api/sites")  # noqa: E731
+    par_appel(requete, iterations // 10)  # Échauffement
+
+    hooks_avant = backend.app.before_request_funcs[None]
+    hooks_apres = backend.app.after_request_funcs[None]
+    sans_avant = [f for f in hooks_avant if f is not backend.start_timer]
+    sans_apres = [f for f in hooks_apres if f is not backend.record_request]
+
+    # Tours alternés, meilleur tour de chaque configuration (moins de bruit)
+    avec, sans = [], []
+    try:
+        for _ in range(5):
+            avec.append(par_appel(requete, iterations // 5))
+            backend.app.before_request_funcs[None] = sans_avant
+            backend.app.after_request_funcs[None] = sans_apres
+            sans.append(par_appel(requete, iterations // 5))
+            backend.app.before_request_funcs[None] = hooks_avant
+            backend.app.after_request_funcs[None] = hooks_apres
+    finally:
+        backend.app.before_request_funcs[None] = hooks_avant
+        backend.app.after_request_funcs[None] = hooks_apres
+    return min(avec), min(sans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des métriques")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    registry = Registry()
+    histogram = registry.histogram("bench_seconds", "bench", ["route"])
+    counter = registry.counter("bench_total", "bench", ["result"])
+
+    print(f"observe            : {par_appel(lambda: histogram.observe(0.012, '/api/search'), args.iterations):7.0f} ns")
+    print(f"inc                : {par_appel(lambda: counter.inc('hit'), args.iterations):7.0f} ns")
+    n = args.iterations // args.threads
+    print(
+        f"observe x{args.threads:<2} threads : "
+        f"{en_concurrence(lambda: histogram.observe(0.012, '/api/search'), n, args.threads):7.0f} ns"
+    )
+
+    for i in range(500):
+        histogram.observe(i / 1000, f"/route/{i}")
+    debut = time.perf_counter()
+    texte = registry.render()
+    print(
+        f"render (500 séries) : {(time.perf_counter() - debut) * 1000:6.2f} ms"
+        f" ({len(texte) / 1024:.0f} Ko)"
+    )
+
+    avec, sans = mesurer_flask(args.requests)
+    print(
+        f"/api/sites         : {avec / 1000:7.1f} µs avec mesure,"
+        f" {sans / 1000:.1f} µs sans ({avec - sans:+.0f} ns)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark de la tokenisation
+=============================
+
+Mesure le débit (Mo/s de HTML) de l'extraction des mots d'une page :
+- "ancien" : find_all par type de balise + split + nettoyage caractère par caractère
+- "nouveau" : un seul parcours (html_fields) + tokenize (regex précompilée)
+- "tokenize seul" : tokenisation du texte brut, sans l'analyse HTML
+
+Utilisation :
+    python bench_tokenizer.py --repeat 20
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+from tokenizer import html_fields, tokenize
+
+SITES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "sites_test"
+)
+
+
+def ancien(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    words = set()
+    title = soup.find("title")
+    if title:
+        words.update(title.get_text().lower().split())
+    for img in soup.find_all("img"):
+        words.update(img.get("alt", "").lower().split())
+    for p in soup.find_all("p"):
+        words.update(p.get_text().lower().split())
+    for tag in soup.find_all(["h1", "h2", "h3"]):
+        words.update(tag.get_text().lower().split())
+    return {c for c in ("".join(ch for ch in w if ch.isalnum()) for w in words) if len(c) >= 3}
+
+
+def nouveau(html_content):
+    fields = html_fields(BeautifulSoup(html_content, "html.parser"))
+    texts = [fields["title"], *(alt for _, alt in fields["images"])]
+    texts.extend(fields["paragraphs"])
+    texts.extend(fields["headings"])
+    return set(tokenize("\n".join(texts), stem=False, min_length=3))
+
+
+def mesurer(nom, fonction, pages, repeat):
+    taille = sum(len(p.encode("utf-8")) for p in pages) * repeat
+    debut = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            fonction(page)
+    duree = time.perf_counter() - debut
+    print(f"{nom:<15}: {taille / duree / 1e6:8.2f} Mo/s ({duree:.2f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la tokenisation")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = []
+    for chemin in sorted(glob.glob(os.path.join(SITES_DIR, "site*", "index.html"))):
+        with open(chemin, encoding="utf-8") as f:
+            pages.append(f.read())
+    if not pages:
+        print(f"Aucune page trouvée dans {SITES_DIR}")
+        return
+
+    textes = [BeautifulSoup(p, "html.parser").get_text() for p in pages]
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / 1e3:.0f} Ko de HTML")
+    mesurer("ancien", ancien, pages, args.repeat)
+    mesurer("nouveau", nouveau, pages, args.repeat)
+    mesurer("tokenize seul", tokenize, textes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Module : Crawler incrémental
+=============================
+
+Découvre les pages accessibles depuis les sites de départ en suivant
+les liens <a href>, au-delà des seules pages index.html :
+- File d'attente (frontière) parcourue par plusieurs threads
+- Politesse par hôte : nombre de requêtes simultanées et délai minimum
+- URLs normalisées et dédoublonnées par un filtre de Bloom
+- Re-crawl incrémental : une page dont l'empreinte (SHA-1) n'a pas
+  changé n'est pas retransmise à l'index
+"""
+
+import hashlib
+import math
+import queue
+import threading
+import time
+import urllib.parse
+
+from bs4 import BeautifulSoup
+
+# Nombre de threads du crawler
+MAX_WORKERS = 16
+# Requêtes simultanées maximum vers un même hôte
+PER_HOST_CONCURRENCY = 4
+# Délai minimum entre deux requêtes vers un même hôte (en secondes)
+PER_HOST_DELAY = 0.0
+# Nombre maximum de pages par crawl
+MAX_PAGES = 10000
+
+
+def normalize_url(url, base=None):
+    """
+    Normalise une URL pour la déduplication
+
+    - Résout les chemins relatifs par rapport à `base`
+    - Schéma et hôte en minuscules, port par défaut supprimé
+    - Fragment (#...) supprimé, chemin vide remplacé par "/"
+
+    Returns:
+        str: URL normalisée, ou None si ce n'est pas une URL http(s)
+    """
+    if base:
+        url = urllib.parse.urljoin(base, url)
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        return None
+
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not (scheme == "http" and port == 80 or scheme == "https" and port == 443):
+        host = f"{host}:{port}"
+
+    return urllib.parse.urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+class BloomFilter:
+    """
+    Ensemble probabiliste compact (pas de faux négatifs)
+
+    Sert à mémoriser les URLs déjà vues avec quelques bits par URL
+    au lieu d'un set de chaînes.
+    """
+
+    def __init__(self, capacity=MAX_PAGES * 10, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.nb_hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.nb_hashes)]
+
+    def add(self, item):
+        """Ajoute un élément ; renvoie True s'il était (probablement) déjà présent"""
+        present = True
+        for pos in self._positions(item):
+            octet, bit = divmod(pos, 8)
+            if not self.bits[octet] & (1 << bit):
+                present = False
+                self.bits[octet] |= 1 << bit
+        return present
+
+    def __contains__(self, item):
+        return all(
+            self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item)
+        )
+
+
+class HostLimiter:
+    """Limite le nombre de requêtes simultanées et leur fréquence par hôte"""
+
+    def __init__(self, concurrency=PER_HOST_CONCURRENCY, delay=PER_HOST_DELAY):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._semaphores = {}
+        self._next_time = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        with self._lock:
+            semaphore = self._semaphores.setdefault(
+                host, threading.Semaphore(self.concurrency)
+            )
+        semaphore.acquire()
+        if self.delay:
+            with self._lock:
+                maintenant = time.monotonic()
+                depart = max(maintenant, self._next_time.get(host, 0.0))
+                self._next_time[host] = depart + self.delay
+            time.sleep(depart - maintenant)
+
+    def release(self, host):
+        self._semaphores[host].release()
+
+
+class Crawler:
+    """
+    Crawler multi-thread limité aux hôtes des URLs de départ
+
+    Args:
+        fetcher: PageFetcher utilisé pour les téléchargements
+        on_page: Fonction appelée avec (url, html) pour chaque page nouvelle
+            ou modifiée
+    """
+
+    def __init__(
+        self,
+        fetcher,
+        on_page,
+        max_workers=MAX_WORKERS,
+        max_pages=MAX_PAGES,
+        per_host_concurrency=PER_HOST_CONCURRENCY,
+        per_host_delay=PER_HOST_DELAY,
+    ):
+        self.fetcher = fetcher
+        self.on_page = on_page
+        self.max_workers = max_workers
+        self.max_pages = max_pages
+        self.limiter = HostLimiter(per_host_concurrency, per_host_delay)
+        self.content_hashes = {}  # {url: empreinte SHA-1 du HTML}
+        self.running = False
+        self.stats = {"fetched": 0, "new": 0, "changed": 0, "unchanged": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def _extraire_liens(self, url, html_content):
+        soup = BeautifulSoup(html_content, "html.parser")
+        for a in soup.find_all("a", href=True):
+            lien = normalize_url(a["href"], base=url)
+            if lien:
+                yield lien
+
+    def _traiter(self, url, html_content):
+        empreinte = hashlib.sha1(html_content.encode("utf-8")).hexdigest()
+        with self._lock:
+            ancienne = self.content_hashes.get(url)
+            self.content_hashes[url] = empreinte
+            if ancienne == empreinte:
+                self.stats["unchanged"] += 1
+                return
+            self.stats["changed" if ancienne else "new"] += 1
+        self.on_page(url, html_content)
+
+    def crawl(self, seeds):
+        """
+        Parcourt les pages accessibles depuis `seeds` (bloquant)
+
+        Les pages déjà vues lors d'un crawl précédent sont re-téléchargées,
+        mais seules les pages nouvelles ou modifiées sont transmises à on_page.
+        """
+        seeds = [u for u in (normalize_url(s) for s in seeds) if u]
+        hotes = {urllib.parse.urlsplit(u).netloc for u in seeds}
+        vus = BloomFilter(capacity=max(self.max_pages * 10, 1000))
+        frontiere = queue.Queue()
+        compteur = {"planifiees": 0}
+
+        def planifier(url):
+            if urllib.parse.urlsplit(url).netloc not in hotes:
+                return
+            with self._lock:
+                if compteur["planifiees"] >= self.max_pages or vus.add(url):
+                    return
+                compteur["planifiees"] += 1
+            frontiere.put(url)
+
+        def worker():
+            while True:
+                url = frontiere.get()
+                if url is None:
+                    frontiere.task_done()
+                    return
+                hote = urllib.parse.urlsplit(url).netloc
+                try:
+                    self.limiter.acquire(hote)
+                    try:
+                        response = self.fetcher.submit(url).result()
+                    finally:
+                        self.limiter.release(hote)
+                    with self._lock:
+                        self.stats["fetched"] += 1
+                    if "html" in response.headers.get("Content-Type", "text/html"):
+                        html_content = response.text
+                        for lien in self._extraire_liens(url, html_content):
+                            planifier(lien)
+                        self._traiter(url, html_content)
+                except Exception:
+                    with self._lock:
+                        self.stats["errors"] += 1
+                finally:
+                    frontiere.task_done()
+
+        self.running = True
+        self.stats = dict.fromkeys(self.stats, 0)
+        try:
+            for url in seeds:
+                planifier(url)
+            threads = [
+                threading.Thread(target=worker, daemon=True)
+                for _ in range(self.max_workers)
+            ]
+            for t in threads:
+                t.start()
+            frontiere.join()
+            for _ in threads:
+                frontiere.put(None)
+            for t in threads:
+                t.join()
+        finally:
+            self.running = False
+        return self.stats
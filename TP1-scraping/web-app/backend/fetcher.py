@@ -0,0 +1,106 @@
+"""
+Module : Couche de téléchargement des pages HTML
+=================================================
+
+Ce module regroupe tous les accès réseau du backend :
+- Une session HTTP partagée (connexions keep-alive réutilisées)
+- Un pool de threads borné pour télécharger plusieurs pages en parallèle
+- Une déduplication des requêtes en cours (une seule requête par URL)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Nombre maximum de téléchargements simultanés
+MAX_WORKERS = 32
+# Timeout (connexion, lecture) en secondes
+TIMEOUT = (3, 10)
+
+
+def _creer_session(pool_size):
+    """Crée une session HTTP avec un pool de connexions dimensionné"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class PageFetcher:
+    """
+    Télécharge des pages HTML avec une session partagée
+
+    Les requêtes concurrentes vers la même URL sont fusionnées :
+    le deuxième appelant attend le résultat du premier au lieu
+    de relancer un téléchargement.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, timeout=TIMEOUT):
+        self.timeout = timeout
+        self.session = _creer_session(max_workers)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fetch"
+        )
+        self._en_cours = {}  # {url: Future}
+        self._lock = threading.Lock()
+
+    def _telecharger(self, url, headers):
+        response = self.session.get(url, timeout=self.timeout, headers=headers)
+        response.raise_for_status()
+        if "charset" not in response.headers.get("Content-Type", "").lower():
+            # Sans charset, requests suppose ISO-8859-1 : les pages sont en UTF-8
+            response.encoding = "utf-8"
+        return response
+
+    def _liberer(self, cle, future):
+        with self._lock:
+            if self._en_cours.get(cle) is future:
+                del self._en_cours[cle]
+
+    def submit(self, url, headers=None):
+        """
+        Lance (ou rejoint) le téléchargement d'une URL
+
+        Args:
+            url (str): URL de la page
+            headers (dict): En-têtes supplémentaires (ex: If-None-Match)
+
+        Returns:
+            Future: Future dont le résultat est la `requests.Response`
+        """
+        cle = (url, tuple(sorted(headers.items())) if headers else ())
+        with self._lock:
+            future = self._en_cours.get(cle)
+            if future is not None:
+                return future
+            future = self.executor.submit(self._telecharger, url, headers)
+            self._en_cours[cle] = future
+        future.add_done_callback(lambda f: self._liberer(cle, f))
+        return future
+
+    def fetch(self, url):
+        """Télécharge une page (bloquant) et renvoie son texte"""
+        return self.submit(url).result().text
+
+    def fetch_many(self, urls):
+        """
+        Télécharge plusieurs pages en parallèle
+
+        Returns:
+            dict: {url: texte HTML ou Exception}
+        """
+        futures = {url: self.submit(url) for url in dict.fromkeys(urls)}
+        resultats = {}
+        for url, future in futures.items():
+            try:
+                resultats[url] = future.result().text
+            except Exception as e:
+                resultats[url] = e
+        return resultats
+
+
+# Instance partagée par tout le backend
+fetcher = PageFetcher()
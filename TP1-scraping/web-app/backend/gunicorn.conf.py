@@ -0,0 +1,22 @@
+"""
+Configuration gunicorn du backend (Linux / macOS)
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = "0.0.0.0:5000"
+workers = multiprocessing.cpu_count()
+threads = 4
+timeout = 30
+
+
+def on_starting(server):
+    """Construit l'instantané une seule fois, avant de lancer les workers"""
+    # Dans un sous-processus : le maître ne doit pas démarrer de threads avant le fork
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wsgi.py")
+    subprocess.run([sys.executable, script, "build"], check=True)
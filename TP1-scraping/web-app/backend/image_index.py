@@ -0,0 +1,230 @@
+"""
+Module : Recherche d'images par l'exemple (DCT)
+================================================
+
+Index des caractéristiques DCT (dct_engine.ImageFeatureExtractor) de
+toutes les images référencées par les pages des sites :
+- Construit en arrière-plan (téléchargements parallèles via le fetcher
+  partagé), puis mis à jour quand les pages changent : une image déjà
+  indexée est revalidée avec ses validateurs HTTP (ETag,
+  Last-Modified) et sa ligne est reprise telle quelle sur un 304 ;
+  seules les images nouvelles ou modifiées sont téléchargées et décodées
+- Exportable dans l'instantané (snapshot.py) : les workers projettent la
+  matrice construite une seule fois au lieu de la reconstruire chacun
+- Stocké dans une seule matrice numpy (une ligne normalisée par image) :
+  une requête = un produit matrice-vecteur pour la similarité cosinus
+- Images décodées à résolution réduite (draft() : le JPEG est décodé
+  directement à 1/2, 1/4 ou 1/8 de sa taille) puis ramenées à
+  INDEX_SIZE x INDEX_SIZE pour que tous les vecteurs aient la même taille
+"""
+
+import io
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import as_completed
+from pathlib import Path
+
+import numpy as np
+from bs4 import BeautifulSoup
+from PIL import Image
+
+from tokenizer import html_fields
+
+# dct_engine.py se trouve à la racine du dépôt
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from dct_engine import ImageFeatureExtractor  # noqa: E402
+
+# Côté (en pixels) des images avant extraction : 16x16 blocs de 8x8
+INDEX_SIZE = 128
+
+
+def decode_image(data, size=INDEX_SIZE):
+    """
+    Décode une image en niveaux de gris à résolution réduite
+
+    Returns:
+        numpy.ndarray: Image size x size (uint8)
+
+    Raises:
+        OSError: Données illisibles ou format inconnu
+        ValueError: Image invalide, ou trop grande (bombe de décompression :
+            plus de 2 x Image.MAX_IMAGE_PIXELS pixels)
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("L", (size, size))
+            img = img.convert("L").resize((size, size), Image.Resampling.BILINEAR)
+    except Image.DecompressionBombError as e:
+        raise ValueError(str(e)) from e
+    return np.asarray(img)
+
+
+class ImageIndex:
+    """Matrice des caractéristiques DCT des images des sites"""
+
+    def __init__(self, fetcher, size=INDEX_SIZE):
+        self.fetcher = fetcher
+        self.size = size
+        self.extracteur = ImageFeatureExtractor(block_size=8)
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.entries = []  # [{"src", "page_url", "alt"}], une par ligne
+        self.validators = {}  # {src: (ETag, Last-Modified)} de chaque image indexée
+        self.version = None
+        self.ready = False
+        self.building = False
+        self.errors = 0
+        self.reused = 0  # Images reprises sans téléchargement (304) à la dernière construction
+        self.build_time = 0.0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def features(self, gray):
+        """Vecteur DCT normalisé (norme 1) d'une image en niveaux de gris"""
+        features = self.extracteur.extraire_caracteristiques(gray).astype(np.float32)
+        norme = np.linalg.norm(features)
+        return features / norme if norme else features
+
+    def load(self, matrix, entries, validators, version):
+        """
+        Installe un index déjà construit (par exemple projeté depuis l'instantané)
+
+        Args:
+            matrix (numpy.ndarray): Lignes normalisées (float32), lecture seule possible
+            entries (list): Entrée de chaque ligne
+            validators (dict): {src: (ETag, Last-Modified)}
+            version: Version du cache HTML correspondante
+        """
+        with self._lock:
+            self.matrix, self.entries = matrix, entries
+            self.validators = validators
+            self.version = version
+            self.ready = True
+
+    def export(self):
+        """Renvoie (matrice, entrées, validateurs) cohérents entre eux"""
+        with self._lock:
+            return self.matrix, self.entries, self.validators
+
+    def build(self, pages, version=None):
+        """
+        Indexe toutes les images référencées par `pages` (bloquant)
+
+        Args:
+            pages (dict): {url de la page: HTML}
+            version: Version du cache HTML ; rien n'est refait si elle n'a pas changé
+        """
+        # Une seule construction à la fois ; les appels suivants attendent
+        # puis ne refont rien si la version est déjà indexée
+        with self._build_lock:
+            if self.ready and version is not None and version == self.version:
+                return
+            self._build(pages, version)
+
+    def _build(self, pages, version):
+        self.building = True
+        debut = time.perf_counter()
+        try:
+            # Une entrée par image (URL absolue), avec la première page qui la cite
+            images = {}
+            for page_url, html_content in pages.items():
+                fields = html_fields(BeautifulSoup(html_content, "html.parser"))
+                for src, alt in fields["images"]:
+                    if src:
+                        src = urllib.parse.urljoin(page_url, src)
+                        images.setdefault(
+                            src, {"src": src, "page_url": page_url, "alt": alt or "Image"}
+                        )
+
+            # Images déjà indexées : requête conditionnelle, ligne reprise sur 304
+            matrix, anciennes, validateurs = self.export()
+            lignes_connues = {entry["src"]: i for i, entry in enumerate(anciennes)}
+            futures = {}
+            for src in images:
+                headers = {}
+                if src in lignes_connues:
+                    etag, last_modified = validateurs.get(src, (None, None))
+                    if etag:
+                        headers["If-None-Match"] = etag
+                    if last_modified:
+                        headers["If-Modified-Since"] = last_modified
+                futures[self.fetcher.submit(src, headers or None)] = src
+
+            lignes, entries, nouveaux_validateurs = [], [], {}
+            erreurs = reprises = 0
+            for future in as_completed(futures):
+                src = futures[future]
+                try:
+                    response = future.result()
+                    if response.status_code == 304 and src in lignes_connues:
+                        lignes.append(matrix[lignes_connues[src]])
+                        nouveaux_validateurs[src] = validateurs[src]
+                        reprises += 1
+                    else:
+                        gray = decode_image(response.content, self.size)
+                        lignes.append(self.features(gray))
+                        nouveaux_validateurs[src] = (
+                            response.headers.get("ETag"),
+                            response.headers.get("Last-Modified"),
+                        )
+                    entries.append(images[src])
+                except Exception:
+                    erreurs += 1
+
+            matrix = (
+                np.vstack(lignes) if lignes else np.zeros((0, 0), dtype=np.float32)
+            )
+            # Remplacement atomique : les recherches en cours gardent l'ancienne matrice
+            with self._lock:
+                self.matrix, self.entries = matrix, entries
+                self.validators = nouveaux_validateurs
+                self.version = version
+                self.errors = erreurs
+                self.reused = reprises
+                self.ready = True
+        finally:
+            self.building = False
+            self.build_time = time.perf_counter() - debut
+
+    def search(self, data, top_k=10):
+        """
+        Recherche les images les plus proches d'une image envoyée
+
+        Args:
+            data (bytes): Contenu du fichier image
+            top_k (int): Nombre de résultats
+
+        Returns:
+            list: Liste de dicts (src, page_url, alt, similarite), du plus au moins similaire
+        """
+        requete = self.features(decode_image(data, self.size))
+        with self._lock:
+            matrix, entries = self.matrix, self.entries
+        if not entries:
+            return []
+
+        similarites = matrix @ requete
+        top_k = min(top_k, len(entries))
+        meilleurs = np.argpartition(-similarites, top_k - 1)[:top_k]
+        meilleurs = meilleurs[np.argsort(-similarites[meilleurs])]
+        return [
+            {**entries[i], "similarite": round(float(similarites[i]), 4)}
+            for i in meilleurs
+        ]
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "building": self.building,
+            "images": len(self),
+            "errors": self.errors,
+            "reused": self.reused,
+            "build_time_ms": round(self.build_time * 1000, 1),
+        }
@@ -0,0 +1,73 @@
+"""
+Test de charge du backend
+==========================
+
+Envoie des requêtes concurrentes à l'API et affiche le débit (req/s)
+et les percentiles de latence.
+
+Utilisation :
+    python load_test.py --url http://localhost:5000 --requests 2000 --concurrency 32
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+QUERIES = ["chat", "voiture", "nature", "pizza", "chat noir", "espace fusee", "musique"]
+
+
+def percentile(valeurs, p):
+    """Percentile p (0-100) d'une liste triée"""
+    if not valeurs:
+        return 0.0
+    k = min(len(valeurs) - 1, int(round(p / 100 * (len(valeurs) - 1))))
+    return valeurs[k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de /api/search")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--path", default="/api/search")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    local = threading.local()
+
+    def requete(_):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        params = {"q": random.choice(QUERIES), "mode": "OR"}
+        debut = time.perf_counter()
+        try:
+            ok = local.session.get(args.url + args.path, params=params, timeout=30).ok
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - debut, ok
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        mesures = list(executor.map(requete, range(args.requests)))
+    duree = time.perf_counter() - debut
+
+    latences = sorted(latence * 1000 for latence, ok in mesures if ok)
+    erreurs = sum(1 for _, ok in mesures if not ok)
+
+    print("=" * 50)
+    print(f"Requêtes    : {args.requests} ({erreurs} erreurs)")
+    print(f"Concurrence : {args.concurrency}")
+    print(f"Durée       : {duree:.2f} s")
+    print(f"Débit       : {len(latences) / duree:.1f} req/s")
+    for p in (50, 90, 99):
+        print(f"p{p:<10} : {percentile(latences, p):.1f} ms")
+    if latences:
+        print(f"max         : {latences[-1]:.1f} ms")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Module : Métriques au format Prometheus
+========================================
+
+Compteurs et histogrammes minimaux (sans dépendance) pour /api/metrics :
+- Counter   : valeur qui ne fait qu'augmenter, par combinaison d'étiquettes
+- Histogram : seaux cumulés (le="..."), somme et nombre d'observations
+- Les valeurs déjà tenues ailleurs (hits/misses des caches...) sont lues
+  au moment de l'export par des fonctions enregistrées avec `collect`,
+  sans aucun coût sur le chemin des requêtes
+
+Une observation = une recherche dichotomique dans les bornes et deux
+additions sous un verrou propre à la métrique (voir bench_metrics.py).
+Avec gunicorn, chaque worker a ses propres métriques.
+"""
+
+import threading
+from bisect import bisect_left
+
+# Bornes par défaut (secondes) : de 1 ms à 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    paires = [f'{n}="{_echapper(v)}"' for n, v in zip(names, values)]
+    paires.extend(f'{n}="{v}"' for n, v in extra)
+    return "{" + ",".join(paires) + "}" if paires else ""
+
+
+def format_value(valeur):
+    if valeur == float("inf"):
+        return "+Inf"
+    if isinstance(valeur, float) and valeur.is_integer():
+        return str(int(valeur))
+    return repr(valeur) if isinstance(valeur, float) else str(valeur)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # {valeurs des étiquettes: total}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lignes = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            valeurs = sorted(self._values.items())
+        for labels, valeur in valeurs:
+            lignes.append(
+                f"{self.name}{format_labels(self.labelnames, labels)} {format_value(valeur)}"
+            )
+        return lignes
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # {valeurs des étiquettes: [compte par seau..., +Inf, somme]}
+        self._lock = threading.Lock()
+
+    def observe(self, valeur, *labels):
+        # Seau = première borne >= valeur (le dernier est +Inf)
+        i = bisect_left(self.buckets, valeur)
+        with self._lock:
+            serie = self._series.get(labels)
+            if serie is None:
+                serie = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            serie[i] += 1
+            serie[-1] += valeur
+
+    def render(self):
+        lignes = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(serie)) for labels, serie in self._series.items())
+        bornes = [format_value(b) for b in self.buckets] + ["+Inf"]
+        for labels, serie in series:
+            cumul = 0
+            for borne, n in zip(bornes, serie):
+                cumul += n
+                etiquettes = format_labels(self.labelnames, labels, [("le", borne)])
+                lignes.append(f"{self.name}_bucket{etiquettes} {cumul}")
+            etiquettes = format_labels(self.labelnames, labels)
+            lignes.append(f"{self.name}_sum{etiquettes} {format_value(serie[-1])}")
+            lignes.append(f"{self.name}_count{etiquettes} {cumul}")
+        return lignes
+
+
+class Registry:
+    """Ensemble des métriques exportées par /api/metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collect(self, name, kind, documentation, fonction):
+        """
+        Métrique lue à l'export : `fonction()` renvoie une valeur,
+        ou un dict {(étiquette, valeur): valeur} pour une seule étiquette
+        """
+        self._collectors.append((name, kind, documentation, fonction))
+
+    def render(self):
+        """Texte au format d'exposition Prometheus (version 0.0.4)"""
+        lignes = []
+        for metric in self._metrics:
+            lignes.extend(metric.render())
+        for name, kind, documentation, fonction in self._collectors:
+            lignes.append(f"# HELP {name} {documentation}")
+            lignes.append(f"# TYPE {name} {kind}")
+            valeur = fonction()
+            if isinstance(valeur, dict):
+                for (label, label_value), v in sorted(valeur.items()):
+                    lignes.append(f"{name}{format_labels([label], [label_value])} {format_value(v)}")
+            else:
+                lignes.append(f"{name} {format_value(valeur)}")
+        return "\n".join(lignes) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
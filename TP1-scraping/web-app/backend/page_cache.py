@@ -0,0 +1,281 @@
+"""
+Module : Cache borné des pages HTML
+====================================
+
+Remplace le simple dictionnaire `html_cache` par un cache :
+- Borné en octets, avec éviction LRU (la page la moins récemment lue sort)
+- Avec une durée de vie (TTL) par entrée
+- Rafraîchi en arrière-plan par revalidation conditionnelle
+  (If-None-Match / If-Modified-Since) : une page inchangée répond 304
+  et aucun contenu n'est retransféré
+
+Les entrées ne sont jamais modifiées : une revalidation (200 ou 304)
+installe une nouvelle entrée sous le verrou. Une entrée peut être
+adossée à un instantané projeté en mémoire (voir snapshot.py) : son
+HTML est décodé à chaque lecture, le corps reste dans le mmap partagé
+entre les workers.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Taille maximale du cache (en octets de HTML)
+MAX_BYTES = 64 * 1024 * 1024
+# Durée de vie d'une entrée avant revalidation (en secondes)
+TTL = 300
+
+
+class CacheEntry:
+    """Une page en cache avec ses validateurs HTTP (HTML en str, ou octets d'un mmap)"""
+
+    __slots__ = ("_html", "source", "etag", "last_modified", "expires", "size", "_digest")
+
+    def __init__(self, html, etag, last_modified, expires, size, source=None, digest=None):
+        self._html = html
+        self.source = source  # memoryview sur l'instantané (lecture seule), ou None
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+        self.size = size
+        self._digest = digest
+
+    @property
+    def digest(self):
+        """Empreinte SHA-1 du contenu (calculée une fois, sans décoder le mmap)"""
+        if self._digest is None:
+            data = self.source if self._html is None else self._html.encode("utf-8")
+            self._digest = hashlib.sha1(data).hexdigest()
+        return self._digest
+
+    @property
+    def html(self):
+        if self._html is None:
+            # Pas de copie gardée par le worker : décodé à la demande
+            return str(self.source, "utf-8")
+        return self._html
+
+    def prolonger(self, ttl):
+        """Même page, nouvelle échéance (l'entrée d'origine n'est pas modifiée)"""
+        return CacheEntry(
+            self._html,
+            self.etag,
+            self.last_modified,
+            time.monotonic() + ttl,
+            self.size,
+            self.source,
+            self._digest,
+        )
+
+
+class PageCache:
+    """
+    Cache LRU des pages HTML, borné en taille et avec TTL
+
+    Une entrée expirée reste servie pendant sa revalidation en
+    arrière-plan (stale-while-revalidate) : la lecture ne bloque
+    jamais sur le réseau, sauf au tout premier téléchargement.
+    """
+
+    def __init__(self, fetcher, max_bytes=MAX_BYTES, ttl=TTL):
+        self.fetcher = fetcher
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        # Incrémentée à chaque fois que le contenu d'une page change
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        # Appelée avec (url, response) après chaque téléchargement (métriques)
+        self.on_fetch = None
+        self._entries = OrderedDict()  # {url: CacheEntry}
+        self._revalidating = set()  # URLs dont la revalidation est en cours
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return url in self._entries
+
+    def snapshot(self):
+        """
+        Renvoie ({url: CacheEntry}, version) cohérents entre eux
+
+        Les entrées (immuables) donnent `digest` et `html` : le HTML
+        n'est décodé que par qui en a besoin.
+        """
+        with self._lock:
+            return dict(self._entries), self.version
+
+    def entries(self):
+        """Renvoie {url: (HTML, ETag, Last-Modified)} (pour écrire un instantané)"""
+        with self._lock:
+            entries = list(self._entries.items())
+        return {url: (e.html, e.etag, e.last_modified) for url, e in entries}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.version += 1
+
+    def _stocker(self, url, response):
+        """Enregistre une réponse 200"""
+        if self.on_fetch is not None:
+            self.on_fetch(url, response)
+        return self.put(
+            url,
+            response.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            size=len(response.content),
+        )
+
+    def put(self, url, html_content, etag=None, last_modified=None, size=None, source=None):
+        """
+        Ajoute (ou remplace) une page et applique l'éviction LRU
+
+        `source` (octets UTF-8 en lecture seule, par exemple une vue sur un
+        mmap) remplace html_content : la page est décodée à chaque lecture.
+        """
+        entry = self._entree(html_content, etag, last_modified, size, source)
+        with self._lock:
+            if self._inserer(url, entry):
+                self.version += 1
+            self._evincer()
+        return entry.html
+
+    def put_many(self, pages):
+        """
+        Ajoute plusieurs pages {url: HTML} (par exemple un lot du crawler)
+
+        La version n'est incrémentée qu'une fois pour tout le lot : les
+        index qui en dépendent ne sont reconstruits qu'une fois.
+        """
+        entries = {url: self._entree(html_content) for url, html_content in pages.items()}
+        with self._lock:
+            modifiees = [self._inserer(url, entry) for url, entry in entries.items()]
+            if any(modifiees):
+                self.version += 1
+            self._evincer()
+
+    def _entree(self, html_content, etag=None, last_modified=None, size=None, source=None):
+        if source is not None:
+            size = len(source)
+        elif size is None:
+            size = len(html_content.encode("utf-8"))
+        return CacheEntry(
+            html=html_content if source is None else None,
+            etag=etag,
+            last_modified=last_modified,
+            expires=time.monotonic() + self.ttl,
+            size=size,
+            source=source,
+        )
+
+    def _inserer(self, url, entry):
+        """Remplace l'entrée de `url` (sous le verrou) ; True si le contenu a changé"""
+        ancienne = self._entries.pop(url, None)
+        if ancienne is not None:
+            self.total_bytes -= ancienne.size
+        self._entries[url] = entry
+        self.total_bytes += entry.size
+        return ancienne is None or ancienne.html != entry.html
+
+    def _evincer(self):
+        """Évince les pages les moins récemment utilisées (sous le verrou)"""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evincee = self._entries.popitem(last=False)
+            self.total_bytes -= evincee.size
+
+    def _prolonger(self, url, entry):
+        """Remplace l'entrée par la même page avec une nouvelle échéance"""
+        with self._lock:
+            if self._entries.get(url) is entry:  # Pas remplacée ou évincée entre-temps
+                self._entries[url] = entry.prolonger(self.ttl)
+
+    def _fin_revalidation(self, url, entry, future):
+        try:
+            try:
+                response = future.result()
+            except Exception:
+                # Serveur injoignable : on garde la version périmée encore un TTL
+                self._prolonger(url, entry)
+                return
+
+            if response.status_code == 304:
+                if self.on_fetch is not None:
+                    self.on_fetch(url, response)
+                self._prolonger(url, entry)
+            else:
+                self._stocker(url, response)
+        finally:
+            with self._lock:
+                self._revalidating.discard(url)
+
+    def _revalider_en_fond(self, url, entry):
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        future = self.fetcher.submit(url, headers)
+        future.add_done_callback(
+            lambda f: self._fin_revalidation(url, entry, f)
+        )
+
+    def get(self, url):
+        """
+        Renvoie le HTML d'une page
+
+        Télécharge la page si elle est absente ; si elle est expirée,
+        renvoie la version en cache et lance une revalidation.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            return self._stocker(url, self.fetcher.submit(url).result())
+
+        if entry.expires <= time.monotonic():
+            # Une seule revalidation à la fois par page
+            with self._lock:
+                lancer = url not in self._revalidating
+                self._revalidating.add(url)
+            if lancer:
+                self._revalider_en_fond(url, entry)
+        return entry.html
+
+    def load_many(self, urls):
+        """
+        Charge plusieurs pages absentes du cache en parallèle
+
+        Returns:
+            dict: {url: HTML ou Exception}
+        """
+        urls = list(dict.fromkeys(urls))
+        futures = {
+            url: self.fetcher.submit(url) for url in urls if url not in self._entries
+        }
+        with self._lock:
+            self.misses += len(futures)
+        resultats = {}
+        for url in urls:
+            if url in futures:
+                try:
+                    resultats[url] = self._stocker(url, futures[url].result())
+                except Exception as e:
+                    resultats[url] = e
+            else:
+                try:
+                    resultats[url] = self.get(url)
+                except Exception as e:
+                    resultats[url] = e
+        return resultats
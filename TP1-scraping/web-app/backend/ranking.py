@@ -0,0 +1,192 @@
+"""
+Module : Classement des résultats (BM25F)
+==========================================
+
+Ce module calcule un score de pertinence pour les sites et les images :
+- Index des statistiques de termes précalculé (fréquences, longueurs)
+- Score BM25F : les champs (titre, alt, src, texte) ont chacun un poids
+- Pagination par curseur opaque
+
+Formule (pour chaque terme t de la requête) :
+    tf~   = somme_champs( poids_champ * tf_champ / (1 - b + b * long_champ / long_moy_champ) )
+    score = somme_t( idf(t) * tf~ / (k1 + tf~) )
+"""
+
+import base64
+import json
+import math
+import urllib.parse
+from collections import Counter, defaultdict
+
+from bs4 import BeautifulSoup
+
+from tokenizer import html_fields, tokenize
+
+# Poids de chaque champ d'une page
+SITE_FIELD_BOOSTS = {"title": 3.0, "alt": 2.0, "url": 1.5, "text": 1.0}
+# Poids de chaque champ d'une image
+IMAGE_FIELD_BOOSTS = {"alt": 2.0, "url": 1.0}
+
+K1 = 1.2
+B = 0.75
+
+
+class BM25FIndex:
+    """
+    Index des statistiques de termes pour le score BM25F
+
+    Chaque document est un dictionnaire {champ: liste de mots}.
+    L'index stocke pour chaque terme la liste des documents qui le
+    contiennent avec leurs fréquences par champ.
+    """
+
+    def __init__(self, field_boosts, k1=K1, b=B):
+        self.field_boosts = field_boosts
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # {terme: [(doc_id, {champ: tf})]}
+        self.lengths = {}  # {doc_id: {champ: longueur}}
+        self.avg_lengths = {}
+        self.idf = {}
+
+    def add(self, doc_id, fields):
+        frequences = defaultdict(dict)
+        for field, tokens in fields.items():
+            for terme, tf in Counter(tokens).items():
+                frequences[terme][field] = tf
+        for terme, tf_champs in frequences.items():
+            self.postings[terme].append((doc_id, tf_champs))
+        self.lengths[doc_id] = {field: len(tokens) for field, tokens in fields.items()}
+
+    def finalize(self):
+        """Calcule les longueurs moyennes et les idf une fois tous les documents ajoutés"""
+        n = len(self.lengths)
+        for field in self.field_boosts:
+            total = sum(l.get(field, 0) for l in self.lengths.values())
+            self.avg_lengths[field] = (total / n) if n and total else 1.0
+        for terme, docs in self.postings.items():
+            df = len(docs)
+            self.idf[terme] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        return self
+
+    def score(self, terms):
+        """
+        Calcule le score de tous les documents contenant au moins un terme
+
+        Returns:
+            dict: {doc_id: score}
+        """
+        scores = defaultdict(float)
+        for terme in set(terms):
+            idf = self.idf.get(terme)
+            if idf is None:
+                continue
+            for doc_id, tf_champs in self.postings[terme]:
+                longueurs = self.lengths[doc_id]
+                tf = 0.0
+                for field, freq in tf_champs.items():
+                    norme = 1 - self.b + self.b * longueurs[field] / self.avg_lengths[field]
+                    tf += self.field_boosts[field] * freq / norme
+                scores[doc_id] += idf * tf / (self.k1 + tf)
+        return scores
+
+
+def extract_page_fields(url, html_content):
+    """
+    Extrait les champs à indexer d'une page
+
+    Returns:
+        tuple: (champs du site, [(id image, champs image)])
+    """
+    fields = html_fields(BeautifulSoup(html_content, "html.parser"))
+
+    alts, srcs, image_docs = [], [], []
+    for src, alt in fields["images"]:
+        alts.extend(tokenize(alt))
+        srcs.extend(tokenize(src))
+        if src:
+            if not src.startswith(("http://", "https://")):
+                src = urllib.parse.urljoin(url, src)
+            image_docs.append(((url, src), {"alt": tokenize(alt), "url": tokenize(src)}))
+
+    site_fields = {
+        "title": tokenize(fields["title"]),
+        "alt": alts,
+        "url": srcs,
+        "text": tokenize("\n".join(fields["paragraphs"])),
+    }
+    return site_fields, image_docs
+
+
+class SearchIndex:
+    """
+    Index de classement des sites et de leurs images
+
+    Construit une fois à partir du HTML en cache ; `version` permet de
+    savoir à partir de quelle version du cache il a été construit.
+    """
+
+    def __init__(self, version=0):
+        self.version = version
+        self.sites = BM25FIndex(SITE_FIELD_BOOSTS)
+        self.images = BM25FIndex(IMAGE_FIELD_BOOSTS)
+        # {url: (empreinte du HTML, champs du site, [(id image, champs image)])}
+        # (l'empreinte seule est gardée : pas de copie du HTML dans l'index)
+        self.documents = {}
+
+    @classmethod
+    def build(cls, pages, version=0, previous=None):
+        """
+        Args:
+            pages (dict): {url: page_cache.CacheEntry} (les valeurs
+                Exception sont ignorées)
+            version (int): Version du cache HTML utilisée
+            previous (SearchIndex): Index précédent ; les pages dont
+                l'empreinte (digest) n'a pas changé ne sont ni décodées ni
+                ré-analysées
+        """
+        index = cls(version)
+        anciens = previous.documents if previous is not None else {}
+        for url, page in pages.items():
+            if isinstance(page, Exception):
+                continue
+            document = anciens.get(url)
+            if document is None or document[0] != page.digest:
+                document = (page.digest, *extract_page_fields(url, page.html))
+            index.add_document(url, document)
+        index.sites.finalize()
+        index.images.finalize()
+        return index
+
+    def add_document(self, url, document):
+        _, site_fields, image_docs = document
+        self.documents[url] = document
+        self.sites.add(url, site_fields)
+        for doc_id, fields in image_docs:
+            self.images.add(doc_id, fields)
+
+    def score_sites(self, query_words):
+        return self.sites.score(tokenize(" ".join(query_words)))
+
+    def score_images(self, query_words):
+        return self.images.score(tokenize(" ".join(query_words)))
+
+
+def encode_cursor(offset, version):
+    """Encode la position de la page suivante dans un curseur opaque"""
+    data = json.dumps({"o": offset, "v": version}).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (offset, version) ou (0, None) si le curseur est absent ou invalide
+    """
+    if not cursor:
+        return 0, None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return max(0, int(data["o"])), data.get("v")
+    except Exception:
+        return 0, None
@@ -0,0 +1,130 @@
+"""
+Module : Cache des réponses de /api/search
+===========================================
+
+Les requêtes les plus fréquentes représentent l'essentiel du trafic :
+on garde le résultat déjà calculé pour une requête normalisée (termes
+du tokenizer, dédoublonnés et triés + mode) : "Pythôn" et "python",
+"chatons" et "chaton" partagent la même entrée.
+
+- Éviction LRU (nombre d'entrées borné) et durée de vie (TTL)
+- Une entrée n'est valable que pour la version du cache HTML qui l'a produite
+- Empreinte du résultat calculée une seule fois par entrée ; l'ETag la
+  combine aux champs propres à la requête ("CHAT" et "chat" partagent
+  l'entrée mais pas le corps, donc pas l'ETag) (réponses 304)
+- Statistiques : taux de succès et temps de calcul économisé
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from tokenizer import tokenize
+
+MAX_ENTRIES = 1024
+TTL = 60
+
+
+def normalize_query(query_words, mode):
+    """
+    Clé de cache : termes de chaque mot tels que la recherche les compare
+    (tokenize : minuscules, sans accents, pluriel retiré), dédoublonnés,
+    triés + mode
+
+    Returns:
+        tuple: (clé, mots) ; mots = un mot de la requête par terme de la
+        clé (le premier rencontré), à passer à la recherche
+    """
+    mots = {}
+    for word in query_words:
+        mots.setdefault(tuple(tokenize(word)), word.lower())
+    termes = tuple(sorted(mots))
+    return (termes, mode), [mots[terme] for terme in termes]
+
+
+class CachedResponse:
+    __slots__ = ("payload", "etag", "version", "expires", "compute_time")
+
+    def __init__(self, payload, etag, version, expires, compute_time):
+        self.payload = payload
+        self.etag = etag
+        self.version = version
+        self.expires = expires
+        self.compute_time = compute_time
+
+    def etag_for(self, *fields):
+        """ETag du corps envoyé : empreinte de l'entrée + champs de la requête"""
+        data = json.dumps(fields, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(self.etag.encode("ascii") + data).hexdigest()
+
+
+class ResponseCache:
+    """Cache LRU/TTL des réponses, invalidé par la version de l'index"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0  # Secondes de calcul évitées
+        self.compute_time = 0.0  # Secondes passées à calculer les réponses
+        self.stored = 0  # Nombre de réponses calculées et mises en cache
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """Renvoie la réponse en cache ou None (version différente ou expirée)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is None
+                or entry.version != version
+                or entry.expires <= time.monotonic()
+            ):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.time_saved += entry.compute_time
+            return entry
+
+    def put(self, key, version, payload, compute_time):
+        data = json.dumps(payload, sort_keys=True).encode("utf-8")
+        entry = CachedResponse(
+            payload=payload,
+            etag=hashlib.sha1(data).hexdigest(),
+            version=version,
+            expires=time.monotonic() + self.ttl,
+            compute_time=compute_time,
+        )
+        with self._lock:
+            self.compute_time += compute_time
+            self.stored += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        calculs = max(self.stored, 1)
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "avg_compute_ms": round(self.compute_time / calculs * 1000, 2),
+            "time_saved_ms": round(self.time_saved * 1000, 1),
+        }
@@ -0,0 +1,132 @@
+"""
+Module : Instantané des caches sur disque
+==========================================
+
+En production, le processus maître télécharge les pages une seule fois
+et écrit un fichier d'instantané. Chaque worker l'ouvre ensuite avec
+mmap : les octets sont partagés entre processus par le cache du système
+au lieu d'être re-téléchargés par chaque worker.
+
+Format du fichier :
+    [8 octets : taille de l'en-tête][en-tête JSON][données]
+L'en-tête donne, pour chaque page et pour les tableaux du vocabulaire,
+la position (offset, longueur) dans la zone de données, et pour chaque
+page ses validateurs HTTP (ETag, Last-Modified) : la première
+revalidation d'un worker reste conditionnelle (304 si rien n'a changé).
+
+Rien n'est copié dans les workers : le vocabulaire et le corps des
+pages restent dans le mmap (vues en lecture seule), les pages sont
+décodées à chaque lecture (voir PageCache.put(source=...)).
+
+L'index d'images (image_index.py) y est aussi écrit : sa matrice
+(float32) est projetée telle quelle par chaque worker ; ses entrées et
+les validateurs HTTP des images sont dans l'en-tête.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from vocabulary import Vocabulary
+
+HEADER_SIZE = struct.Struct("<Q")
+
+
+def write_snapshot(path, pages, vocabulary, images=None):
+    """
+    Écrit un instantané de façon atomique (fichier temporaire + rename)
+
+    Args:
+        path (str): Chemin du fichier d'instantané
+        pages (dict): {url: (HTML, ETag, Last-Modified)}
+        vocabulary (Vocabulary): Vocabulaire des sites
+        images (tuple): (matrice, entrées, validateurs) de ImageIndex.export(), ou None
+    """
+    blocs = []
+    position = 0
+
+    def ajouter(data):
+        nonlocal position
+        # Aligner chaque bloc sur 4 octets (tableaux de uint32)
+        padding = -position % 4
+        if padding:
+            blocs.append(b"\0" * padding)
+            position += padding
+        blocs.append(data)
+        position += len(data)
+        return [position - len(data), len(data)]
+
+    index_pages = {
+        url: ajouter(html_content.encode("utf-8")) + [etag, last_modified]
+        for url, (html_content, etag, last_modified) in pages.items()
+    }
+    index_vocabulaire = {
+        "data": ajouter(bytes(vocabulary.data)),
+        "offsets": ajouter(bytes(vocabulary.offsets)),
+        "df": ajouter(bytes(vocabulary.df)),
+    }
+    contenu = {"pages": index_pages, "vocabulary": index_vocabulaire}
+    if images is not None:
+        matrice, entries, validators = images
+        matrice = np.ascontiguousarray(matrice, dtype=np.float32)
+        contenu["images"] = {
+            "matrix": ajouter(matrice.tobytes()) + list(matrice.shape),
+            "entries": entries,
+            "validators": validators,
+        }
+    header = json.dumps(contenu).encode("utf-8")
+    # La zone de données doit commencer sur une frontière de 4 octets
+    header += b" " * (-(HEADER_SIZE.size + len(header)) % 4)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER_SIZE.pack(len(header)))
+        f.write(header)
+        for data in blocs:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Lecture d'un instantané projeté en mémoire (lecture seule)"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (taille,) = HEADER_SIZE.unpack_from(self._mm, 0)
+        debut = HEADER_SIZE.size
+        self._header = json.loads(self._mm[debut : debut + taille])
+        self._data = memoryview(self._mm)[debut + taille :]
+
+    def pages(self):
+        """Renvoie {url: (octets UTF-8 en vue sur le mmap, ETag, Last-Modified)}"""
+        return {
+            url: (self._data[offset : offset + length], etag, last_modified)
+            for url, (offset, length, etag, last_modified) in self._header["pages"].items()
+        }
+
+    def vocabulary(self):
+        """Renvoie le vocabulaire, adossé directement au mmap"""
+        vues = {
+            nom: self._data[offset : offset + length]
+            for nom, (offset, length) in self._header["vocabulary"].items()
+        }
+        return Vocabulary(
+            vues["data"], vues["offsets"].cast("I"), vues["df"].cast("I")
+        )
+
+    def images(self):
+        """
+        Renvoie l'index d'images (matrice en vue sur le mmap, entrées,
+        validateurs), ou None si l'instantané n'en contient pas
+        """
+        images = self._header.get("images")
+        if images is None:
+            return None
+        offset, length, lignes, colonnes = images["matrix"]
+        matrice = np.frombuffer(self._data[offset : offset + length], dtype=np.float32)
+        validators = {src: tuple(v) for src, v in images["validators"].items()}
+        return matrice.reshape(lignes, colonnes), images["entries"], validators
@@ -0,0 +1,75 @@
+"""
+Crawl lancé par /api/crawl sur les sites synthétiques de serveur_local.py
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1]
+SITES_TEST = BACKEND.parents[1] / "sites_test"
+for chemin in (BACKEND, SITES_TEST):
+    if str(chemin) not in sys.path:
+        sys.path.insert(0, str(chemin))
+
+import app  # noqa: E402
+import serveur_local  # noqa: E402
+
+
+class Handler(serveur_local.MyHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def serveur():
+    """Serveur local (port libre) avec 3 sites synthétiques de 5 pages"""
+    Handler.generated = serveur_local.GeneratedSites(3, 5)
+    httpd = serveur_local.ThreadingServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def attendre_fin_du_crawl(client, delai=30):
+    fin = time.monotonic() + delai
+    while app.crawl_lock.locked():
+        assert time.monotonic() < fin, "crawl trop long"
+        time.sleep(0.05)
+    return client.get("/api/crawl").get_json()
+
+
+def test_crawl_depuis_les_seeds_du_corps(serveur):
+    client = app.app.test_client()
+    avant = len(app.SITES)
+    version = app.html_cache.version
+
+    reponse = client.post("/api/crawl", json={"seeds": [f"{serveur}/gen1/index.html"]})
+    assert reponse.status_code == 200
+    etat = attendre_fin_du_crawl(client)
+
+    # 3 sites x (index + 5 pages), atteints par les liens depuis gen1
+    urls = {site["url"] for site in app.SITES[avant:]}
+    assert len(urls) == 18
+    assert f"{serveur}/gen3/page5.html" in urls
+    assert etat["total_sites"] == avant + 18
+    assert len({site["id"] for site in app.SITES}) == len(app.SITES)
+    # Un seul lot : une seule nouvelle version du cache HTML
+    assert app.html_cache.version == version + 1
+
+    # Nouveau crawl : pages inchangées, rien n'est ajouté
+    client.post("/api/crawl", json={"seeds": [f"{serveur}/gen1/index.html"]})
+    attendre_fin_du_crawl(client)
+    assert len(app.SITES) == avant + 18
+    assert app.html_cache.version == version + 1
+
+
+def test_seeds_invalides(serveur):
+    client = app.app.test_client()
+    reponse = client.post("/api/crawl", json={"seeds": "pas une liste"})
+    assert reponse.status_code == 400
+    assert not app.crawl_lock.locked()
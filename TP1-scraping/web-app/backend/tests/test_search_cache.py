@@ -0,0 +1,39 @@
+"""
+Cache de /api/search : requêtes équivalentes, corps et ETag propres à chacune
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+import app  # noqa: E402
+
+
+def test_requetes_equivalentes(monkeypatch):
+    appels = []
+
+    def run_search(query_words, mode, limit, cursor=None):
+        appels.append(query_words)
+        return {"search_mode": mode, "results": [], "timed_out_sites": []}, app.html_cache.version
+
+    monkeypatch.setattr(app, "run_search", run_search)
+    app.response_cache.clear()
+    client = app.app.test_client()
+
+    majuscules = client.get("/api/search?q=CHAT")
+    minuscules = client.get("/api/search?q=chat")
+
+    # Même entrée de cache : une seule recherche
+    assert appels == [["chat"]]
+    assert majuscules.get_json()["query_words"] == ["CHAT"]
+    assert minuscules.get_json()["query_words"] == ["chat"]
+    assert majuscules.get_data() != minuscules.get_data()
+    assert majuscules.headers["ETag"] != minuscules.headers["ETag"]
+
+    # L'ETag d'une requête ne valide pas le corps de l'autre
+    etag = majuscules.headers["ETag"]
+    assert client.get("/api/search?q=chat", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/api/search?q=CHAT", headers={"If-None-Match": etag}).status_code == 304
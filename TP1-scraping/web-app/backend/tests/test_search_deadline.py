@@ -0,0 +1,34 @@
+"""
+Échéance de /api/search vérifiée dans les processus du pool
+"""
+
+import itertools
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+import app  # noqa: E402
+
+PAGE = "<title>Page</title>" + "".join(f"<p>paragraphe {i}</p>" for i in range(50))
+
+
+def test_sans_echeance():
+    result = app.search_in_html("http://x/", PAGE, ["paragraphe"])
+    assert result["found"] and result["methods"] == ["text"]
+
+
+def test_echeance_depassee_avant_l_analyse():
+    assert app.search_in_html("http://x/", PAGE, ["chat"], deadline=time.time() - 1) is None
+
+
+def test_arret_en_cours_de_page(monkeypatch):
+    # Horloge qui avance d'une seconde à chaque lecture
+    horloge = itertools.count()
+    monkeypatch.setattr(app.time, "time", lambda: next(horloge))
+    assert app.search_in_html("http://x/", PAGE, ["chat"], deadline=5) is None
+    # Arrêté après quelques paragraphes, pas à la fin de la page
+    assert next(horloge) < 10
@@ -0,0 +1,87 @@
+"""
+Module : Tokenisation et normalisation du texte
+================================================
+
+Découpage en mots partagé par l'indexation et la recherche :
+- Expression régulière précompilée (lettres et chiffres, sans '_')
+- Minuscules et suppression des accents ("Élégant" -> "elegant")
+- Racinisation légère optionnelle du pluriel français
+  ("chats" -> "chat", "animaux" -> "animal")
+
+Comme la requête et les pages passent par la même fonction, "chat"
+trouve "Chats" mais plus "chateau" ni "category".
+"""
+
+import re
+import unicodedata
+
+WORD_RE = re.compile(r"[^\W_]+")
+COMBINING_RE = re.compile(r"[\u0300-\u036f]+")
+
+# Ligatures que la décomposition Unicode ne sépare pas
+LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+
+# Racinisation activée pour l'index et la recherche
+STEM = True
+
+
+def fold_accents(text):
+    """Minuscules + suppression des accents et ligatures"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text.translate(LIGATURES))
+    return COMBINING_RE.sub("", text)
+
+
+def light_stem(word):
+    """Racinisation légère : supprime le pluriel français"""
+    if len(word) > 4 and word.endswith("aux"):
+        return word[:-3] + "al"
+    if len(word) > 3 and word[-1] in "sx" and word[-2] not in "sx":
+        return word[:-1]
+    return word
+
+
+def tokenize(text, stem=STEM, min_length=1):
+    """
+    Découpe un texte en mots normalisés (en un seul passage)
+
+    Args:
+        text (str): Texte à découper
+        stem (bool): Appliquer la racinisation légère
+        min_length (int): Longueur minimale d'un mot (avant racinisation)
+
+    Returns:
+        list: Liste des mots normalisés
+    """
+    if not text:
+        return []
+    mots = WORD_RE.findall(fold_accents(text))
+    if min_length > 1:
+        mots = [mot for mot in mots if len(mot) >= min_length]
+    if stem:
+        mots = [light_stem(mot) for mot in mots]
+    return mots
+
+
+def html_fields(soup):
+    """
+    Récupère en un seul parcours de la page les textes à indexer
+
+    Returns:
+        dict: {"title": str, "images": [(src, alt)], "paragraphs": [str],
+               "headings": [str]}
+    """
+    fields = {"title": "", "images": [], "paragraphs": [], "headings": []}
+    for tag in soup.find_all(["title", "img", "p", "h1", "h2", "h3"]):
+        if tag.name == "img":
+            fields["images"].append((tag.get("src", ""), tag.get("alt", "")))
+        elif tag.name == "p":
+            fields["paragraphs"].append(tag.get_text())
+        elif tag.name == "title":
+            if not fields["title"]:
+                fields["title"] = tag.get_text().strip()
+        else:
+            fields["headings"].append(tag.get_text())
+    return fields
@@ -0,0 +1,137 @@
+"""
+Module : Vocabulaire compact
+=============================
+
+Stocke le vocabulaire des sites dans un seul tampon d'octets au lieu
+d'un set de chaînes Python :
+- data    : tous les mots triés, encodés en UTF-8, mis bout à bout
+- offsets : position de début de chaque mot (tableau de uint32, n + 1 cases)
+- df      : nombre de sites contenant chaque mot (tableau de uint32)
+
+L'ordre des octets UTF-8 est le même que l'ordre des caractères :
+une recherche dichotomique sur les octets trouve donc tous les mots
+commençant par un préfixe en O(log n).
+
+Les k mots les plus fréquents d'un préfixe demandent ensuite de
+parcourir ses m mots (O(m log k)) : coûteux pour les préfixes courts,
+qui couvrent une grande partie du vocabulaire. Leur résultat est donc
+précalculé (préfixes de 0 à TOP_PREFIX_LENGTH caractères, TOP_K mots) ;
+au-delà, m est petit.
+"""
+
+import heapq
+from array import array
+from collections import Counter
+
+TOP_PREFIX_LENGTH = 2  # Préfixes (en caractères) dont les meilleurs mots sont précalculés
+TOP_K = 50  # Mots précalculés par préfixe (limite maximale de /api/suggest)
+
+
+class Vocabulary:
+    """Vocabulaire trié, dédoublonné, avec fréquences documentaires"""
+
+    def __init__(self, data=b"", offsets=None, df=None):
+        self.data = data
+        self.offsets = offsets if offsets is not None else array("I", [0])
+        self.df = df if df is not None else array("I")
+        self._top = None  # {préfixe court: indices des TOP_K mots les plus fréquents}
+
+    @classmethod
+    def build(cls, documents):
+        """
+        Args:
+            documents (iterable): Un ensemble de mots par site
+        """
+        compteur = Counter()
+        for mots in documents:
+            compteur.update(set(mots))
+
+        encodes = sorted((mot.encode("utf-8"), n) for mot, n in compteur.items())
+        offsets = array("I", [0])
+        df = array("I")
+        position = 0
+        for mot, n in encodes:
+            position += len(mot)
+            offsets.append(position)
+            df.append(n)
+        vocabulaire = cls(b"".join(mot for mot, _ in encodes), offsets, df)
+        vocabulaire.top_prefixes()
+        return vocabulaire
+
+    def __len__(self):
+        return len(self.df)
+
+    def _key(self, i):
+        return bytes(self.data[self.offsets[i] : self.offsets[i + 1]])
+
+    def word(self, i):
+        return self._key(i).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.word(i)
+
+    def _lower_bound(self, key):
+        """Premier indice i tel que mot[i] >= key"""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, word):
+        key = word.encode("utf-8")
+        i = self._lower_bound(key)
+        return i < len(self) and self._key(i) == key
+
+    def prefix_range(self, prefix):
+        """
+        Returns:
+            tuple: (début, fin) des indices des mots commençant par `prefix`
+        """
+        key = prefix.encode("utf-8")
+        # 0xFF n'apparaît jamais en UTF-8 : borne supérieure de tous les mots du préfixe
+        return self._lower_bound(key), self._lower_bound(key + b"\xff")
+
+    def _most_frequent(self, debut, fin, limit):
+        """Indices des `limit` mots de plus grand df dans [debut, fin) : O(m log k)"""
+        return heapq.nsmallest(limit, range(debut, fin), key=lambda i: (-self.df[i], i))
+
+    def top_prefixes(self):
+        """
+        Table des TOP_K mots les plus fréquents de chaque préfixe d'au plus
+        TOP_PREFIX_LENGTH caractères (construite au premier appel)
+
+        Returns:
+            dict: {préfixe: array d'indices, du plus au moins fréquent}
+        """
+        if self._top is None:
+            prefixes = {""}
+            for mot in self:
+                prefixes.update(mot[:n] for n in range(1, min(len(mot), TOP_PREFIX_LENGTH) + 1))
+            # Affectation unique : les lectures concurrentes voient None ou la table complète
+            self._top = {
+                prefix: array("I", self._most_frequent(*self.prefix_range(prefix), TOP_K))
+                for prefix in prefixes
+            }
+        return self._top
+
+    def complete(self, prefix, limit=10):
+        """
+        Complète un préfixe avec les mots les plus fréquents
+
+        Coût : O(limit) pour un préfixe d'au plus TOP_PREFIX_LENGTH
+        caractères et limit <= TOP_K (table précalculée), sinon
+        O(log n + m log limit) pour les m mots du préfixe
+
+        Returns:
+            list: Liste de tuples (mot, df)
+        """
+        if len(prefix) <= TOP_PREFIX_LENGTH and limit <= TOP_K:
+            meilleurs = self.top_prefixes().get(prefix, ())[:limit]
+        else:
+            meilleurs = self._most_frequent(*self.prefix_range(prefix), limit)
+        return [(self.word(i), self.df[i]) for i in meilleurs]
@@ -0,0 +1,85 @@
+"""
+Point d'entrée de production du backend
+========================================
+
+Utilisation :
+    # Construire l'instantané des caches (fait automatiquement par gunicorn.conf.py)
+    python wsgi.py build
+
+    # Linux / macOS : plusieurs processus workers
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+    # Windows (ou sans gunicorn) : serveur waitress multi-threadé
+    python wsgi.py
+
+Chaque worker projette l'instantané via mmap au lieu de re-télécharger
+toutes les pages : le HTML, le vocabulaire et la matrice de l'index
+d'images sont partagés entre les workers par le cache du système (seul
+l'index de recherche est propre à chaque worker). Sans instantané, le
+pré-chargement se fait en arrière-plan.
+"""
+
+import os
+import sys
+import threading
+
+import app as backend
+from snapshot import Snapshot, write_snapshot
+
+SNAPSHOT_PATH = os.environ.get(
+    "IRI_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_snapshot.bin"),
+)
+
+
+def build_snapshot(path=SNAPSHOT_PATH):
+    """Télécharge toutes les pages, indexe leurs images et écrit l'instantané"""
+    backend.preload_caches(images=True)
+    write_snapshot(
+        path,
+        backend.html_cache.entries(),
+        backend.all_words_cache,
+        backend.image_index.export() if backend.image_index.ready else None,
+    )
+    print(f" Instantané écrit: {path}")
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Remplit les caches du worker depuis l'instantané (pages et vocabulaire restent dans le mmap)"""
+    snapshot = Snapshot(path)
+    for url, (source, etag, last_modified) in snapshot.pages().items():
+        backend.html_cache.put(url, None, etag=etag, last_modified=last_modified, source=source)
+    backend.all_words_cache = snapshot.vocabulary()
+    backend.get_search_index()
+    images = snapshot.images()
+    if images is not None:
+        # Matrice construite une seule fois (par `build`), projetée par chaque worker
+        backend.image_index.load(*images, version=backend.html_cache.version)
+    else:
+        threading.Thread(target=backend.build_image_index, daemon=True).start()
+    print(f" Worker {os.getpid()}: {len(backend.html_cache)} pages depuis {path}")
+
+
+def init_worker():
+    if os.path.exists(SNAPSHOT_PATH):
+        load_snapshot()
+    else:
+        threading.Thread(target=backend.preload_caches, daemon=True).start()
+
+
+application = backend.app
+
+if __name__ != "__main__":
+    init_worker()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["build"]:
+        build_snapshot()
+        sys.exit(0)
+
+    init_worker()
+
+    from waitress import serve
+
+    serve(application, host="0.0.0.0", port=5000, threads=16)
@@ -0,0 +1,297 @@
+"""
+Module : Arbre k-d pour les descripteurs de petite dimension
+=============================================================
+
+Recherche exacte des plus proches voisins (distance euclidienne) pour
+les descripteurs de TP-4 (4 valeurs) et de TP-pre (30 valeurs), sans
+parcourir toute la base.
+
+L'arbre est rangé dans des tableaux numpy (pas d'objet par noeud) :
+- les points sont réordonnés pour que chaque noeud couvre une plage
+  contiguë [debut, fin) du tableau
+- chaque noeud garde sa boîte englobante (min et max par dimension)
+- un noeud interne a deux enfants ; une feuille (<= taille_feuille
+  points) n'en a pas (-1)
+
+Construction en bloc : chaque noeud est coupé à la médiane de sa
+dimension la plus étendue (np.argpartition), soit une profondeur
+log2(n / taille_feuille).
+
+Recherche « meilleur d'abord » : les noeuds sont visités par distance
+croissante entre la requête et leur boîte ; dès que la boîte la plus
+proche est plus loin que le k-ième voisin trouvé, la recherche s'arrête.
+Les points d'une feuille sont comparés d'un coup (vectorisé).
+
+Les insertions vont dans un tampon parcouru à chaque requête, et
+intégré à l'arbre à la reconstruction (automatique quand le tampon
+dépasse `taille_tampon`). Les suppressions marquent le point (tombe) :
+il est ignoré par les requêtes, et retiré à la reconstruction.
+"""
+
+import heapq
+
+import numpy as np
+
+TAILLE_FEUILLE = 16
+TAILLE_TAMPON = 4096  # Points insérés avant une reconstruction automatique
+
+
+class ArbreKD:
+    """
+    Arbre k-d (recherche exacte des k plus proches voisins et par rayon)
+
+    Args:
+        points (numpy.ndarray): Matrice (n, dimension)
+        ids (numpy.ndarray): Identifiant de chaque point (0 .. n - 1 par défaut)
+        taille_feuille (int): Nombre maximum de points par feuille
+        taille_tampon (int): Insertions avant reconstruction automatique
+    """
+
+    def __init__(self, points, ids=None, taille_feuille=TAILLE_FEUILLE, taille_tampon=TAILLE_TAMPON):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2:
+            raise ValueError("points doit être une matrice (n, dimension)")
+        if ids is None:
+            ids = np.arange(len(points))
+        self.dimension = points.shape[1]
+        self.taille_feuille = max(1, taille_feuille)
+        self.taille_tampon = taille_tampon
+        self._tampon_points = []
+        self._tampon_ids = []
+        self._tampon = (np.empty((0, self.dimension)), np.empty(0, np.int64))
+        self._construire(points, np.asarray(ids, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.points) - self.nb_supprimes + len(self._tampon_ids)
+
+    @property
+    def taille_tampon_actuelle(self):
+        return len(self._tampon_ids)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    def _construire(self, points, ids):
+        n = len(points)
+        ordre = np.arange(n)
+        debut, fin, gauche, droite, bas, haut = [], [], [], [], [], []
+
+        def nouveau_noeud(d, f):
+            debut.append(d)
+            fin.append(f)
+            gauche.append(-1)
+            droite.append(-1)
+            plage = points[ordre[d:f]]
+            bas.append(plage.min(axis=0) if f > d else np.zeros(self.dimension))
+            haut.append(plage.max(axis=0) if f > d else np.zeros(self.dimension))
+            return len(debut) - 1
+
+        pile = [nouveau_noeud(0, n)]
+        while pile:
+            noeud = pile.pop()
+            d, f = debut[noeud], fin[noeud]
+            if f - d <= self.taille_feuille:
+                continue
+            etendue = haut[noeud] - bas[noeud]
+            dim = int(np.argmax(etendue))
+            if etendue[dim] == 0:
+                continue  # Points tous identiques : feuille
+            milieu = (f - d) // 2
+            plage = ordre[d:f]
+            ordre[d:f] = plage[np.argpartition(points[plage, dim], milieu)]
+            gauche[noeud] = nouveau_noeud(d, d + milieu)
+            droite[noeud] = nouveau_noeud(d + milieu, f)
+            pile.extend((gauche[noeud], droite[noeud]))
+
+        self.points = np.ascontiguousarray(points[ordre])
+        self.ids = ids[ordre]
+        self.debut = np.array(debut)
+        self.fin = np.array(fin)
+        self.gauche = np.array(gauche)
+        self.droite = np.array(droite)
+        self.bas = np.array(bas).reshape(-1, self.dimension)
+        self.haut = np.array(haut).reshape(-1, self.dimension)
+        self.supprimes = np.zeros(n, dtype=bool)  # Tombes, par position dans self.points
+        self.nb_supprimes = 0
+        self._ids_tries = None  # argsort(self.ids), calculé à la première suppression
+
+    def inserer(self, points, ids):
+        """
+        Ajoute des points (tampon parcouru à chaque requête)
+
+        Args:
+            points (numpy.ndarray): Matrice (m, dimension) ou vecteur
+            ids (list): Identifiant de chaque point
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, self.dimension)
+        self._tampon_points.append(points)
+        self._tampon_ids.extend(int(i) for i in np.atleast_1d(ids))
+        self._tampon = (np.vstack(self._tampon_points), np.array(self._tampon_ids, np.int64))
+        if len(self._tampon_ids) > self.taille_tampon:
+            self.reconstruire()
+
+    def supprimer(self, ids):
+        """
+        Retire des points (tombes dans l'arbre, retrait direct du tampon)
+
+        Returns:
+            int: Nombre de points retirés
+        """
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        retires = 0
+
+        dans_tampon = np.isin(self._tampon[1], ids)
+        if dans_tampon.any():
+            garder = ~dans_tampon
+            self._tampon_points = [self._tampon[0][garder]]
+            self._tampon_ids = [int(i) for i in self._tampon[1][garder]]
+            self._tampon = (self._tampon[0][garder], self._tampon[1][garder])
+            retires += int(dans_tampon.sum())
+
+        if len(self.ids):
+            if self._ids_tries is None:
+                self._ids_tries = np.argsort(self.ids, kind="stable")
+            rangs = np.searchsorted(self.ids, ids, sorter=self._ids_tries)
+            rangs = np.minimum(rangs, len(self.ids) - 1)
+            positions = self._ids_tries[rangs][self.ids[self._ids_tries[rangs]] == ids]
+            positions = positions[~self.supprimes[positions]]
+            self.supprimes[positions] = True
+            self.nb_supprimes += len(positions)
+            retires += len(positions)
+        return retires
+
+    def points_vivants(self):
+        """
+        Points non supprimés de l'arbre et du tampon, par identifiant croissant
+
+        Returns:
+            tuple: (points, ids)
+        """
+        vivants = ~self.supprimes
+        tampon_points, tampon_ids = self._tampon
+        points = np.vstack([self.points[vivants], tampon_points])
+        ids = np.concatenate([self.ids[vivants], tampon_ids])
+        ordre = np.argsort(ids, kind="stable")
+        return points[ordre], ids[ordre]
+
+    def compacte(self):
+        """Nouvel arbre avec les points vivants et le tampon (self n'est pas modifié)"""
+        points, ids = self.points_vivants()
+        return ArbreKD(points, ids, self.taille_feuille, self.taille_tampon)
+
+    def reconstruire(self):
+        """Intègre le tampon à l'arbre et retire les tombes (construction en bloc)"""
+        if not self._tampon_ids and not self.nb_supprimes:
+            return
+        points, ids = self.points_vivants()
+        self._tampon_points, self._tampon_ids = [], []
+        self._tampon = (np.empty((0, self.dimension)), np.empty(0, np.int64))
+        self._construire(points, ids)
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+    def _distance_boite(self, requete, noeud):
+        ecart = np.maximum(self.bas[noeud] - requete, 0) + np.maximum(requete - self.haut[noeud], 0)
+        return float(ecart @ ecart)
+
+    @staticmethod
+    def _garder(d2, ids, k):
+        """Les k plus petites distances², et la plus grande d'entre elles (inf si moins de k)"""
+        if len(d2) > k:
+            garder = np.argpartition(d2, k - 1)[:k]
+            d2, ids = d2[garder], ids[garder]
+        return d2, ids, (d2.max() if len(d2) == k else np.inf)
+
+    def _plus_proches(self, requete, k):
+        # Le tampon d'abord : il donne souvent une première borne
+        tampon_points, tampon_ids = self._tampon
+        diff = tampon_points - requete
+        meilleures_d2, meilleurs_ids, pire = self._garder(
+            np.einsum("ij,ij->i", diff, diff), tampon_ids, k
+        )
+
+        tas = [(self._distance_boite(requete, 0), 0)] if len(self.points) else []
+        while tas:
+            distance_boite, noeud = heapq.heappop(tas)
+            if distance_boite > pire:
+                break  # Toutes les boîtes restantes sont plus loin
+            if self.gauche[noeud] < 0:
+                d, f = self.debut[noeud], self.fin[noeud]
+                diff = self.points[d:f] - requete
+                d2 = np.einsum("ij,ij->i", diff, diff)
+                if self.nb_supprimes:
+                    d2[self.supprimes[d:f]] = np.inf
+                meilleures_d2, meilleurs_ids, pire = self._garder(
+                    np.concatenate([meilleures_d2, d2]),
+                    np.concatenate([meilleurs_ids, self.ids[d:f]]),
+                    k,
+                )
+                continue
+            for enfant in (self.gauche[noeud], self.droite[noeud]):
+                distance = self._distance_boite(requete, enfant)
+                if distance <= pire:
+                    heapq.heappush(tas, (distance, enfant))
+
+        # Ex aequo : plus petit identifiant d'abord ; tombes (inf) écartées
+        ordre = np.lexsort((meilleurs_ids, meilleures_d2))
+        ordre = ordre[np.isfinite(meilleures_d2[ordre])]
+        return np.sqrt(meilleures_d2[ordre]), meilleurs_ids[ordre]
+
+    def plus_proches(self, requetes, k=5):
+        """
+        Les k plus proches voisins (exacts) de chaque requête
+
+        Args:
+            requetes (numpy.ndarray): Vecteur (une requête) ou matrice (m, dimension)
+            k (int): Nombre de voisins
+
+        Returns:
+            tuple: (distances, ids) triés par distance croissante ; matrices
+            (m, k) pour plusieurs requêtes (complétées par inf / -1 si la
+            base a moins de k points)
+        """
+        requetes = np.asarray(requetes, dtype=np.float64)
+        if requetes.ndim == 1:
+            return self._plus_proches(requetes, k)
+
+        k_effectif = min(k, len(self))
+        distances = np.full((len(requetes), k), np.inf)
+        ids = np.full((len(requetes), k), -1, np.int64)
+        for i, requete in enumerate(requetes):
+            distances[i, :k_effectif], ids[i, :k_effectif] = self._plus_proches(requete, k)
+        return distances, ids
+
+    def dans_rayon(self, requete, rayon):
+        """
+        Tous les points à une distance <= rayon de la requête
+
+        Returns:
+            tuple: (distances, ids) triés par distance croissante
+        """
+        requete = np.asarray(requete, dtype=np.float64)
+        rayon2 = rayon * rayon
+        tampon_points, tampon_ids = self._tampon
+        diff = tampon_points - requete
+        d2 = np.einsum("ij,ij->i", diff, diff)
+        trouves_d2, trouves_ids = [d2[d2 <= rayon2]], [tampon_ids[d2 <= rayon2]]
+
+        pile = [0] if len(self.points) else []
+        while pile:
+            noeud = pile.pop()
+            if self._distance_boite(requete, noeud) > rayon2:
+                continue
+            if self.gauche[noeud] >= 0:
+                pile.extend((self.gauche[noeud], self.droite[noeud]))
+                continue
+            d, f = self.debut[noeud], self.fin[noeud]
+            diff = self.points[d:f] - requete
+            d2 = np.einsum("ij,ij->i", diff, diff)
+            if self.nb_supprimes:
+                d2[self.supprimes[d:f]] = np.inf
+            trouves_d2.append(d2[d2 <= rayon2])
+            trouves_ids.append(self.ids[d:f][d2 <= rayon2])
+
+        d2, ids = np.concatenate(trouves_d2), np.concatenate(trouves_ids)
+        ordre = np.lexsort((ids, d2))
+        return np.sqrt(d2[ordre]), ids[ordre]
@@ -0,0 +1,345 @@
+"""
+Module : Mises à jour en ligne des index (ajout, suppression, compactage)
+==========================================================================
+
+Les moteurs (dct_engine, TP-4, TP-pre) gardent leurs index de recherche
+(aperçus de la cascade, IndexProgressif, arbre k-d) à jour image par
+image, sans réindexer le dossier :
+- un ajout va dans un tampon, parcouru en entier à chaque requête
+- une suppression marque l'image (tombe) : la recherche l'ignore
+- un remplacement est une suppression suivie d'un ajout
+
+Le compactage reconstruit, dans un fil d'exécution séparé, un index sans
+tampon ni tombes. Les recherches continuent sur l'ancien index pendant
+ce temps (aucun verrou côté lecture : une recherche garde la référence
+qu'elle a lue) ; les écritures faites pendant le compactage sont
+journalisées, rejouées sur le nouvel index, qui remplace alors l'ancien
+d'une seule affectation. Rejouer est sans risque : un ajout remplace,
+une suppression d'une image absente ne fait rien.
+
+Structures :
+- MatriceEnLigne : vecteurs normalisés (une ligne par image), meilleurs
+  scores cosinus (aperçus de la cascade de dct_engine)
+- ArbreEnLigne : ArbreKD dont les points sont désignés par une clé
+  (chemin ou nom d'image) plutôt que par leur position
+- IndexProgressif (recherche_progressive.py) : mêmes méthodes
+
+IndexEnLigne enveloppe l'une d'elles et déclenche le compactage quand
+le tampon ou la part de tombes devient trop grand.
+"""
+
+import threading
+
+import numpy as np
+
+from arbre_kd import TAILLE_FEUILLE, ArbreKD
+
+SEUIL_TAMPON = 1024  # Images dans le tampon avant un compactage automatique
+PART_SUPPRIMES = 0.2  # Part d'images supprimées avant un compactage automatique
+
+
+class MatriceEnLigne:
+    """
+    Vecteurs normalisés (float32), une ligne par clé, avec tampon et tombes
+
+    Args:
+        cles (list): Clé de chaque vecteur
+        vecteurs (numpy.ndarray): Matrice (n, dimension)
+    """
+
+    def __init__(self, cles, vecteurs):
+        self.cles = list(cles)
+        matrice = np.asarray(vecteurs, dtype=np.float32)
+        if matrice.ndim != 2:
+            matrice = matrice.reshape(len(self.cles), -1)
+        self.matrice = self._normaliser(matrice)
+        self.dimension = self.matrice.shape[1]
+        self.vivants = np.ones(len(self.cles), dtype=bool)
+        self.nb_supprimes = 0
+        self._positions = {cle: i for i, cle in enumerate(self.cles)}
+        self._tampon = ([], np.empty((0, self.dimension), np.float32))  # (clés, matrice)
+
+    @staticmethod
+    def _normaliser(matrice):
+        return matrice / np.maximum(np.linalg.norm(matrice, axis=1, keepdims=True), 1e-10)
+
+    def __len__(self):
+        return len(self.cles) - self.nb_supprimes + len(self._tampon[0])
+
+    @property
+    def taille_tampon_actuelle(self):
+        return len(self._tampon[0])
+
+    def ajouter(self, cle, vecteur):
+        """Ajoute (ou remplace) le vecteur d'une clé"""
+        cles, matrice = self._tampon
+        vecteur = self._normaliser(np.asarray(vecteur, dtype=np.float32).reshape(1, -1))
+        if cle in cles:
+            i = cles.index(cle)
+            matrice = matrice.copy()
+            matrice[i] = vecteur
+            self._tampon = (cles, matrice)
+            return
+        self._tampon = (cles + [cle], np.vstack([matrice, vecteur]))
+        self._supprimer_matrice(cle)
+
+    def supprimer(self, cle):
+        """
+        Retire une clé
+
+        Returns:
+            bool: True si la clé était présente
+        """
+        cles, matrice = self._tampon
+        if cle in cles:
+            i = cles.index(cle)
+            self._tampon = (cles[:i] + cles[i + 1 :], np.delete(matrice, i, axis=0))
+            return True
+        return self._supprimer_matrice(cle)
+
+    def _supprimer_matrice(self, cle):
+        i = self._positions.pop(cle, None)
+        if i is None:
+            return False
+        self.vivants[i] = False
+        self.nb_supprimes += 1
+        return True
+
+    def meilleurs(self, requetes, k):
+        """
+        Les k clés de plus grand produit scalaire avec la requête
+
+        Args:
+            requetes (numpy.ndarray): Vecteur normalisé, ou matrice
+                (dimension, m) de m requêtes : meilleur score des m gardé
+            k (int): Nombre de clés
+
+        Returns:
+            list: Clés, dans un ordre quelconque
+        """
+        cles_tampon, tampon = self._tampon
+        scores = np.concatenate([self.matrice @ requetes, tampon @ requetes])
+        if scores.ndim == 2:
+            scores = scores.max(axis=1)
+        if self.nb_supprimes:
+            scores[: len(self.cles)][~self.vivants] = -np.inf
+        if k < len(scores):
+            candidats = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidats = np.arange(len(scores))
+        return [
+            self.cles[i] if i < len(self.cles) else cles_tampon[i - len(self.cles)]
+            for i in candidats
+            if scores[i] > -np.inf
+        ]
+
+    def compacte(self):
+        """
+        Nouvelle matrice avec les clés vivantes puis le tampon (self n'est pas modifié)
+
+        Appelée sans le verrou des écritures : un ajout en cours peut avoir
+        déjà placé la clé dans le tampon sans avoir encore retiré sa ligne
+        de la matrice. La version du tampon l'emporte (comme ArbreEnLigne,
+        qui garde le dernier point d'une clé en double).
+        """
+        cles_tampon, tampon = self._tampon
+        positions = np.flatnonzero(self.vivants)
+        if cles_tampon:
+            dans_tampon = set(cles_tampon)
+            positions = [i for i in positions if self.cles[i] not in dans_tampon]
+        nouvelle = MatriceEnLigne([], np.empty((0, self.dimension)))
+        nouvelle.cles = [self.cles[i] for i in positions] + list(cles_tampon)
+        nouvelle.matrice = np.vstack([self.matrice[positions], tampon])  # Déjà normalisées
+        nouvelle.vivants = np.ones(len(nouvelle.cles), dtype=bool)
+        nouvelle._positions = {cle: i for i, cle in enumerate(nouvelle.cles)}
+        return nouvelle
+
+
+class ArbreEnLigne:
+    """
+    ArbreKD dont les points sont désignés par une clé
+
+    Chaque ajout reçoit un nouvel identifiant (croissant : les ex aequo
+    restent dans l'ordre d'ajout) ; `cles[identifiant]` donne sa clé.
+
+    Args:
+        cles (list): Clé de chaque point
+        points (numpy.ndarray): Matrice (n, dimension)
+        dimension (int): Dimension des points (si la base est vide)
+        taille_feuille (int): Nombre maximum de points par feuille
+    """
+
+    def __init__(self, cles, points, dimension=None, taille_feuille=TAILLE_FEUILLE):
+        self.cles = list(cles)
+        points = np.asarray(points, dtype=np.float64)
+        points = points.reshape(len(self.cles), -1 if len(self.cles) else dimension)
+        # Reconstruction seulement au compactage (taille_tampon infinie)
+        self.arbre = ArbreKD(points, taille_feuille=taille_feuille, taille_tampon=np.inf)
+        self._ids = {cle: i for i, cle in enumerate(self.cles)}
+        if len(self._ids) < len(self.cles):
+            # Clé en double : seul le dernier point est gardé
+            self.arbre.supprimer([i for i, cle in enumerate(self.cles) if self._ids[cle] != i])
+
+    def __len__(self):
+        return len(self.arbre)
+
+    def __contains__(self, cle):
+        return cle in self._ids
+
+    @property
+    def dimension(self):
+        return self.arbre.dimension
+
+    @property
+    def nb_supprimes(self):
+        return self.arbre.nb_supprimes
+
+    @property
+    def taille_tampon_actuelle(self):
+        return self.arbre.taille_tampon_actuelle
+
+    def ajouter(self, cle, point):
+        """Ajoute (ou remplace) le point d'une clé"""
+        ancien = self._ids.get(cle)
+        identifiant = len(self.cles)
+        self.cles.append(cle)
+        self.arbre.inserer(point, identifiant)
+        self._ids[cle] = identifiant
+        if ancien is not None:
+            self.arbre.supprimer(ancien)
+
+    def supprimer(self, cle):
+        """
+        Retire une clé
+
+        Returns:
+            bool: True si la clé était présente
+        """
+        identifiant = self._ids.pop(cle, None)
+        if identifiant is None:
+            return False
+        self.arbre.supprimer(identifiant)
+        return True
+
+    def plus_proches(self, requetes, k=5):
+        """ArbreKD.plus_proches : (distances, identifiants), voir `cles`"""
+        return self.arbre.plus_proches(requetes, k)
+
+    def dans_rayon(self, requete, rayon):
+        """ArbreKD.dans_rayon : (distances, identifiants), voir `cles`"""
+        return self.arbre.dans_rayon(requete, rayon)
+
+    def contenu(self):
+        """
+        Clés et points vivants, dans l'ordre d'ajout
+
+        Returns:
+            tuple: (liste des clés, matrice des points)
+        """
+        points, ids = self.arbre.points_vivants()
+        return [self.cles[i] for i in ids], points
+
+    def compacte(self):
+        """Nouvel arbre avec les points vivants et le tampon (self n'est pas modifié)"""
+        cles, points = self.contenu()
+        return ArbreEnLigne(cles, points, self.dimension, self.arbre.taille_feuille)
+
+
+class IndexEnLigne:
+    """
+    Index modifiable pendant les recherches, compacté en arrière-plan
+
+    Les recherches utilisent `structure` (sans verrou) ; ajouter,
+    supprimer et le remplacement de `structure` par sa version compactée
+    se font sous `verrou`.
+
+    Args:
+        structure: MatriceEnLigne, ArbreEnLigne ou IndexProgressif
+        verrou (threading.RLock): Verrou des écritures (partagé avec le moteur)
+        apres_compaction (callable): Appelé (sous le verrou) avec la
+            nouvelle structure, une fois installée
+        automatique (bool): Compacter dès que besoin_compaction() le demande
+    """
+
+    def __init__(self, structure, verrou=None, apres_compaction=None, automatique=True):
+        self.structure = structure
+        self.verrou = verrou if verrou is not None else threading.RLock()
+        self.apres_compaction = apres_compaction
+        self.automatique = automatique
+        self.compactions = 0
+        self._journal = None  # Écritures pendant un compactage, rejouées ensuite
+        self._fil = None
+
+    def __len__(self):
+        return len(self.structure)
+
+    def besoin_compaction(self):
+        structure = self.structure
+        return structure.taille_tampon_actuelle > SEUIL_TAMPON or (
+            structure.nb_supprimes > PART_SUPPRIMES * max(len(structure), 1)
+        )
+
+    def ajouter(self, cle, valeur):
+        """Ajoute (ou remplace) une clé"""
+        with self.verrou:
+            self.structure.ajouter(cle, valeur)
+            if self._journal is not None:
+                self._journal.append((True, cle, valeur))
+            self._compacter_si_besoin()
+
+    def supprimer(self, cle):
+        """
+        Retire une clé
+
+        Returns:
+            bool: True si la clé était présente
+        """
+        with self.verrou:
+            retire = self.structure.supprimer(cle)
+            if self._journal is not None:
+                self._journal.append((False, cle, None))
+            self._compacter_si_besoin()
+        return retire
+
+    def _compacter_si_besoin(self):
+        if self.automatique and self._fil is None and self.besoin_compaction():
+            self.compacter(attendre=False)
+
+    def compacter(self, attendre=True):
+        """
+        Reconstruit la structure sans tampon ni tombes, dans un fil séparé
+
+        Args:
+            attendre (bool): Attendre la fin du compactage
+        """
+        with self.verrou:
+            if self._fil is None:
+                self._journal = []
+                self._fil = threading.Thread(
+                    target=self._compacter, args=(self.structure,), daemon=True
+                )
+                self._fil.start()
+            fil = self._fil
+        if attendre:
+            fil.join()
+
+    def _compacter(self, source):
+        try:
+            nouvelle = source.compacte()
+        except Exception as e:
+            print(f"⚠️ Compactage abandonné : {e}")
+            with self.verrou:
+                self._journal, self._fil = None, None
+            return
+
+        with self.verrou:
+            for ajout, cle, valeur in self._journal:
+                if ajout:
+                    nouvelle.ajouter(cle, valeur)
+                else:
+                    nouvelle.supprimer(cle)
+            self.structure = nouvelle
+            self._journal, self._fil = None, None
+            self.compactions += 1
+            if self.apres_compaction is not None:
+                self.apres_compaction(nouvelle)
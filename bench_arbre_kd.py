@@ -0,0 +1,109 @@
+"""
+Module : Mesure de l'arbre k-d (TP-4 et TP-pre)
+================================================
+
+Temps de construction et de requête de ArbreKD pour des bases de plus
+en plus grandes (jusqu'à plusieurs millions de descripteurs), comparés à
+la force brute vectorisée (toutes les distances d'un coup avec numpy) ;
+les voisins trouvés sont vérifiés identiques.
+
+Descripteurs synthétiques proches des vrais :
+- 4 valeurs (TP-4) : moyenne/écart-type des moyennes et des écarts-types
+  locaux, tirés par familles d'images
+- 30 valeurs (TP-pre) : statistiques des sous-bandes d'ondelettes,
+  fortement corrélées entre elles (quelques facteurs latents + bruit)
+
+Usage :
+    python bench_arbre_kd.py
+    python bench_arbre_kd.py --sizes 100000,1000000 --dims 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from arbre_kd import ArbreKD
+
+
+def descripteurs(n, dimension, rng):
+    """Descripteurs synthétiques : familles (centres) + variations"""
+    nb_familles = max(1, n // 50)
+    if dimension == 4:
+        centres = np.column_stack([
+            rng.uniform(20, 230, nb_familles),  # Moyenne des moyennes
+            rng.gamma(2, 15, nb_familles),  # Écart-type des moyennes
+            rng.gamma(2, 8, nb_familles),  # Moyenne des écarts-types
+            rng.gamma(2, 4, nb_familles),  # Écart-type des écarts-types
+        ])
+        echelle = np.array([3.0, 1.5, 1.0, 0.5])
+    else:
+        facteurs = rng.normal(size=(6, dimension)) * rng.uniform(1, 40, dimension)
+        centres = rng.normal(size=(nb_familles, 6)) @ facteurs
+        echelle = np.full(dimension, 1.0)
+    familles = rng.integers(0, nb_familles, n)
+    return centres[familles] + rng.normal(size=(n, dimension)) * echelle
+
+
+def force_brute(points, requete, k):
+    diff = points - requete
+    d2 = np.einsum("ij,ij->i", diff, diff)
+    meilleurs = np.argpartition(d2, k - 1)[:k]
+    meilleurs = meilleurs[np.lexsort((meilleurs, d2[meilleurs]))]
+    return np.sqrt(d2[meilleurs]), meilleurs
+
+
+def mediane_ms(fonction, requetes):
+    durees = []
+    for requete in requetes:
+        debut = time.perf_counter()
+        fonction(requete)
+        durees.append(time.perf_counter() - debut)
+    return np.median(durees) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arbre k-d contre force brute")
+    parser.add_argument("--sizes", default="10000,100000,1000000,4000000")
+    parser.add_argument("--dims", default="4,30")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for dimension in (int(d) for d in args.dims.split(",")):
+        print(f"\n📐 Dimension {dimension}")
+        for n in (int(s) for s in args.sizes.split(",")):
+            rng = np.random.default_rng(args.seed)
+            points = descripteurs(n, dimension, rng)
+            # Requêtes : images de la base légèrement modifiées
+            requetes = points[rng.choice(n, args.queries)] + rng.normal(size=(args.queries, dimension))
+
+            debut = time.perf_counter()
+            arbre = ArbreKD(points)
+            construction = time.perf_counter() - debut
+
+            distances, ids = arbre.plus_proches(requetes, args.k)
+            exacts = 0
+            for requete, d, i in zip(requetes[:20], distances, ids):
+                attendues, attendus = force_brute(points, requete, args.k)
+                exacts += np.allclose(d, attendues) and set(i) == set(attendus)
+
+            temps_arbre = mediane_ms(lambda q: arbre.plus_proches(q, args.k), requetes)
+            temps_brut = mediane_ms(lambda q: force_brute(points, q, args.k), requetes[:20])
+            debut = time.perf_counter()
+            arbre.plus_proches(requetes, args.k)
+            temps_lot = (time.perf_counter() - debut) / len(requetes) * 1000
+            rayon = float(np.median(distances[:, -1]))
+            temps_rayon = mediane_ms(lambda q: arbre.dans_rayon(q, rayon), requetes)
+            print(
+                f"   {n:>8} : construction {construction:6.1f} s | k-NN {temps_arbre:6.2f} ms"
+                f" (lot {temps_lot:5.2f} ms/requête) | rayon {temps_rayon:6.2f} ms"
+                f" | force brute {temps_brut:7.1f} ms (x{temps_brut / temps_arbre:5.0f})"
+                f" | exacts {exacts}/20"
+            )
+            del arbre, points
+
+
+if __name__ == "__main__":
+    main()
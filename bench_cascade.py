@@ -0,0 +1,338 @@
+"""
+Module : Mesure de la recherche en cascade (dct_engine)
+=========================================================
+
+Compare, sur un grand corpus synthétique (1 000 000 d'images par défaut) :
+- la recherche exhaustive : similarité cosinus avec le descripteur complet
+  de toutes les images
+- la cascade : présélection avec l'aperçu (DCT de la miniature 32x32),
+  puis re-classement des `taille_preselection` candidats avec le
+  descripteur complet
+
+et mesure le rappel@k (part des k meilleurs résultats exhaustifs retrouvés
+par la cascade) et l'accélération, pour plusieurs tailles de présélection.
+
+Le corpus est formé de familles de 10 variantes proches d'une même scène
+(dégradé, texture, formes) ; les requêtes sont des images du corpus
+bruitées et éclaircies. Les descripteurs sont calculés par lots (produits
+matriciels) avec le même calcul que ImageFeatureExtractor, ce qui est
+vérifié au démarrage. Les descripteurs complets sont écrits dans un
+fichier (memmap) : seuls les aperçus restent en mémoire.
+
+Une seconde mesure utilise ImageSearchEngine.rechercher_images_similaires
+lui-même (boucle Python par image) sur un corpus plus petit.
+
+Usage :
+    python bench_cascade.py                                  # 1M images 64x64
+    python bench_cascade.py --images 100000 --shortlists 50,100,1000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from dct_engine import (
+    APERCU_COEFFICIENTS,
+    APERCU_TAILLE,
+    ImageFeatureExtractor,
+    ImageSearchEngine,
+)
+
+BLOCK = 8
+NB_COEFFS = 16  # Coefficients par bloc du descripteur complet (extraire_caracteristiques)
+VARIANTES = 10  # Images par famille
+LOT = 10000
+
+
+def matrice_dct(n=BLOCK):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    d = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    d[0] /= np.sqrt(2.0)
+    return d.astype(np.float32)
+
+
+_DCT = matrice_dct()
+
+
+def dct_blocs(images, nb_coefficients):
+    """
+    Coefficients DCT de tous les blocs 8x8 d'un lot d'images, comme
+    extraire_caracteristiques : blocs ligne par ligne, puis les
+    `nb_coefficients` premiers coefficients de chaque bloc (ligne par ligne)
+
+    Returns:
+        numpy.ndarray: (n, nb_blocs * nb_coefficients) float32
+    """
+    n, h, w = images.shape
+    blocs = images.astype(np.float32).reshape(n, h // BLOCK, BLOCK, w // BLOCK, BLOCK)
+    blocs = blocs.transpose(0, 1, 3, 2, 4)
+    coefficients = (_DCT @ blocs @ _DCT.T).reshape(n, -1, BLOCK * BLOCK)
+    return coefficients[:, :, :nb_coefficients].reshape(n, -1)
+
+
+def apercus(images):
+    """extraire_apercu par lot : miniature par moyenne (INTER_AREA), puis DCT"""
+    n, h, w = images.shape
+    facteur = h // APERCU_TAILLE
+    miniatures = images.astype(np.float32).reshape(
+        n, APERCU_TAILLE, facteur, APERCU_TAILLE, facteur
+    ).mean(axis=(2, 4))
+    # cv2.resize arrondit la miniature en uint8
+    miniatures = np.floor(miniatures + 0.5).astype(np.uint8)
+    return dct_blocs(miniatures, APERCU_COEFFICIENTS)
+
+
+def normaliser(matrice):
+    return matrice / np.maximum(np.linalg.norm(matrice, axis=1, keepdims=True), 1e-10)
+
+
+# ============================================================================
+# Corpus synthétique
+# ============================================================================
+def parametres_familles(nb_familles, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        "gx": rng.uniform(-120, 120, nb_familles),
+        "gy": rng.uniform(-120, 120, nb_familles),
+        "fond": rng.uniform(40, 200, nb_familles),
+        "fx": rng.uniform(0.05, 0.8, nb_familles),
+        "fy": rng.uniform(0.05, 0.8, nb_familles),
+        "phase": rng.uniform(0, 2 * np.pi, nb_familles),
+        "amplitude": rng.uniform(5, 60, nb_familles),
+        "cx": rng.uniform(0, 1, (nb_familles, 2)),
+        "cy": rng.uniform(0, 1, (nb_familles, 2)),
+        "rayon": rng.uniform(0.1, 0.35, (nb_familles, 2)),
+        "valeur": rng.uniform(-100, 100, (nb_familles, 2)),
+    }
+
+
+def generer_lot(params, debut, nb, taille, seed):
+    """Images debut .. debut + nb - 1 (uint8), toujours identiques pour un même seed"""
+    rng = np.random.default_rng((seed, debut))
+    f = (debut + np.arange(nb)) // VARIANTES
+    yy, xx = np.mgrid[0:taille, 0:taille].astype(np.float32) / taille
+
+    def p(nom, jitter=0.0):
+        """Paramètre de la famille de chaque image (+ variation), prêt à diffuser"""
+        valeur = params[nom][f]
+        if jitter:
+            valeur = valeur + rng.normal(0, jitter, valeur.shape)
+        return valeur[:, None, None]
+
+    images = (
+        p("fond", 8)
+        + p("gx") * xx
+        + p("gy") * yy
+        + p("amplitude")
+        * np.sin(p("fx") * taille * xx + p("fy") * taille * yy + p("phase", 0.3))
+    )
+    for b in range(2):
+        cx = params["cx"][f, b] + rng.normal(0, 0.04, nb)
+        cy = params["cy"][f, b] + rng.normal(0, 0.04, nb)
+        disque = (xx - cx[:, None, None]) ** 2 + (yy - cy[:, None, None]) ** 2 < (
+            params["rayon"][f, b][:, None, None] ** 2
+        )
+        images += disque * params["valeur"][f, b][:, None, None]
+    images += rng.normal(0, 3, images.shape)
+    return np.clip(images, 0, 255).astype(np.uint8)
+
+
+def perturber(images, seed):
+    """Requêtes : images bruitées et éclaircies"""
+    rng = np.random.default_rng(seed)
+    bruit = rng.normal(0, 4, images.shape) + rng.uniform(-10, 10, (len(images), 1, 1))
+    return np.clip(images + bruit, 0, 255).astype(np.uint8)
+
+
+def verifier_calcul(images):
+    """Le calcul par lot doit donner les mêmes vecteurs que ImageFeatureExtractor"""
+    extracteur = ImageFeatureExtractor(block_size=BLOCK)
+    complets, reduits = dct_blocs(images, NB_COEFFS), apercus(images)
+    for i, image in enumerate(images):
+        attendu = extracteur.extraire_caracteristiques(image)
+        assert np.allclose(complets[i], attendu, rtol=1e-4, atol=1e-2), "descripteur complet"
+        attendu = extracteur.extraire_apercu(image)
+        assert np.allclose(reduits[i], attendu, rtol=1e-4, atol=1e-2), "aperçu"
+
+
+# ============================================================================
+# Mesures
+# ============================================================================
+def construire(nb_images, taille, chemin, requetes_idx, seed):
+    """
+    Calcule les descripteurs du corpus
+
+    Returns:
+        tuple: (memmap des descripteurs complets normalisés, aperçus
+        normalisés, images des requêtes)
+    """
+    params = parametres_familles(nb_images // VARIANTES + 1, seed)
+    dim = (taille // BLOCK) ** 2 * NB_COEFFS
+    complets = np.lib.format.open_memmap(chemin, mode="w+", dtype=np.float32, shape=(nb_images, dim))
+    reduits = np.empty((nb_images, (APERCU_TAILLE // BLOCK) ** 2 * APERCU_COEFFICIENTS), np.float32)
+    requetes = {}
+
+    for debut in range(0, nb_images, LOT):
+        nb = min(LOT, nb_images - debut)
+        images = generer_lot(params, debut, nb, taille, seed)
+        if debut == 0:
+            verifier_calcul(images[:5])
+        complets[debut : debut + nb] = normaliser(dct_blocs(images, NB_COEFFS))
+        reduits[debut : debut + nb] = normaliser(apercus(images))
+        for i in requetes_idx[(requetes_idx >= debut) & (requetes_idx < debut + nb)]:
+            requetes[i] = images[i - debut]
+        print(f"\r  {debut + nb}/{nb_images} images", end="", flush=True)
+    print()
+    complets.flush()
+    return complets, reduits, perturber(np.stack([requetes[i] for i in requetes_idx]), seed)
+
+
+def top_k(similarites, k):
+    meilleurs = np.argpartition(-similarites, k - 1)[:k]
+    return meilleurs[np.argsort(-similarites[meilleurs])]
+
+
+def exhaustif_par_lot(complets, requetes_complets, k):
+    """Vérité terrain : k meilleurs exhaustifs de chaque requête (un seul passage)"""
+    meilleurs = [np.zeros(0, np.int64)] * len(requetes_complets)
+    scores = [np.zeros(0, np.float32)] * len(requetes_complets)
+    for debut in range(0, len(complets), LOT * 5):
+        similarites = np.asarray(complets[debut : debut + LOT * 5]) @ requetes_complets.T
+        for q in range(len(requetes_complets)):
+            idx = np.concatenate([meilleurs[q], debut + np.arange(similarites.shape[0])])
+            sims = np.concatenate([scores[q], similarites[:, q]])
+            garder = top_k(sims, k)
+            meilleurs[q], scores[q] = idx[garder], sims[garder]
+    return meilleurs
+
+
+def exhaustif(complets, requete, k):
+    """Recherche exhaustive d'une requête (lecture de tous les descripteurs)"""
+    similarites = np.empty(len(complets), np.float32)
+    for debut in range(0, len(complets), LOT * 5):
+        similarites[debut : debut + LOT * 5] = complets[debut : debut + LOT * 5] @ requete
+    return top_k(similarites, k)
+
+
+def cascade(complets, reduits, requete, requete_apercu, k, taille_preselection):
+    candidats = np.argpartition(-(reduits @ requete_apercu), taille_preselection - 1)[
+        :taille_preselection
+    ]
+    candidats.sort()  # Lecture du memmap dans l'ordre du fichier
+    similarites = complets[candidats] @ requete
+    return candidats[top_k(similarites, k)]
+
+
+def mesurer_moteur(nb_images, taille, k, preselections, seed, nb_requetes=10):
+    """Temps de ImageSearchEngine.rechercher_images_similaires (avec / sans cascade)"""
+    params = parametres_familles(nb_images // VARIANTES + 1, seed)
+    moteur = ImageSearchEngine()
+    for debut in range(0, nb_images, LOT):
+        images = generer_lot(params, debut, min(LOT, nb_images - debut), taille, seed)
+        complets = dct_blocs(images, NB_COEFFS).astype(np.float64)
+        reduits = apercus(images).astype(np.float64)
+        for i in range(len(images)):
+            moteur.base_de_donnees[f"img_{debut + i:07d}"] = {
+                "chemin": f"img_{debut + i:07d}",
+                "features": complets[i],
+                "apercu": reduits[i],
+            }
+    rng = np.random.default_rng(seed + 1)
+    premier_lot = generer_lot(params, 0, min(LOT, nb_images), taille, seed)
+    requetes = perturber(premier_lot[rng.choice(len(premier_lot), nb_requetes)], seed)
+    # Construit la matrice des aperçus hors mesure
+    moteur.rechercher_images_similaires(requetes[0], k, cascade=True)
+
+    def chrono(**options):
+        durees, resultats = [], []
+        for requete in requetes:
+            debut = time.perf_counter()
+            resultats.append(
+                [r["nom"] for r in moteur.rechercher_images_similaires(requete, k, **options)]
+            )
+            durees.append(time.perf_counter() - debut)
+        return np.median(durees) * 1000, resultats
+
+    temps_exhaustif, verite = chrono()
+    print(f"\n🔎 ImageSearchEngine, {nb_images} images : exhaustif {temps_exhaustif:.1f} ms")
+    for n in preselections:
+        if n >= nb_images:
+            continue
+        temps, resultats = chrono(cascade=True, taille_preselection=n)
+        rappel = np.mean([len(set(a) & set(b)) / k for a, b in zip(resultats, verite)])
+        print(
+            f"   cascade {n:>6} : {temps:8.1f} ms  x{temps_exhaustif / temps:6.1f}"
+            f"  rappel@{k} {rappel:.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rappel et accélération de la cascade")
+    parser.add_argument("--images", type=int, default=1_000_000)
+    parser.add_argument("--size", type=int, default=64, help="Côté des images (multiple de 32)")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--shortlists", default="50,100,500,1000,5000")
+    parser.add_argument("--engine-images", type=int, default=20000)
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    preselections = [int(n) for n in args.shortlists.split(",")]
+    rng = np.random.default_rng(args.seed)
+    requetes_idx = np.sort(rng.choice(args.images, args.queries, replace=False))
+    chemin = os.path.join(args.workdir, "bench_cascade_features.npy")
+
+    print(f"🖼️ Corpus : {args.images} images {args.size}x{args.size}")
+    debut = time.perf_counter()
+    complets, reduits, requetes = construire(
+        args.images, args.size, chemin, requetes_idx, args.seed
+    )
+    print(
+        f"   descripteurs en {time.perf_counter() - debut:.0f}s :"
+        f" complet {complets.shape[1]} valeurs ({complets.nbytes / 1e9:.2f} Go, memmap),"
+        f" aperçu {reduits.shape[1]} ({reduits.nbytes / 1e6:.0f} Mo)"
+    )
+
+    try:
+        requetes_complets = normaliser(dct_blocs(requetes, NB_COEFFS))
+        requetes_apercus = normaliser(apercus(requetes))
+        verite = exhaustif_par_lot(complets, requetes_complets, args.k)
+
+        # Exhaustif : quelques requêtes seulement (chacune relit tout le fichier)
+        durees = []
+        for q in range(min(3, args.queries)):
+            t = time.perf_counter()
+            exhaustif(complets, requetes_complets[q], args.k)
+            durees.append(time.perf_counter() - t)
+        temps_exhaustif = np.median(durees) * 1000
+        print(f"\n🔎 Exhaustif : {temps_exhaustif:.1f} ms par requête")
+
+        for n in preselections:
+            durees, rappels = [], []
+            for q in range(args.queries):
+                t = time.perf_counter()
+                trouves = cascade(
+                    complets, reduits, requetes_complets[q], requetes_apercus[q], args.k, n
+                )
+                durees.append(time.perf_counter() - t)
+                rappels.append(len(set(trouves) & set(verite[q])) / args.k)
+            temps = np.median(durees) * 1000
+            print(
+                f"   cascade {n:>6} : {temps:8.1f} ms  x{temps_exhaustif / temps:6.1f}"
+                f"  rappel@{args.k} {np.mean(rappels):.3f} (min {np.min(rappels):.1f})"
+            )
+    finally:
+        del complets
+        os.remove(chemin)
+
+    if args.engine_images:
+        mesurer_moteur(args.engine_images, args.size, args.k, preselections, args.seed)
+
+
+if __name__ == "__main__":
+    main()
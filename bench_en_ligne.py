@@ -0,0 +1,177 @@
+"""
+Module : Mesure des mises à jour en ligne (ajouts, suppressions, compactage)
+=============================================================================
+
+Flux d'ingestion simulé sur les index de base_en_ligne.py : à partir
+d'une base de n descripteurs, une suite d'ajouts, de remplacements et
+de suppressions (retraits) pendant qu'un fil de lecture enchaîne les
+recherches. Le compactage automatique tourne en arrière-plan.
+
+Mesures :
+- débit des écritures (opérations par seconde)
+- latence médiane et maximale des recherches pendant l'ingestion
+- nombre de compactages
+- exactitude : à intervalles réguliers, les k plus proches voisins sont
+  comparés à la force brute sur l'état attendu de la base
+
+Structures :
+- ArbreEnLigne (TP-4 : 4 valeurs, TP-pre : 30 valeurs)
+- IndexProgressif (descripteurs DCT de dct_engine, similarité cosinus)
+
+Usage :
+    python bench_en_ligne.py
+    python bench_en_ligne.py --size 1000000 --ops 20000 --dims 4
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from base_en_ligne import ArbreEnLigne, IndexEnLigne
+from bench_arbre_kd import descripteurs
+from recherche_progressive import IndexProgressif
+
+LONGUEUR_DCT = 1024  # Image 64x64 : 64 blocs x 16 coefficients
+
+
+class Lecteur(threading.Thread):
+    """Recherches en continu sur la structure courante de l'index"""
+
+    def __init__(self, index, requetes, rechercher):
+        super().__init__(daemon=True)
+        self.index = index
+        self.requetes = requetes
+        self.rechercher = rechercher
+        self.durees = []
+        self.arreter = False
+
+    def run(self):
+        i = 0
+        while not self.arreter:
+            debut = time.perf_counter()
+            self.rechercher(self.index.structure, self.requetes[i % len(self.requetes)])
+            self.durees.append(time.perf_counter() - debut)
+            i += 1
+
+
+def ingerer(index, etat, nouveaux, nb_operations, rng, verifier):
+    """Ajouts (50 %), remplacements (20 %) et retraits (30 %) ; `etat` suit la base attendue"""
+    cles = list(etat)
+    exacts = verifications = 0
+    debut = time.perf_counter()
+    for operation in range(nb_operations):
+        tirage = rng.random()
+        if tirage < 0.5:
+            cle = f"nouvelle_{operation}"
+            etat[cle] = nouveaux[operation]
+            cles.append(cle)
+            index.ajouter(cle, etat[cle])
+        else:
+            position = int(rng.integers(len(cles)))
+            cle = cles[position]
+            if tirage < 0.7:
+                etat[cle] = nouveaux[operation]
+                index.ajouter(cle, etat[cle])
+            else:
+                cles[position] = cles[-1]
+                cles.pop()
+                del etat[cle]
+                index.supprimer(cle)
+        if operation % (nb_operations // 10) == 0:
+            verifications += 1
+            exacts += verifier(index.structure, etat, rng)
+    return time.perf_counter() - debut, exacts, verifications
+
+
+def verifier_arbre(k):
+    def verifier(arbre, etat, rng):
+        cles = list(etat)
+        points = np.array([etat[c] for c in cles])
+        requete = points[rng.integers(len(points))] + rng.normal(size=points.shape[1])
+        distances, ids = arbre.plus_proches(requete, k)
+        attendues = np.sort(np.linalg.norm(points - requete, axis=1))[:k]
+        trouves = [np.linalg.norm(etat[arbre.cles[i]] - requete) for i in ids]
+        return np.allclose(distances, attendues) and np.allclose(trouves, distances)
+    return verifier
+
+
+def verifier_progressif(k):
+    def verifier(index, etat, rng):
+        cles = list(etat)
+        matrice = np.array([etat[c] for c in cles])
+        requete = matrice[rng.integers(len(matrice))] + rng.normal(size=matrice.shape[1])
+        similarites = matrice @ requete / np.linalg.norm(matrice, axis=1) / np.linalg.norm(requete)
+        attendues = np.sort(similarites)[::-1][:k]
+        return np.allclose([s for _, s in index.rechercher(requete, k)], attendues, atol=1e-5)
+    return verifier
+
+
+def rapport(nom, n, nb_operations, duree, lecteur, index, exacts, verifications):
+    durees = np.array(lecteur.durees) * 1000
+    print(
+        f"   {nom:<16} {n:>8} : {nb_operations / duree:8.0f} écritures/s"
+        f" | recherche médiane {np.median(durees):6.2f} ms, max {durees.max():7.1f} ms"
+        f" ({len(durees)} recherches) | compactages {index.compactions}"
+        f" | exacts {exacts}/{verifications}"
+    )
+
+
+def mesurer_arbre(n, dimension, args):
+    rng = np.random.default_rng(args.seed)
+    points = descripteurs(n + args.ops, dimension, rng)
+    etat = {f"image_{i}": points[i] for i in range(n)}
+    index = IndexEnLigne(ArbreEnLigne(list(etat), points[:n]))
+    requetes = points[rng.choice(n, 100)] + rng.normal(size=(100, dimension))
+
+    lecteur = Lecteur(index, requetes, lambda arbre, q: arbre.plus_proches(q, args.k))
+    lecteur.start()
+    duree, exacts, verifications = ingerer(
+        index, etat, points[n:], args.ops, rng, verifier_arbre(args.k)
+    )
+    lecteur.arreter = True
+    lecteur.join()
+    index.compacter()
+    rapport(f"arbre k-d ({dimension})", n, args.ops, duree, lecteur, index, exacts, verifications)
+
+
+def mesurer_progressif(n, args):
+    rng = np.random.default_rng(args.seed)
+    # Énergie décroissante avec la fréquence, comme les coefficients DCT
+    echelle = 1.0 / (1 + np.arange(LONGUEUR_DCT) % 16)
+    valeurs = (rng.normal(size=(n + args.ops, LONGUEUR_DCT)) * echelle).astype(np.float32)
+    etat = {f"image_{i}": valeurs[i] for i in range(n)}
+    index = IndexEnLigne(IndexProgressif(list(etat), valeurs[:n], 16))
+    requetes = valeurs[rng.choice(n, 20)] + rng.normal(size=(20, LONGUEUR_DCT)).astype(np.float32) * echelle
+
+    lecteur = Lecteur(index, requetes, lambda idx, q: idx.rechercher(q, args.k))
+    lecteur.start()
+    duree, exacts, verifications = ingerer(
+        index, etat, valeurs[n:], args.ops, rng, verifier_progressif(args.k)
+    )
+    lecteur.arreter = True
+    lecteur.join()
+    index.compacter()
+    rapport("progressif (DCT)", n, args.ops, duree, lecteur, index, exacts, verifications)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index en ligne : écritures pendant les recherches")
+    parser.add_argument("--size", type=int, default=200000, help="Images dans la base de départ")
+    parser.add_argument("--dct-size", type=int, default=20000, help="Base de départ (IndexProgressif)")
+    parser.add_argument("--ops", type=int, default=5000, help="Écritures")
+    parser.add_argument("--dims", default="4,30")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("\n✍️ Écritures pendant les recherches (compactage en arrière-plan)")
+    for dimension in (int(d) for d in args.dims.split(",")):
+        mesurer_arbre(args.size, dimension, args)
+    if args.dct_size:
+        mesurer_progressif(args.dct_size, args)
+
+
+if __name__ == "__main__":
+    main()
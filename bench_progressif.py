@@ -0,0 +1,189 @@
+"""
+Module : Mesure de la recherche progressive (abandon anticipé)
+===============================================================
+
+Compare, pour plusieurs tailles de corpus synthétique (même générateur
+que bench_cascade.py), la recherche exacte des k images les plus
+similaires (similarité cosinus) :
+- force brute : produit matrice-vecteur sur tout l'index (mêmes valeurs,
+  rangées par dimension), puis sélection des k meilleures
+- IndexProgressif.rechercher : lecture par tranches de dimensions et
+  abandon des images qui ne peuvent plus entrer dans le top k, pour
+  plusieurs tailles de tranche, avec les dimensions rangées par fréquence
+  (ordre de l'index) ou dans l'ordre du descripteur (pour comparaison)
+
+Les résultats des deux recherches sont vérifiés identiques pour chaque
+requête ; la part des valeurs lues est indiquée.
+
+Une dernière mesure utilise ImageSearchEngine.rechercher_images_similaires
+(dct_engine), exhaustif et progressif.
+
+Usage :
+    python bench_progressif.py
+    python bench_progressif.py --corpus 10000,100000 --chunks 32,64 --dtype float32
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import recherche_progressive
+from bench_cascade import (
+    LOT,
+    NB_COEFFS,
+    VARIANTES,
+    dct_blocs,
+    generer_lot,
+    parametres_familles,
+    perturber,
+)
+from dct_engine import ImageSearchEngine
+from recherche_progressive import IndexProgressif
+
+
+def construire(nb_images, taille, dtype, nb_requetes, seed):
+    """
+    Descripteurs du corpus (une ligne par image) et des requêtes (images du
+    corpus bruitées et éclaircies)
+    """
+    params = parametres_familles(nb_images // VARIANTES + 1, seed)
+    dim = (taille // 8) ** 2 * NB_COEFFS
+    descripteurs = np.empty((nb_images, dim), dtype)
+    rng = np.random.default_rng(seed)
+    requetes_idx = np.sort(rng.choice(nb_images, nb_requetes, replace=False))
+    requetes = []
+
+    for debut in range(0, nb_images, LOT):
+        nb = min(LOT, nb_images - debut)
+        images = generer_lot(params, debut, nb, taille, seed)
+        descripteurs[debut : debut + nb] = dct_blocs(images, NB_COEFFS)
+        choisies = requetes_idx[(requetes_idx >= debut) & (requetes_idx < debut + nb)]
+        requetes.extend(images[choisies - debut])
+    requetes = dct_blocs(perturber(np.stack(requetes), seed), NB_COEFFS).astype(dtype)
+    return descripteurs, requetes
+
+
+def force_brute(index, requete, k):
+    """Top k exact par un seul produit matrice-vecteur sur tout l'index"""
+    groupe = index.groupes[0]
+    q = requete[groupe.ordre].astype(groupe.valeurs.dtype)
+    _, cumul = groupe.prefixe(len(requete), index.taille_tranche)
+    normes2 = cumul[-1]
+    similarites = (q @ groupe.valeurs) / np.maximum(np.sqrt(normes2) * np.linalg.norm(q), 1e-300)
+    meilleurs = np.argpartition(-similarites, k - 1)[:k]
+    return meilleurs[np.argsort(-similarites[meilleurs], kind="stable")], similarites
+
+
+def chrono(fonction, requetes):
+    durees, resultats = [], []
+    for requete in requetes:
+        debut = time.perf_counter()
+        resultats.append(fonction(requete))
+        durees.append(time.perf_counter() - debut)
+    return np.median(durees) * 1000, resultats
+
+
+def meme_top_k(trouves, attendus, similarites, k):
+    """Même résultat que la force brute (aux ex aequo près au rang k)"""
+    scores = np.array([s for _, s in trouves])
+    seuil = similarites[attendus[-1]]
+    return len(trouves) == k and np.allclose(scores, similarites[attendus], rtol=0, atol=1e-6) and (
+        all(similarites[int(nom)] >= seuil - 1e-6 for nom, _ in trouves)
+    )
+
+
+def mesurer_corpus(nb_images, args, tranches):
+    descripteurs, requetes = construire(
+        nb_images, args.size, args.dtype, args.queries, args.seed
+    )
+    noms = [str(i) for i in range(nb_images)]
+    print(
+        f"\n🖼️ {nb_images} images {args.size}x{args.size} : {descripteurs.shape[1]} valeurs"
+        f" ({descripteurs.nbytes / 1e6:.0f} Mo, {args.dtype})"
+    )
+
+    index = IndexProgressif(noms, descripteurs, NB_COEFFS)
+    index_naturel = None
+    if args.natural:
+        # nb_coefficients=1 : dimensions dans l'ordre du descripteur
+        index_naturel = IndexProgressif(noms, descripteurs, 1)
+    del descripteurs
+
+    temps_brut, verite = chrono(lambda q: force_brute(index, q, args.k), requetes)
+    print(f"   force brute          : {temps_brut:8.1f} ms")
+
+    for nom, idx in (("fréquences", index), ("ordre naturel", index_naturel)):
+        if idx is None:
+            continue
+        for tranche in tranches:
+            idx.taille_tranche = tranche
+            idx.rechercher(requetes[0], args.k)  # Normes cumulées par tranche, hors mesure
+            fractions = []
+
+            def rechercher(q):
+                trouves = idx.rechercher(q, args.k)
+                fractions.append(idx.stats["valeurs_lues"] / idx.stats["valeurs_total"])
+                return trouves
+
+            temps, resultats = chrono(rechercher, requetes)
+            exacts = sum(
+                meme_top_k(r, attendus, similarites, args.k)
+                for r, (attendus, similarites) in zip(resultats, verite)
+            )
+            print(
+                f"   {nom:<13} {tranche:>4} : {temps:8.1f} ms  x{temps_brut / temps:5.2f}"
+                f"  lu {np.mean(fractions) * 100:5.1f} %  exacts {exacts}/{len(requetes)}"
+            )
+
+
+def mesurer_moteur(nb_images, taille, k, seed, nb_requetes=10):
+    """ImageSearchEngine (dct_engine) : exhaustif et progressif"""
+    params = parametres_familles(nb_images // VARIANTES + 1, seed)
+    moteur = ImageSearchEngine()
+    for debut in range(0, nb_images, LOT):
+        images = generer_lot(params, debut, min(LOT, nb_images - debut), taille, seed)
+        for i, descripteur in enumerate(dct_blocs(images, NB_COEFFS).astype(np.float64)):
+            nom = f"img_{debut + i:07d}"
+            moteur.base_de_donnees[nom] = {"chemin": nom, "features": descripteur}
+    rng = np.random.default_rng(seed + 1)
+    premier_lot = generer_lot(params, 0, min(LOT, nb_images), taille, seed)
+    requetes = perturber(premier_lot[rng.choice(len(premier_lot), nb_requetes)], seed)
+    moteur.rechercher_images_similaires(requetes[0], k, progressif=True)  # Index hors mesure
+
+    def noms(**options):
+        return lambda q: [r["nom"] for r in moteur.rechercher_images_similaires(q, k, **options)]
+
+    temps_exhaustif, attendus = chrono(noms(), requetes)
+    temps, trouves = chrono(noms(progressif=True), requetes)
+    identiques = sum(a == b for a, b in zip(attendus, trouves))
+    print(
+        f"\n🔎 ImageSearchEngine, {nb_images} images : exhaustif {temps_exhaustif:.1f} ms,"
+        f" progressif {temps:.1f} ms (x{temps_exhaustif / temps:.0f}),"
+        f" mêmes résultats {identiques}/{nb_requetes}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche progressive contre force brute")
+    parser.add_argument("--corpus", default="10000,50000,200000", help="Tailles de corpus")
+    parser.add_argument("--size", type=int, default=64, help="Côté des images (multiple de 8)")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--chunks", default=f"32,{recherche_progressive.TAILLE_TRANCHE},128")
+    parser.add_argument("--dtype", default="float64", choices=["float32", "float64"])
+    parser.add_argument("--natural", action="store_true", help="Mesurer aussi l'ordre naturel")
+    parser.add_argument("--engine-images", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tranches = [int(n) for n in args.chunks.split(",")]
+    for nb_images in (int(n) for n in args.corpus.split(",")):
+        mesurer_corpus(nb_images, args, tranches)
+
+    if args.engine_images:
+        mesurer_moteur(args.engine_images, args.size, args.k, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""
+Module : Banc d'essai des moteurs de recherche d'images
+========================================================
+
+Mesure, pour chacun des quatre moteurs du dépôt :
+- dct     : dct_engine.py (DCT niveaux de gris, 16 coefficients par bloc)
+- tp_dct  : tp_dct_comparaison_images.py (DCT YCbCr, zigzag)
+- tp4     : TP-4/main.py (moyenne / écart-type locaux)
+- tppre   : TP-pre/main.py (ondelettes wavedec2)
+
+les métriques suivantes sur un corpus synthétique :
+- temps d'extraction par image (moyenne, p50, p90)
+- débit d'indexation (images/s)
+- latence des requêtes (p50, p90, p99)
+- pic de mémoire (RSS) du processus
+
+Chaque moteur tourne dans son propre processus (pic RSS indépendant).
+Aucune fenêtre n'est ouverte : fonctionne sans affichage.
+
+Usage :
+    python benchmark.py                              # 40 images 640x480
+    python benchmark.py --images 200 --size 1024x768 --engines dct,tp4
+    python benchmark.py --update-baseline            # enregistre la référence
+    python benchmark.py --fail-on-regression         # code 1 si régression
+
+Référence : bench_baseline.json, versionné à la racine du dépôt. Il est
+produit par `python benchmark.py --update-baseline` avec la configuration
+par défaut (40 images 640x480, 20 requêtes, top 5) ; les clés "config" et
+"machine" du fichier indiquent avec quoi il a été mesuré. Les temps
+dépendent de la machine : régénérer la référence (et la committer) sur la
+machine qui lance --fail-on-regression. bench_results.json, la dernière
+mesure, n'est pas versionné.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+ENGINES = ["dct", "tp_dct", "tp4", "tppre"]
+BASELINE_PATH = ROOT / "bench_baseline.json"
+
+# Métriques comparées à la référence : (chemin, plus grand = mieux)
+COMPARED_METRICS = [
+    (("extract_ms", "p50"), False),
+    (("index_images_per_s",), True),
+    (("query_ms", "p50"), False),
+    (("query_ms", "p99"), False),
+    (("peak_rss_mb",), False),
+]
+
+
+# ============================================================================
+# Corpus synthétique
+# ============================================================================
+def generer_corpus(dossier, nb_images, taille, seed=0):
+    """
+    Génère des images JPEG variées (dégradés, textures, formes, bruit)
+
+    Args:
+        dossier (str): Dossier de destination
+        nb_images (int): Nombre d'images
+        taille (tuple): (largeur, hauteur)
+
+    Returns:
+        list: Chemins des images générées
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    largeur, hauteur = taille
+    yy, xx = np.mgrid[0:hauteur, 0:largeur].astype(np.float32)
+    chemins = []
+    os.makedirs(dossier, exist_ok=True)
+
+    for i in range(nb_images):
+        image = np.empty((hauteur, largeur, 3), dtype=np.float32)
+        for c in range(3):
+            # Dégradé + texture sinusoïdale de fréquence aléatoire
+            fx, fy = rng.uniform(0.005, 0.2, size=2)
+            image[:, :, c] = (
+                rng.uniform(0, 255) * (xx / largeur)
+                + rng.uniform(0, 100) * np.sin(fx * xx + fy * yy + rng.uniform(0, 6.3))
+            )
+        for _ in range(rng.integers(2, 8)):
+            centre = (int(rng.integers(0, largeur)), int(rng.integers(0, hauteur)))
+            rayon = int(rng.integers(5, max(6, min(largeur, hauteur) // 4)))
+            couleur = [float(v) for v in rng.uniform(0, 255, size=3)]
+            cv2.circle(image, centre, rayon, couleur, -1)
+        image += rng.normal(0, rng.uniform(2, 20), size=image.shape)
+        chemin = os.path.join(dossier, f"synth_{i:05d}.jpg")
+        cv2.imwrite(chemin, np.clip(image, 0, 255).astype(np.uint8))
+        chemins.append(chemin)
+    return chemins
+
+
+# ============================================================================
+# Adaptateurs des moteurs (même interface pour les quatre)
+# ============================================================================
+def _charger_module(nom, chemin):
+    """Importe un fichier (TP-4/main.py, TP-pre/main.py) sous un nom unique"""
+    spec = importlib.util.spec_from_file_location(nom, chemin)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class DctAdapter:
+    def __init__(self):
+        import dct_engine
+
+        self.moteur = dct_engine.ImageSearchEngine()
+
+    def charger(self, chemin):
+        return self.moteur.extracteur.charger_image(chemin)
+
+    def extraire(self, image):
+        return self.moteur.extracteur.extraire_caracteristiques(image)
+
+    def indexer(self, dossier):
+        return self.moteur.indexer_dossier(dossier)
+
+    def rechercher(self, requete, top_k):
+        return self.moteur.rechercher_images_similaires(requete, top_k)
+
+
+class TpDctAdapter(DctAdapter):
+    def __init__(self):
+        import tp_dct_comparaison_images
+
+        self.moteur = tp_dct_comparaison_images.ImageSearchEngine()
+
+
+class Tp4Adapter:
+    """TP-4 : partie calcul (LocalStatsEngine), sans la fenêtre Tk"""
+
+    def __init__(self):
+        module = _charger_module("tp4_main", ROOT / "TP-4" / "main.py")
+        self.moteur = module.LocalStatsEngine()
+
+    def charger(self, chemin):
+        return self.moteur.convert_to_grayscale(chemin)
+
+    def extraire(self, image):
+        return self.moteur.compute_local_descriptor(image)
+
+    def indexer(self, dossier):
+        return self.moteur.index_folder(dossier)
+
+    def rechercher(self, requete, top_k):
+        # Même calcul que LocalStatsEngine.search(), sur l'image déjà chargée
+        return self.moteur.search_descriptor(self.extraire(requete), top_k)
+
+
+class TpPreAdapter:
+    def __init__(self):
+        self.module = _charger_module("tppre_main", ROOT / "TP-pre" / "main.py")
+        self.moteur = None
+
+    def charger(self, chemin):
+        import cv2
+
+        # Même décodage que extract_texture_features(chemin), hors mesure
+        return cv2.imread(str(chemin), cv2.IMREAD_GRAYSCALE)
+
+    def extraire(self, image):
+        return self._moteur_vide().extract_texture_features(image)
+
+    def _moteur_vide(self):
+        if self.moteur is None:
+            self.moteur = self.module.TextureSearchEngine(auto_load=False)
+        return self.moteur
+
+    def indexer(self, dossier):
+        self.moteur = self.module.TextureSearchEngine(dataset_folder=dossier)
+        self.moteur.build_features_database()
+        return len(self.moteur.features_db)
+
+    def rechercher(self, requete, top_k):
+        return self.moteur.search(requete, top_k)
+
+
+ADAPTERS = {
+    "dct": DctAdapter,
+    "tp_dct": TpDctAdapter,
+    "tp4": Tp4Adapter,
+    "tppre": TpPreAdapter,
+}
+
+
+# ============================================================================
+# Mesures
+# ============================================================================
+def percentiles(valeurs_ms, niveaux=(50, 90, 99)):
+    valeurs = np.asarray(valeurs_ms, dtype=np.float64)
+    resultat = {"mean": round(float(valeurs.mean()), 3)}
+    for p in niveaux:
+        resultat[f"p{p}"] = round(float(np.percentile(valeurs, p)), 3)
+    return resultat
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus courant (None si indisponible)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sur macOS, kilo-octets sur Linux
+    return round(pic / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def mesurer_moteur(nom, dossier, nb_requetes, top_k):
+    """Exécute toutes les mesures d'un moteur (dans le processus courant)"""
+    # Importer le moteur depuis la racine, sans affichage
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    chemins = sorted(str(p) for p in Path(dossier).iterdir())
+    debut = time.perf_counter()
+    adapter = ADAPTERS[nom]()
+    import_s = time.perf_counter() - debut
+
+    # 1. Extraction image par image (chargement exclu)
+    temps_extraction = []
+    for chemin in chemins:
+        image = adapter.charger(chemin)
+        t = time.perf_counter()
+        adapter.extraire(image)
+        temps_extraction.append((time.perf_counter() - t) * 1000)
+
+    # 2. Indexation complète du dossier (chargement inclus)
+    t = time.perf_counter()
+    nb_indexees = adapter.indexer(dossier)
+    index_s = time.perf_counter() - t
+
+    # 3. Requêtes (images du corpus, déjà chargées)
+    requetes = [adapter.charger(chemins[i % len(chemins)]) for i in range(nb_requetes)]
+    temps_requetes = []
+    for requete in requetes:
+        t = time.perf_counter()
+        adapter.rechercher(requete, top_k)
+        temps_requetes.append((time.perf_counter() - t) * 1000)
+
+    return {
+        "engine": nom,
+        "images": nb_indexees,
+        "import_s": round(import_s, 3),
+        "extract_ms": percentiles(temps_extraction, (50, 90)),
+        "index_s": round(index_s, 3),
+        "index_images_per_s": round(nb_indexees / index_s, 2) if index_s else None,
+        "query_ms": percentiles(temps_requetes),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def lancer_moteur(nom, dossier, nb_requetes, top_k):
+    """Lance les mesures d'un moteur dans un sous-processus isolé"""
+    commande = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--run-engine",
+        nom,
+        "--corpus",
+        dossier,
+        "--queries",
+        str(nb_requetes),
+        "--top-k",
+        str(top_k),
+    ]
+    env = dict(os.environ, MPLBACKEND="Agg")
+    sortie = subprocess.run(
+        commande, capture_output=True, text=True, env=env, cwd=str(ROOT)
+    )
+    if sortie.returncode != 0:
+        return {"engine": nom, "error": sortie.stderr.strip().splitlines()[-1:]}
+    # La dernière ligne est le JSON (les moteurs affichent leur progression avant)
+    return json.loads(sortie.stdout.strip().splitlines()[-1])
+
+
+# ============================================================================
+# Comparaison avec la référence
+# ============================================================================
+def _valeur(resultat, chemin):
+    for cle in chemin:
+        if not isinstance(resultat, dict) or cle not in resultat:
+            return None
+        resultat = resultat[cle]
+    return resultat
+
+
+def comparer(resultats, reference, seuil):
+    """
+    Affiche l'évolution par rapport à la référence
+
+    Returns:
+        list: Régressions (moteur, métrique, variation en %)
+    """
+    par_moteur = {r["engine"]: r for r in reference.get("results", [])}
+    if reference.get("config") != resultats.get("config"):
+        print("⚠️ Configuration différente de la référence : comparaison indicative")
+
+    regressions = []
+    for resultat in resultats["results"]:
+        ancien = par_moteur.get(resultat["engine"])
+        if not ancien or "error" in resultat:
+            continue
+        print(f"\n📊 {resultat['engine']}")
+        for chemin, plus_grand_mieux in COMPARED_METRICS:
+            avant, apres = _valeur(ancien, chemin), _valeur(resultat, chemin)
+            if not avant or apres is None:
+                continue
+            variation = (apres - avant) / avant * 100
+            pire = -variation if plus_grand_mieux else variation
+            marque = "⚠️" if pire > seuil else ("✅" if pire < -seuil else "  ")
+            print(
+                f"   {marque} {'.'.join(chemin):<22} {avant:>10.2f} -> {apres:>10.2f}"
+                f" ({variation:+.1f}%)"
+            )
+            if pire > seuil:
+                regressions.append((resultat["engine"], ".".join(chemin), variation))
+    return regressions
+
+
+def afficher(resultats):
+    print(
+        f"\n{'moteur':<8} {'extract p50':>12} {'index img/s':>12}"
+        f" {'req p50':>9} {'req p99':>9} {'RSS Mo':>8}"
+    )
+    for r in resultats["results"]:
+        if "error" in r:
+            print(f"{r['engine']:<8} ❌ {r['error']}")
+            continue
+        print(
+            f"{r['engine']:<8} {r['extract_ms']['p50']:>10.2f}ms"
+            f" {r['index_images_per_s']:>12.1f}"
+            f" {r['query_ms']['p50']:>7.2f}ms {r['query_ms']['p99']:>7.2f}ms"
+            f" {r['peak_rss_mb'] if r['peak_rss_mb'] is not None else '-':>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai des moteurs d'images")
+    parser.add_argument("--images", type=int, default=40, help="Taille du corpus")
+    parser.add_argument("--size", default="640x480", help="Résolution LxH")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--corpus", help="Dossier d'images existant (sinon généré)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Seuil en %%")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--run-engine", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_engine:
+        # Sous-processus : une seule ligne JSON sur la sortie standard
+        resultat = mesurer_moteur(args.run_engine, args.corpus, args.queries, args.top_k)
+        print(json.dumps(resultat))
+        return 0
+
+    taille = tuple(int(v) for v in args.size.lower().split("x"))
+    moteurs = [m.strip() for m in args.engines.split(",") if m.strip()]
+    inconnus = set(moteurs) - set(ADAPTERS)
+    if inconnus:
+        parser.error(f"Moteurs inconnus : {', '.join(sorted(inconnus))}")
+
+    with tempfile.TemporaryDirectory(prefix="bench_corpus_") as tmp:
+        dossier = args.corpus
+        if not dossier:
+            dossier = os.path.join(tmp, "corpus")
+            t = time.perf_counter()
+            generer_corpus(dossier, args.images, taille)
+            print(
+                f"🧪 Corpus synthétique : {args.images} images {args.size}"
+                f" ({time.perf_counter() - t:.1f}s)"
+            )
+
+        resultats = {
+            "config": {
+                "images": len(os.listdir(dossier)),
+                "size": args.size if not args.corpus else None,
+                "queries": args.queries,
+                "top_k": args.top_k,
+            },
+            "machine": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": [],
+        }
+        for nom in moteurs:
+            print(f"⏱️ {nom}...")
+            resultats["results"].append(
+                lancer_moteur(nom, dossier, args.queries, args.top_k)
+            )
+
+    afficher(resultats)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(resultats, f, indent=2)
+    print(f"\n💾 Résultats : {args.output}")
+
+    regressions = []
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, indent=2)
+        print(f"📌 Référence mise à jour : {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = comparer(resultats, json.load(f), args.threshold)
+        print(f"\n{len(regressions)} régression(s) au-delà de {args.threshold:.0f}%")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
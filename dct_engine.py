@@ -6,15 +6,28 @@ Ce module contient toute la logique pour :
 - Extraire les caractéristiques DCT des images
 - Comparer deux images
 - Rechercher des images similaires
+- Ajouter, retirer ou remplacer une image sans réindexer (base_en_ligne.py)
 
 Auteur : TP ISI
 """
 
+import threading
+
 import numpy as np
 import cv2
-from scipy.fftpack import dct
 from pathlib import Path
 
+from base_en_ligne import IndexEnLigne, MatriceEnLigne
+from dct_symetries import TRANSFORMATIONS, variantes_diedrales
+from instrumentation import profiler
+from recherche_progressive import IndexProgressif
+from sources_images import decoder, decrire, lire_manifeste, parcourir
+
+# Recherche en cascade : descripteur réduit (DCT d'une miniature)
+APERCU_TAILLE = 32  # Miniature 32x32 -> 4x4 blocs de 8x8
+APERCU_COEFFICIENTS = 4  # Coefficients gardés par bloc de la miniature
+TAILLE_PRESELECTION = 100  # Candidats re-classés avec le descripteur complet
+
 
 # ============================================================================
 # CLASSE 1 : Extraction des caractéristiques DCT
@@ -35,39 +48,58 @@ class ImageFeatureExtractor:
             block_size (int): Taille des blocs pour la DCT (8x8 par défaut)
         """
         self.block_size = block_size
+        # Sans effet si le profilage est désactivé (voir instrumentation.py)
+        profiler.instrument(
+            self,
+            charger_image="charger_image",
+            extraire_caracteristiques="extraction",
+            extraire_apercu="apercu",
+            appliquer_dct="dct",
+            extraire_coefficients_zigzag="zigzag",
+        )
     
     def charger_image(self, chemin_image):
         """
         Charge une image en noir et blanc
         
         Args:
-            chemin_image (str): Chemin vers l'image
+            chemin_image (str | bytes): Chemin vers l'image, localisateur
+                archive!membre, ou octets du fichier image en mémoire
+                (voir sources_images.py)
             
         Returns:
             numpy.ndarray: Image en niveaux de gris, ou None si erreur
         """
         try:
-            image = cv2.imread(str(chemin_image), cv2.IMREAD_GRAYSCALE)
+            image = decoder(chemin_image, cv2.IMREAD_GRAYSCALE)
             if image is not None:
-                return image
+                profiler.count("images_decodees")
+                profiler.count("octets_decodes", image.nbytes)
+                return profiler.track_array("image", image)
             else:
-                print(f"⚠️ Impossible de charger l'image : {chemin_image}")
+                profiler.count("echecs_decodage")
+                print(f"⚠️ Impossible de charger l'image : {decrire(chemin_image)}")
                 return None
         except Exception as e:
-            print(f"⚠️ Erreur lors du chargement de {chemin_image}: {e}")
+            profiler.count("echecs_decodage")
+            print(f"⚠️ Erreur lors du chargement de {decrire(chemin_image)}: {e}")
             return None
     
     def appliquer_dct(self, bloc):
         """
         Applique la DCT 2D sur un bloc 8x8
         
+        cv2.dct calcule la même DCT-II orthonormée que
+        scipy.fftpack.dct(dct(bloc.T, norm="ortho").T, norm="ortho"),
+        sans le coût d'import de scipy (~150 ms au démarrage).
+        
         Args:
             bloc (numpy.ndarray): Bloc d'image
             
         Returns:
             numpy.ndarray: Coefficients DCT du bloc
         """
-        return dct(dct(bloc.T, norm="ortho").T, norm="ortho")
+        return cv2.dct(np.asarray(bloc, dtype=np.float64))
     
     def extraire_coefficients_zigzag(self, bloc_dct, nb_coefficients=64):
         """
@@ -112,7 +144,8 @@ class ImageFeatureExtractor:
         h, w = image.shape
         new_h = (h // self.block_size) * self.block_size
         new_w = (w // self.block_size) * self.block_size
-        image_resized = cv2.resize(image, (new_w, new_h))
+        with profiler.stage("redimensionnement"):
+            image_resized = cv2.resize(image, (new_w, new_h))
         
         caracteristiques = []
         
@@ -129,7 +162,85 @@ class ImageFeatureExtractor:
                 coeffs = self.extraire_coefficients_zigzag(bloc_dct, 16)
                 caracteristiques.extend(coeffs)
         
-        return np.array(caracteristiques)
+        return profiler.track_array("descripteur", np.array(caracteristiques))
+    
+    def extraire_apercu(self, image, taille=APERCU_TAILLE, nb_coefficients=APERCU_COEFFICIENTS):
+        """
+        Extrait un descripteur réduit pour la recherche en cascade
+        
+        Même calcul que extraire_caracteristiques, mais sur une miniature
+        taille x taille : le vecteur a toujours la même longueur
+        (64 valeurs par défaut) quelle que soit la taille de l'image.
+        
+        Args:
+            image (numpy.ndarray): Image en niveaux de gris
+            taille (int): Côté de la miniature (multiple de block_size)
+            nb_coefficients (int): Coefficients gardés par bloc
+            
+        Returns:
+            numpy.ndarray: Vecteur de caractéristiques réduit
+        """
+        miniature = cv2.resize(image, (taille, taille), interpolation=cv2.INTER_AREA)
+        
+        apercu = []
+        for i in range(0, taille, self.block_size):
+            for j in range(0, taille, self.block_size):
+                bloc_dct = self.appliquer_dct(miniature[i:i+self.block_size, j:j+self.block_size])
+                apercu.extend(self.extraire_coefficients_zigzag(bloc_dct, nb_coefficients))
+        
+        return np.array(apercu)
+    
+    def extraire_blocs_dct(self, image, taille=None):
+        """
+        Blocs DCT complets de l'image, rangés selon la grille des blocs
+        
+        Même découpage que extraire_caracteristiques (ou qu'extraire_apercu
+        si `taille` est donnée), mais sans réduire les blocs.
+        
+        Args:
+            image (numpy.ndarray): Image en niveaux de gris
+            taille (int): Côté de la miniature, ou None pour l'image entière
+            
+        Returns:
+            numpy.ndarray: Tenseur (lignes de blocs, colonnes de blocs, n, n)
+        """
+        n = self.block_size
+        if taille is None:
+            h, w = image.shape
+            image = cv2.resize(image, ((w // n) * n, (h // n) * n))
+        else:
+            image = cv2.resize(image, (taille, taille), interpolation=cv2.INTER_AREA)
+        
+        h, w = image.shape
+        return np.array([
+            [self.appliquer_dct(image[i:i+n, j:j+n]) for j in range(0, w, n)]
+            for i in range(0, h, n)
+        ]).reshape(h // n, w // n, n, n)
+    
+    def extraire_variantes(self, image, taille=None, nb_coefficients=16):
+        """
+        Descripteurs de l'image et de ses 7 images retournées/tournées
+        
+        Une seule extraction : les variantes sont déduites des blocs DCT
+        (voir dct_symetries.py), puis réduites aux `nb_coefficients`
+        premiers coefficients de chaque bloc comme extraire_caracteristiques
+        (ou extraire_apercu avec `taille` et nb_coefficients=4).
+        
+        Args:
+            image (numpy.ndarray): Image en niveaux de gris
+            taille (int): Côté de la miniature, ou None pour l'image entière
+            nb_coefficients (int): Coefficients gardés par bloc
+            
+        Returns:
+            numpy.ndarray: Matrice (8, longueur du descripteur), une ligne
+            par transformation de TRANSFORMATIONS
+        """
+        blocs = self.extraire_blocs_dct(image, taille)
+        n = self.block_size
+        return np.array([
+            variante.reshape(-1, n * n)[:, :nb_coefficients].ravel()
+            for variante in variantes_diedrales(blocs)
+        ])
 
 
 # ============================================================================
@@ -195,6 +306,24 @@ class ImageComparator:
         # Formule : (A · B) / (||A|| * ||B||)
         similarite = dot_product / (norm1 * norm2)
         return similarite
+    
+    def calculer_similarites_variantes(self, variantes, features):
+        """
+        Similarité cosinus de chaque variante (ligne) avec un vecteur
+        
+        Args:
+            variantes (numpy.ndarray): Matrice (nb variantes, longueur)
+            features (numpy.ndarray): Vecteur de caractéristiques
+            
+        Returns:
+            numpy.ndarray: Une similarité par variante (0 si une norme est nulle)
+        """
+        min_len = min(variantes.shape[1], len(features))
+        v = variantes[:, :min_len]
+        f = features[:min_len]
+        
+        normes = np.linalg.norm(v, axis=1) * np.linalg.norm(f)
+        return np.divide(v @ f, normes, out=np.zeros(len(v)), where=normes > 0)
 
 
 # ============================================================================
@@ -216,6 +345,19 @@ class ImageSearchEngine:
         self.extracteur = ImageFeatureExtractor(block_size=8)
         self.comparateur = ImageComparator()
         self.base_de_donnees = {}  # Dictionnaire pour stocker les images
+        # Matrice des aperçus normalisés (recherche en cascade), construite à la demande
+        self._apercus = None
+        self._apercus_base = None
+        # Index par dimension pour la recherche progressive, construit à la demande
+        self._progressif = None
+        self._progressif_base = None
+        # Écritures (add_image, remove_image...) et installation des index compactés
+        self._verrou = threading.RLock()
+        profiler.instrument(
+            self,
+            indexer_dossier="indexation",
+            rechercher_images_similaires="recherche",
+        )
     
     def indexer_dossier(self, chemin_dossier):
         """
@@ -226,6 +368,11 @@ class ImageSearchEngine:
         2. Extraire les caractéristiques DCT
         3. Stocker dans la base de données
         
+        Si le dossier a un manifeste de normalisation (manifest.json, voir
+        sources_images.lire_manifeste), une image de même empreinte SHA-1
+        qu'une image déjà indexée reprend ses caractéristiques sans être
+        décodée.
+        
         Args:
             chemin_dossier (str): Chemin vers le dossier d'images
             
@@ -235,11 +382,25 @@ class ImageSearchEngine:
         print("📂 Indexation des images en cours...")
         
         extensions_images = ['.jpg', '.jpeg', '.png', '.bmp']
-        self.base_de_donnees.clear()
+        with self._verrou:
+            self.base_de_donnees.clear()
+            self._apercus = None
+            self._progressif = None
+        manifeste = lire_manifeste(chemin_dossier)
+        par_empreinte = {}  # {sha1: nom de la première image indexée}
         
         for fichier in Path(chemin_dossier).iterdir():
             if fichier.suffix.lower() in extensions_images:
                 try:
+                    # Copie d'une image déjà indexée (d'après le manifeste)
+                    empreinte = manifeste.get(fichier.name, {}).get('sha1')
+                    if empreinte in par_empreinte:
+                        original = self.base_de_donnees[par_empreinte[empreinte]]
+                        self.base_de_donnees[fichier.name] = {**original, 'chemin': str(fichier)}
+                        profiler.count("images_indexees")
+                        profiler.count("doublons_manifeste")
+                        continue
+                    
                     # Charger l'image
                     image = self.extracteur.charger_image(fichier)
                     if image is None:
@@ -248,64 +409,375 @@ class ImageSearchEngine:
                     # Extraire les caractéristiques
                     features = self.extracteur.extraire_caracteristiques(image)
                     
-                    # Stocker dans la base de données
+                    # Stocker dans la base de données (avec l'aperçu pour la cascade)
                     self.base_de_donnees[fichier.name] = {
                         'chemin': str(fichier),
-                        'features': features
+                        'features': features,
+                        'apercu': self.extracteur.extraire_apercu(image)
                     }
+                    if empreinte is not None:
+                        par_empreinte[empreinte] = fichier.name
+                    profiler.count("images_indexees")
                     
                 except Exception as e:
+                    profiler.count("echecs_indexation")
                     print(f"⚠️ Erreur avec {fichier.name}: {e}")
         
         print(f"✅ {len(self.base_de_donnees)} images indexées\n")
         return len(self.base_de_donnees)
     
-    def rechercher_images_similaires(self, image_requete, top_k=5):
+    def indexer_source(self, source, reinitialiser=True):
+        """
+        Indexe les images d'une archive tar/zip (ou d'une liste d'archives),
+        d'octets en mémoire ({nom: octets}) ou d'un dossier
+        
+        Les images sont lues à la suite et décodées depuis la mémoire, sans
+        fichier temporaire (voir sources_images.py). Une image d'archive est
+        enregistrée sous son localisateur archive!membre (nom et chemin) :
+        deux archives peuvent contenir un membre de même nom. Les octets en
+        mémoire gardent leur nom (chemin None).
+        
+        Args:
+            source: Source d'images (voir sources_images.parcourir)
+            reinitialiser (bool): Vider la base avant (False : ajouter à la
+                base, par exemple une archive après l'autre)
+            
+        Returns:
+            int: Nombre d'images indexées depuis cette source
+        """
+        print("📦 Indexation de la source en cours...")
+        if reinitialiser:
+            with self._verrou:
+                self.base_de_donnees.clear()
+                self._apercus = None
+                self._progressif = None
+        
+        nb_images = 0
+        for chemin, nom, octets in parcourir(source):
+            try:
+                if self.add_image(octets, chemin or nom, chemin) is not None:
+                    nb_images += 1
+                    profiler.count("images_indexees")
+            except Exception as e:
+                profiler.count("echecs_indexation")
+                print(f"⚠️ Erreur avec {nom}: {e}")
+        
+        print(f"✅ {nb_images} images indexées ({len(self.base_de_donnees)} dans la base)\n")
+        return nb_images
+    
+    def _matrice_apercus(self):
+        """
+        Aperçus normalisés de la base (une ligne par image), tenus à jour
+        par add_image / remove_image
+        
+        Returns:
+            IndexEnLigne: Sur une MatriceEnLigne, ou None si une image n'a pas d'aperçu
+        """
+        with self._verrou:
+            if (
+                self._apercus is None
+                or self._apercus_base is not self.base_de_donnees
+                or len(self._apercus) != len(self.base_de_donnees)
+            ):
+                if not all('apercu' in d for d in self.base_de_donnees.values()):
+                    return None
+                self._apercus = IndexEnLigne(
+                    MatriceEnLigne(
+                        list(self.base_de_donnees),
+                        [d['apercu'] for d in self.base_de_donnees.values()],
+                    ),
+                    self._verrou,
+                )
+                self._apercus_base = self.base_de_donnees
+            return self._apercus
+    
+    def _index_progressif(self):
+        """
+        IndexProgressif des descripteurs de la base, tenu à jour par
+        add_image / remove_image (reconstruit si la base est remplacée)
+        """
+        with self._verrou:
+            if (
+                self._progressif is None
+                or self._progressif_base is not self.base_de_donnees
+                or len(self._progressif) != len(self.base_de_donnees)
+            ):
+                self._progressif = IndexEnLigne(
+                    IndexProgressif(
+                        list(self.base_de_donnees),
+                        [d['features'] for d in self.base_de_donnees.values()],
+                        nb_coefficients=16,  # Coefficients par bloc (extraire_caracteristiques)
+                    ),
+                    self._verrou,
+                )
+                self._progressif_base = self.base_de_donnees
+            return self._progressif.structure
+    
+    def _index_a_jour(self):
+        """Index construits pour la base actuelle (à modifier avec elle), et leur champ"""
+        index = []
+        if self._apercus is not None and self._apercus_base is self.base_de_donnees:
+            index.append((self._apercus, 'apercu'))
+        if self._progressif is not None and self._progressif_base is self.base_de_donnees:
+            index.append((self._progressif, 'features'))
+        return index
+    
+    def add_image(self, source, nom=None, chemin=None):
+        """
+        Ajoute une image à la base (ou remplace celle de même nom), sans
+        réindexer : les index de recherche la reçoivent dans leur tampon
+        
+        Args:
+            source (str | bytes | numpy.ndarray): Chemin de l'image (ou
+                localisateur archive!membre), octets du fichier image, ou
+                image déjà chargée (niveaux de gris ou BGR)
+            nom (str): Nom dans la base (nom du fichier par défaut,
+                obligatoire pour une image en mémoire)
+            chemin (str): Chemin enregistré pour une image en mémoire
+                (par exemple son localisateur archive!membre)
+            
+        Returns:
+            str: Nom de l'image indexée, ou None si elle n'a pas pu être chargée
+        """
+        en_memoire = not isinstance(source, (str, Path))
+        if en_memoire and nom is None:
+            raise ValueError("nom obligatoire pour une image en mémoire")
+        if isinstance(source, np.ndarray):
+            image = source if source.ndim == 2 else cv2.cvtColor(source, cv2.COLOR_BGR2GRAY)
+        else:
+            image = self.extracteur.charger_image(source)
+            if image is None:
+                return None
+        if not en_memoire:
+            chemin = str(source)
+            nom = nom or Path(source).name
+        
+        donnees = {
+            'chemin': chemin,
+            'features': self.extracteur.extraire_caracteristiques(image),
+            'apercu': self.extracteur.extraire_apercu(image)
+        }
+        with self._verrou:
+            index = self._index_a_jour()
+            self.base_de_donnees[nom] = donnees
+            for cache, champ in index:
+                cache.ajouter(nom, donnees[champ])
+        profiler.count("images_ajoutees")
+        return nom
+    
+    def remove_image(self, nom):
+        """
+        Retire une image de la base (masquée dans les index jusqu'au compactage)
+        
+        Returns:
+            bool: True si l'image était dans la base
+        """
+        with self._verrou:
+            index = self._index_a_jour()
+            if self.base_de_donnees.pop(nom, None) is None:
+                return False
+            for cache, _ in index:
+                cache.supprimer(nom)
+        profiler.count("images_retirees")
+        return True
+    
+    def update_image(self, nom, source=None):
+        """
+        Recalcule les caractéristiques d'une image de la base
+        
+        Args:
+            nom (str): Nom de l'image dans la base
+            source (str | numpy.ndarray): Nouvelle image (par défaut, le
+                fichier d'origine relu)
+            
+        Returns:
+            bool: True si l'image a été remplacée
+        """
+        if nom not in self.base_de_donnees:
+            raise KeyError(nom)
+        if source is None:
+            source = self.base_de_donnees[nom]['chemin']  # Fichier ou archive!membre
+            if source is None:
+                raise ValueError(f"{nom} a été ajoutée depuis la mémoire : source obligatoire")
+        return self.add_image(source, nom) is not None
+    
+    def compacter(self, attendre=True):
+        """Intègre les tampons des index et retire les images supprimées"""
+        for cache, _ in self._index_a_jour():
+            cache.compacter(attendre)
+    
+    def preselectionner(self, image_requete, taille_preselection=TAILLE_PRESELECTION, invariant=False):
+        """
+        Première étape de la cascade : les images dont l'aperçu est le plus
+        proche (similarité cosinus) de celui de la requête
+        
+        Args:
+            image_requete (numpy.ndarray): Image de requête
+            taille_preselection (int): Nombre de candidats gardés
+            invariant (bool): Garder la meilleure des 8 symétries de la requête
+            
+        Returns:
+            list: Liste de (nom, données) ; toute la base si les aperçus manquent
+        """
+        apercus_base = self._matrice_apercus()
+        if apercus_base is None or taille_preselection >= len(apercus_base):
+            return list(self.base_de_donnees.items())
+        
+        if invariant:
+            apercus = self.extracteur.extraire_variantes(
+                image_requete, APERCU_TAILLE, APERCU_COEFFICIENTS
+            ).astype(np.float32)
+            apercus /= np.maximum(np.linalg.norm(apercus, axis=1, keepdims=True), 1e-10)
+            noms = apercus_base.structure.meilleurs(apercus.T, taille_preselection)
+        else:
+            apercu = self.extracteur.extraire_apercu(image_requete).astype(np.float32)
+            noms = apercus_base.structure.meilleurs(
+                apercu / max(np.linalg.norm(apercu), 1e-10), taille_preselection
+            )
+        # Image retirée pendant la recherche : ignorée
+        candidats = [(nom, self.base_de_donnees.get(nom)) for nom in noms]
+        return [(nom, donnees) for nom, donnees in candidats if donnees is not None]
+    
+    def rechercher_images_similaires(
+        self, image_requete, top_k=5, cascade=False, taille_preselection=TAILLE_PRESELECTION,
+        invariant=False, progressif=False
+    ):
         """
         Recherche les K images les plus similaires
         
-        Pour chaque image de la base :
+        Pour chaque image de la base (ou de la présélection en cascade) :
         1. Calculer la distance euclidienne
         2. Calculer la similarité cosinus
         3. Trier par similarité
         
+        En cascade, seules les `taille_preselection` images dont l'aperçu
+        (miniature 32x32) est le plus proche sont comparées avec le
+        descripteur complet (voir bench_cascade.py pour le rappel obtenu).
+        
+        En mode invariant, chaque image est comparée aux 8 symétries de la
+        requête (miroirs, rotations de 90°, transpositions), déduites d'une
+        seule extraction (voir dct_symetries.py) : la meilleure est gardée,
+        et son nom est ajouté au résultat ('transformation').
+        
+        En mode progressif, la recherche reste exhaustive et exacte (mêmes
+        résultats), mais les calculs sur une image sont abandonnés dès
+        qu'elle ne peut plus entrer dans le top k (voir recherche_progressive.py).
+        
         Args:
             image_requete (numpy.ndarray): Image de requête
             top_k (int): Nombre d'images similaires à retourner
+            cascade (bool): Présélectionner avec les aperçus
+            taille_preselection (int): Nombre de candidats re-classés
+            invariant (bool): Retrouver aussi les images retournées ou tournées
+            progressif (bool): Recherche exacte avec abandon anticipé
+                (incompatible avec cascade et invariant)
             
         Returns:
             list: Liste des résultats (nom, chemin, distance, similarité)
         """
         if len(self.base_de_donnees) == 0:
             return []
+        if progressif and (cascade or invariant):
+            raise ValueError("progressif ne se combine pas avec cascade ou invariant")
+        
+        # Copie : la base peut changer pendant la recherche (add_image...)
+        candidats = list(self.base_de_donnees.items())
+        if cascade:
+            with profiler.stage("preselection"):
+                candidats = self.preselectionner(image_requete, taille_preselection, invariant)
+        
+        if invariant:
+            return self._rechercher_invariant(image_requete, candidats, top_k)
+        if progressif:
+            return self._rechercher_progressif(image_requete, top_k)
         
         # Extraire les caractéristiques de l'image de requête
         features_requete = self.extracteur.extraire_caracteristiques(image_requete)
         
         resultats = []
         
-        # Comparer avec toutes les images de la base
-        for nom_image, donnees in self.base_de_donnees.items():
-            features_db = donnees['features']
-            
-            # Calculer la distance
-            distance = self.comparateur.calculer_distance_euclidienne(
-                features_requete, features_db
-            )
-            
-            # Calculer la similarité
-            similarite = self.comparateur.calculer_similarite_cosinus(
-                features_requete, features_db
-            )
-            
+        # Comparer avec toutes les images candidates
+        with profiler.stage("score"):
+            for nom_image, donnees in candidats:
+                features_db = donnees['features']
+                
+                # Calculer la distance
+                distance = self.comparateur.calculer_distance_euclidienne(
+                    features_requete, features_db
+                )
+                
+                # Calculer la similarité
+                similarite = self.comparateur.calculer_similarite_cosinus(
+                    features_requete, features_db
+                )
+                
+                resultats.append({
+                    'nom': nom_image,
+                    'chemin': donnees['chemin'],
+                    'distance': distance,
+                    'similarite': similarite
+                })
+        profiler.count("comparaisons", len(resultats))
+        
+        # Trier par similarité (du plus grand au plus petit)
+        with profiler.stage("tri"):
+            resultats_tries = sorted(resultats, key=lambda x: x['similarite'], reverse=True)
+        
+        return resultats_tries[:top_k]
+    
+    def _rechercher_invariant(self, image_requete, candidats, top_k):
+        """
+        Score de chaque candidat : meilleure similarité cosinus parmi les
+        8 symétries de la requête (un produit matrice-vecteur par image)
+        """
+        variantes = self.extracteur.extraire_variantes(image_requete)
+        
+        resultats = []
+        with profiler.stage("score"):
+            for nom_image, donnees in candidats:
+                features_db = donnees['features']
+                similarites = self.comparateur.calculer_similarites_variantes(
+                    variantes, features_db
+                )
+                meilleure = int(np.argmax(similarites))
+                
+                resultats.append({
+                    'nom': nom_image,
+                    'chemin': donnees['chemin'],
+                    'distance': self.comparateur.calculer_distance_euclidienne(
+                        variantes[meilleure], features_db
+                    ),
+                    'similarite': similarites[meilleure],
+                    'transformation': TRANSFORMATIONS[meilleure]
+                })
+        profiler.count("comparaisons", len(resultats) * len(variantes))
+        
+        with profiler.stage("tri"):
+            resultats_tries = sorted(resultats, key=lambda x: x['similarite'], reverse=True)
+        
+        return resultats_tries[:top_k]
+    
+    def _rechercher_progressif(self, image_requete, top_k):
+        """Top k exact avec abandon anticipé ; distance calculée pour ces k images"""
+        index = self._index_progressif()
+        features_requete = self.extracteur.extraire_caracteristiques(image_requete)
+        
+        with profiler.stage("score"):
+            meilleurs = index.rechercher(features_requete, top_k)
+        profiler.count("comparaisons", len(index))
+        profiler.count("valeurs_lues", index.stats["valeurs_lues"])
+        
+        resultats = []
+        for nom_image, similarite in meilleurs:
+            donnees = self.base_de_donnees.get(nom_image)
+            if donnees is None:
+                continue  # Retirée pendant la recherche
             resultats.append({
                 'nom': nom_image,
                 'chemin': donnees['chemin'],
-                'distance': distance,
+                'distance': self.comparateur.calculer_distance_euclidienne(
+                    features_requete, donnees['features']
+                ),
                 'similarite': similarite
             })
-        
-        # Trier par similarité (du plus grand au plus petit)
-        resultats_tries = sorted(resultats, key=lambda x: x['similarite'], reverse=True)
-        
-        return resultats_tries[:top_k]
+        return resultats
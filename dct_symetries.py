@@ -0,0 +1,84 @@
+"""
+Module : Symétries du carré appliquées aux coefficients DCT
+============================================================
+
+Une image retournée ou transposée n'a pas besoin d'être décodée ni
+transformée à nouveau : ses coefficients DCT se déduisent de ceux de
+l'image d'origine (DCT-II, blocs n x n, coefficient (u, v) = ligne u,
+colonne v du bloc) :
+- Miroir horizontal (colonnes inversées) : coefficient (u, v) multiplié
+  par (-1)^v, et ordre des blocs de chaque ligne inversé
+- Miroir vertical (lignes inversées) : coefficient multiplié par (-1)^u,
+  et ordre des lignes de blocs inversé
+- Transposition : (u, v) -> (v, u) dans chaque bloc, et grille des blocs
+  transposée
+
+Les 8 éléments du groupe diédral (identité, 2 miroirs, 3 rotations,
+2 transpositions) s'obtiennent en composant ces trois opérations sur le
+tenseur (lignes de blocs, colonnes de blocs, n, n) : des vues numpy
+(inversions d'axes, transposées) et une multiplication par un masque de
+signes, sans boucle sur les blocs.
+
+Les descripteurs ne gardent qu'une partie des coefficients de chaque
+bloc (16 premiers en ordre ligne par ligne pour dct_engine, 8 premiers du
+zigzag pour tp_dct_comparaison_images), qui n'est pas stable par
+transposition : les variantes sont donc calculées sur les blocs DCT
+complets de la requête, extraits une seule fois, puis réduites comme
+les descripteurs de la base.
+"""
+
+import numpy as np
+
+# Transformation appliquée à la requête, dans l'ordre de variantes_diedrales
+TRANSFORMATIONS = (
+    "identite",
+    "miroir_horizontal",
+    "miroir_vertical",
+    "rotation_180",
+    "transposition",
+    "rotation_90",  # sens horaire
+    "rotation_270",
+    "anti_transposition",
+)
+
+
+def masques_signes(taille_bloc):
+    """
+    Masques de signes d'un bloc pour les deux miroirs
+
+    Returns:
+        tuple: (masque vertical (-1)^u, masque horizontal (-1)^v),
+        de formes (n, 1) et (1, n) pour la diffusion sur les blocs
+    """
+    signes = 1.0 - 2.0 * (np.arange(taille_bloc) % 2)
+    return signes[:, None], signes[None, :]
+
+
+def variantes_diedrales(blocs):
+    """
+    Coefficients DCT des 8 images transformées
+
+    Args:
+        blocs (numpy.ndarray): Tenseur (lignes de blocs, colonnes de blocs, n, n)
+            des blocs DCT de l'image
+
+    Returns:
+        list: 8 tenseurs de même forme (grille transposée pour les 4
+        dernières), dans l'ordre de TRANSFORMATIONS
+    """
+    signes_lignes, signes_colonnes = masques_signes(blocs.shape[-1])
+    variantes = []
+    for base in (blocs, blocs.transpose(1, 0, 3, 2)):
+        for miroir_vertical in (False, True):
+            for miroir_horizontal in (False, True):
+                variante = base
+                if miroir_vertical:
+                    variante = variante[::-1] * signes_lignes
+                if miroir_horizontal:
+                    variante = variante[:, ::-1] * signes_colonnes
+                variantes.append(variante)
+    # Ordre des boucles : (V, H) = (0, 0), (0, 1), (1, 0), (1, 1)
+    # -> identité, miroir H, miroir V, rotation 180, puis la même chose
+    #    après transposition : transposition, rotation 90 (transposée
+    #    puis miroir H), rotation 270, anti-transposition
+    return variantes
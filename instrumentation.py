@@ -0,0 +1,226 @@
+"""
+Module : Instrumentation des moteurs de recherche d'images
+===========================================================
+
+Mesures légères par étape pour les pipelines d'extraction et de recherche
+(dct_engine, tp_dct_comparaison_images, TP-pre) :
+- Histogramme des durées de chaque étape (décodage, redimensionnement,
+  conversion de couleurs, DCT, zigzag, quantification, score...),
+  indexé par la pile des étapes englobantes
+- Compteurs (images, octets décodés, échecs...)
+- Plus grand tableau numpy observé par nom (pic d'allocation)
+
+Désactivé, le coût est quasi nul : stage() renvoie un contexte vide
+partagé, count() et track_array() sortent immédiatement, et instrument()
+ne remplace aucune méthode. Les méthodes appelées pour chaque bloc 8x8
+(DCT, zigzag) ne sont donc mesurées que si le profilage est activé
+avant la création du moteur.
+
+Activation sans modifier le code :
+    IMAGE_PROFILE=/tmp/profil python search_cli.py index dataset
+écrit /tmp/profil.json et /tmp/profil.folded (format « collapsed stack »,
+lisible par flamegraph.pl ou speedscope) à la fin du processus.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+_NULL_STAGE = nullcontext()
+
+
+class _StageStats:
+    """Durées d'une étape : total, min, max et histogramme en puissances de 2 (µs)"""
+
+    __slots__ = ("count", "total", "self_total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.self_total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = {}
+
+    def add(self, duree, duree_propre):
+        self.count += 1
+        self.total += duree
+        self.self_total += duree_propre
+        self.min = min(self.min, duree)
+        self.max = max(self.max, duree)
+        # Borne supérieure du seau : plus petite puissance de 2 >= durée (en µs)
+        borne = 1 << int(duree * 1e6).bit_length()
+        self.buckets[borne] = self.buckets.get(borne, 0) + 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "self_ms": round(self.self_total * 1000, 3),
+            "mean_us": round(self.total / self.count * 1e6, 2),
+            "min_us": round(self.min * 1e6, 2),
+            "max_us": round(self.max * 1e6, 2),
+            "histogram_us": {f"<={b}": n for b, n in sorted(self.buckets.items())},
+        }
+
+
+class _Stage:
+    """Contexte d'une étape mesurée (pile par thread pour les étapes imbriquées)"""
+
+    __slots__ = ("profiler", "name", "path", "debut", "enfants")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        pile = self.profiler._pile()
+        self.path = f"{pile[-1].path};{self.name}" if pile else self.name
+        self.enfants = 0.0
+        pile.append(self)
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duree = time.perf_counter() - self.debut
+        pile = self.profiler._pile()
+        pile.pop()
+        if pile:
+            pile[-1].enfants += duree
+        self.profiler._record(self.path, duree, duree - self.enfants)
+        return False
+
+
+class Profiler:
+    """
+    Collecteur des mesures (une instance globale : `profiler`)
+
+    Args:
+        enabled (bool): Activer la collecte dès la création
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.hooks = []  # Fonctions appelées avec (chemin de l'étape, durée en s)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}  # {"etape;sous_etape": _StageStats}
+            self.counters = {}
+            self.peak_arrays = {}  # {nom: (octets, forme, dtype)}
+
+    def _pile(self):
+        pile = getattr(self._local, "pile", None)
+        if pile is None:
+            pile = self._local.pile = []
+        return pile
+
+    def _record(self, path, duree, duree_propre):
+        with self._lock:
+            stats = self.stages.get(path)
+            if stats is None:
+                stats = self.stages[path] = _StageStats()
+            stats.add(duree, duree_propre)
+        for hook in self.hooks:
+            hook(path, duree)
+
+    # ------------------------------------------------------------------
+    # Points de mesure
+    # ------------------------------------------------------------------
+    def stage(self, name):
+        """Contexte mesurant la durée d'une étape (`with profiler.stage("dct"):`)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def instrument(self, obj, **methodes):
+        """
+        Mesure des méthodes d'une instance : instrument(self, appliquer_dct="dct")
+
+        Ne fait rien si le profilage est désactivé : les méthodes
+        appelées à chaque bloc gardent alors leur coût d'origine.
+        """
+        if not self.enabled:
+            return
+        for nom_methode, nom_etape in methodes.items():
+            setattr(obj, nom_methode, self._wrap(getattr(obj, nom_methode), nom_etape))
+
+    def _wrap(self, methode, nom_etape):
+        @wraps(methode)
+        def wrapper(*args, **kwargs):
+            with self.stage(nom_etape):
+                return methode(*args, **kwargs)
+
+        return wrapper
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def track_array(self, name, array):
+        """Retient le plus grand tableau vu sous `name` ; renvoie `array`"""
+        if self.enabled and array is not None:
+            with self._lock:
+                pic = self.peak_arrays.get(name)
+                if pic is None or array.nbytes > pic[0]:
+                    self.peak_arrays[name] = (array.nbytes, array.shape, str(array.dtype))
+        return array
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {p: s.to_dict() for p, s in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "peak_arrays": {
+                    nom: {"bytes": octets, "shape": list(forme), "dtype": dtype}
+                    for nom, (octets, forme, dtype) in sorted(self.peak_arrays.items())
+                },
+            }
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def dump_collapsed(self, path):
+        """
+        Format « collapsed stack » : une ligne `a;b;c <µs>` par étape,
+        avec le temps propre (hors sous-étapes) comme poids
+        """
+        with self._lock:
+            lignes = [
+                f"{p} {round(s.self_total * 1e6)}" for p, s in sorted(self.stages.items())
+            ]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lignes) + "\n")
+
+    def dump(self, prefix):
+        """Écrit `prefix`.json et `prefix`.folded"""
+        self.dump_json(f"{prefix}.json")
+        self.dump_collapsed(f"{prefix}.folded")
+
+
+profiler = Profiler()
+
+# IMAGE_PROFILE=<préfixe> : activé dès l'import, exporté à la sortie
+_PREFIX = os.environ.get("IMAGE_PROFILE")
+if _PREFIX:
+    profiler.enable()
+    atexit.register(profiler.dump, _PREFIX)
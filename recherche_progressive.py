@@ -0,0 +1,314 @@
+"""
+Module : Recherche exacte progressive (abandon anticipé)
+=========================================================
+
+Les descripteurs DCT (dct_engine, tp_dct_comparaison_images) mettent
+bout à bout les coefficients de chaque bloc : l'énergie est concentrée
+dans les premiers coefficients de chaque bloc (DC puis basses
+fréquences), mais éparpillée sur toute la longueur du vecteur.
+
+L'index range donc les valeurs par dimension (une ligne par dimension,
+une colonne par image) et les lignes par fréquence : coefficient 0 de
+tous les blocs, puis coefficient 1 de tous les blocs, etc. La recherche
+accumule le produit scalaire requête/images par tranches de lignes et,
+après chaque tranche, encadre la similarité cosinus finale de chaque
+image (inégalité de Cauchy-Schwarz sur la partie non encore lue) :
+
+    (produit_partiel ± ||reste requête|| * ||reste image||) / (||requête|| * ||image||)
+
+Une image dont la borne haute est sous la k-ième meilleure borne basse
+ne peut plus entrer dans le top k : elle est abandonnée. Le résultat est
+exactement celui de la recherche exhaustive, en ne lisant qu'une partie
+des valeurs (voir bench_progressif.py).
+
+Comme ImageComparator, deux vecteurs de longueurs différentes sont
+comparés sur leur préfixe commun : les images sont regroupées par
+longueur de descripteur, et les normes des préfixes sont calculées à la
+demande (puis gardées) pour chaque longueur de requête.
+
+Mises à jour en ligne (voir base_en_ligne.py) : les images ajoutées vont
+dans un tampon comparé en entier à chaque requête, les images supprimées
+sont masquées dans leur groupe ; compacte() reconstruit un index sans
+tampon ni images supprimées.
+"""
+
+import numpy as np
+
+TAILLE_TRANCHE = 64  # Lignes (dimensions) lues entre deux abandons
+
+
+def ordre_frequences(longueur, nb_coefficients):
+    """
+    Ordre des dimensions par fréquence : coefficient 0 de tous les blocs,
+    puis coefficient 1, etc. (blocs dans l'ordre du descripteur)
+
+    Args:
+        longueur (int): Longueur du descripteur
+        nb_coefficients (int): Coefficients gardés par bloc
+
+    Returns:
+        numpy.ndarray: Permutation des indices 0 .. longueur - 1
+    """
+    return np.argsort(np.arange(longueur) % nb_coefficients, kind="stable")
+
+
+class _Groupe:
+    """Images dont le descripteur a la même longueur, rangées par dimension"""
+
+    def __init__(self, indices, descripteurs, nb_coefficients):
+        self.indices = np.asarray(indices)  # Position des images dans l'index
+        self.longueur = len(descripteurs[0])
+        self.ordre = ordre_frequences(self.longueur, nb_coefficients)
+        # (longueur, nb images) : la ligne p contient la dimension ordre[p]
+        self.valeurs = np.ascontiguousarray(np.asarray(descripteurs).T[self.ordre])
+        # {(longueur du préfixe, taille des tranches): (lignes, normes² cumulées)}
+        self._prefixes = {}
+        self.vivants = None  # Masque des images non supprimées (None : toutes)
+
+    def prefixe(self, longueur, taille_tranche=TAILLE_TRANCHE):
+        """
+        Lignes du préfixe [0, longueur) et normes² des images sur ce préfixe,
+        cumulées tranche par tranche
+
+        Returns:
+            tuple: (lignes, cumul) ; cumul[t] = normes² des t premières
+            tranches (une colonne par image), cumul[-1] = normes² du préfixe
+        """
+        cle = (longueur, taille_tranche)
+        if cle not in self._prefixes:
+            if longueur >= self.longueur:
+                lignes = slice(0, self.longueur)  # Vues, sans copie des tranches
+            else:
+                lignes = np.flatnonzero(self.ordre < longueur)
+            nb_lignes = len(self.ordre[lignes])
+            cumul = np.zeros((-(-nb_lignes // taille_tranche) + 1, self.valeurs.shape[1]))
+            for t, debut in enumerate(range(0, nb_lignes, taille_tranche)):
+                tranche = self.tranche(lignes, debut, debut + taille_tranche)
+                cumul[t + 1] = cumul[t] + np.einsum("ij,ij->j", tranche, tranche)
+            self._prefixes[cle] = (lignes, cumul)
+        return self._prefixes[cle]
+
+    def tranche(self, lignes, debut, fin):
+        """Lignes debut .. fin - 1 d'un préfixe (vue si le préfixe est complet)"""
+        if isinstance(lignes, slice):
+            return self.valeurs[debut:fin]
+        return self.valeurs[lignes[debut:fin]]
+
+    def colonnes_vivantes(self):
+        vivants = self.vivants
+        if vivants is None:
+            return np.arange(len(self.indices))
+        return np.flatnonzero(vivants)
+
+    def descripteurs(self, colonnes):
+        """Descripteurs (dans l'ordre d'origine des dimensions) des colonnes données"""
+        valeurs = np.empty((len(colonnes), self.longueur), self.valeurs.dtype)
+        valeurs[:, self.ordre] = self.valeurs.take(colonnes, axis=1).T
+        return valeurs
+
+
+class IndexProgressif:
+    """
+    Index pour la recherche exacte des k images les plus similaires
+    (similarité cosinus) avec abandon anticipé
+
+    Args:
+        noms (list): Nom de chaque image
+        descripteurs (list): Descripteur de chaque image (même ordre),
+            ou matrice (une ligne par image) si tous ont la même longueur
+        nb_coefficients (int): Coefficients par bloc dans les descripteurs
+        taille_tranche (int): Lignes lues entre deux abandons
+    """
+
+    def __init__(self, noms, descripteurs, nb_coefficients, taille_tranche=TAILLE_TRANCHE):
+        self.noms = list(noms)
+        self.nb_coefficients = nb_coefficients
+        self.taille_tranche = taille_tranche
+        self.stats = {}  # Mesures de la dernière recherche
+        self.nb_supprimes = 0
+        self._tampon = {}  # {nom: descripteur} ajoutés depuis la construction (copié à chaque écriture)
+        self._emplacements = None  # {nom: (groupe, colonne)}, construit à la première écriture
+
+        if isinstance(descripteurs, np.ndarray) and descripteurs.ndim == 2:
+            self.groupes = [_Groupe(np.arange(len(descripteurs)), descripteurs, nb_coefficients)]
+            return
+
+        par_longueur = {}
+        for i, descripteur in enumerate(descripteurs):
+            par_longueur.setdefault(len(descripteur), []).append(i)
+        self.groupes = [
+            _Groupe(indices, [descripteurs[i] for i in indices], nb_coefficients)
+            for indices in par_longueur.values()
+        ]
+
+    def __len__(self):
+        return len(self.noms) - self.nb_supprimes + len(self._tampon)
+
+    @property
+    def taille_tampon_actuelle(self):
+        return len(self._tampon)
+
+    def _emplacement(self, nom):
+        if self._emplacements is None:
+            self._emplacements = {
+                self.noms[i]: (groupe, colonne)
+                for groupe in self.groupes
+                for colonne, i in enumerate(groupe.indices)
+            }
+        return self._emplacements.pop(nom, None)
+
+    def ajouter(self, nom, descripteur):
+        """Ajoute une image (ou remplace celle de même nom) dans le tampon"""
+        tampon = dict(self._tampon)
+        tampon.pop(nom, None)
+        tampon[nom] = np.asarray(descripteur)
+        self._tampon = tampon  # Les recherches en cours gardent l'ancien tampon
+        self._supprimer_index(nom)
+
+    def supprimer(self, nom):
+        """
+        Retire une image (du tampon, ou masquée dans son groupe)
+
+        Returns:
+            bool: True si l'image était dans l'index
+        """
+        if nom in self._tampon:
+            tampon = dict(self._tampon)
+            del tampon[nom]
+            self._tampon = tampon
+            return True
+        return self._supprimer_index(nom)
+
+    def _supprimer_index(self, nom):
+        emplacement = self._emplacement(nom)
+        if emplacement is None:
+            return False
+        groupe, colonne = emplacement
+        if groupe.vivants is None:
+            groupe.vivants = np.ones(len(groupe.indices), dtype=bool)
+        groupe.vivants[colonne] = False
+        self.nb_supprimes += 1
+        return True
+
+    def compacte(self):
+        """
+        Nouvel index avec les images vivantes puis le tampon (self n'est pas modifié)
+
+        Sans le verrou des écritures : une image à la fois dans le tampon et
+        encore vivante dans son groupe (ajout en cours) n'est gardée qu'une
+        fois, avec le descripteur du tampon.
+        """
+        tampon = self._tampon
+        positions, descripteurs = [], []
+        for groupe in self.groupes:
+            colonnes = groupe.colonnes_vivantes()
+            positions.append(groupe.indices[colonnes])
+            descripteurs.extend(groupe.descripteurs(colonnes))
+        positions = np.concatenate(positions) if positions else np.zeros(0, np.int64)
+        ordre = np.argsort(positions, kind="stable")
+
+        gardes = [i for i in ordre if self.noms[positions[i]] not in tampon]
+        noms = [self.noms[positions[i]] for i in gardes] + list(tampon)
+        descripteurs = [descripteurs[i] for i in gardes] + list(tampon.values())
+        if descripteurs and len({len(d) for d in descripteurs}) == 1:
+            descripteurs = np.array(descripteurs)
+        return IndexProgressif(noms, descripteurs, self.nb_coefficients, self.taille_tranche)
+
+    def _scores_tampon(self, requete, tampon):
+        """Similarité cosinus exacte (préfixe commun) de chaque image du tampon"""
+        scores = np.zeros(len(tampon))
+        for j, descripteur in enumerate(tampon.values()):
+            n = min(len(requete), len(descripteur))
+            normes = np.linalg.norm(requete[:n]) * np.linalg.norm(descripteur[:n])
+            if normes > 0:
+                scores[j] = np.dot(requete[:n], descripteur[:n]) / normes
+        return scores
+
+    def rechercher(self, requete, top_k=5):
+        """
+        Les top_k images les plus similaires à la requête
+
+        Args:
+            requete (numpy.ndarray): Descripteur de la requête
+            top_k (int): Nombre d'images retournées
+
+        Returns:
+            list: Liste de (nom, similarité), de la plus similaire à la moins similaire
+        """
+        requete = np.asarray(requete)
+        self.stats = {"valeurs_lues": 0, "valeurs_total": 0}
+        # Tampon d'abord (comparé en entier) : ses images après celles de l'index
+        tampon = self._tampon
+        noms_tampon = list(tampon)
+        scores = self._scores_tampon(requete, tampon)
+        indices = len(self.noms) + np.arange(len(scores))
+        if len(scores) > top_k:
+            garder = np.argpartition(-scores, top_k - 1)[:top_k]
+            indices, scores = indices[garder], scores[garder]
+
+        # Les images de même taille que la requête d'abord : bon seuil plus tôt
+        groupes = sorted(self.groupes, key=lambda g: (g.longueur != len(requete), -len(g.indices)))
+        for groupe in groupes:
+            trouves, similarites = self._rechercher_groupe(groupe, requete, top_k, scores)
+            indices = np.concatenate([indices, trouves])
+            scores = np.concatenate([scores, similarites])
+            if len(scores) > top_k:
+                garder = np.argpartition(-scores, top_k - 1)[:top_k]
+                indices, scores = indices[garder], scores[garder]
+
+        # Ex aequo : ordre d'insertion, comme le tri (stable) des moteurs
+        ordre = np.lexsort((indices, -scores))
+        noms = [
+            self.noms[i] if i < len(self.noms) else noms_tampon[i - len(self.noms)]
+            for i in indices[ordre]
+        ]
+        return [(nom, float(score)) for nom, score in zip(noms, scores[ordre])]
+
+    def _rechercher_groupe(self, groupe, requete, top_k, meilleurs):
+        """
+        Recherche dans un groupe ; `meilleurs` contient les similarités
+        exactes déjà trouvées dans les groupes précédents
+        """
+        lignes, cumul = groupe.prefixe(len(requete), self.taille_tranche)
+        normes2 = cumul[-1]
+        q = requete[groupe.ordre[lignes]].astype(groupe.valeurs.dtype)
+        nb_lignes = len(q)
+
+        # ||reste de la requête||² après chaque ligne
+        reste_q2 = np.concatenate([np.cumsum((q * q)[::-1])[::-1], [0.0]])
+        # Norme nulle : similarité 0 (comme ImageComparator), bornes nulles
+        denominateur = np.sqrt(reste_q2[0] * normes2)
+        denominateur[denominateur == 0] = np.inf
+
+        # Marge pour les arrondis (float32 ou float64) : ne jamais abandonner
+        # une image du top k
+        marge = max(1e-9, 100 * np.finfo(groupe.valeurs.dtype).eps)
+        actifs = groupe.colonnes_vivantes()
+        produits = np.zeros(len(actifs))
+
+        for t, debut in enumerate(range(0, nb_lignes, self.taille_tranche)):
+            fin = min(debut + self.taille_tranche, nb_lignes)
+            tranche = groupe.tranche(lignes, debut, fin)
+            if len(actifs) < tranche.shape[1]:
+                tranche = tranche.take(actifs, axis=1)
+            produits += q[debut:fin] @ tranche
+            self.stats["valeurs_lues"] += tranche.size
+            if fin == nb_lignes:
+                break
+
+            # Encadrement de la similarité finale de chaque image active
+            # (||reste de l'image||² = normes² du préfixe - normes² déjà lues)
+            reste2_image = normes2[actifs] - cumul[t + 1][actifs]
+            reste = np.sqrt(reste_q2[fin] * np.maximum(reste2_image, 0.0))
+            basse = (produits - reste) / denominateur[actifs]
+            haute = (produits + reste) / denominateur[actifs]
+
+            bornes = np.concatenate([meilleurs, basse])
+            if len(bornes) < top_k:
+                continue
+            seuil = np.partition(bornes, len(bornes) - top_k)[len(bornes) - top_k]
+            garder = haute >= seuil - marge
+            actifs, produits = actifs[garder], produits[garder]
+
+        self.stats["valeurs_total"] += nb_lignes * len(groupe.indices)
+        return groupe.indices[actifs], produits / denominateur[actifs]
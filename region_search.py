@@ -0,0 +1,407 @@
+"""
+Module : Recherche de sous-images (régions) par blocs DCT
+==========================================================
+
+dct_engine.py met bout à bout les coefficients de tous les blocs 8x8 :
+la position des blocs est perdue et un recadrage (ou un logo dans une
+image plus grande) ne peut pas être retrouvé. Ce module garde au
+contraire chaque bloc avec ses coordonnées :
+
+- Descripteur d'un bloc : ses NB_COEFFS premiers coefficients AC (ordre
+  zigzag), normalisés (insensible à la luminosité et au contraste).
+  Les blocs presque uniformes ne sont pas indexés (aucune information)
+- Quantification : chaque descripteur est remplacé par le numéro du mot
+  le plus proche d'un dictionnaire (k-moyennes sphériques) ; un bloc ne
+  coûte plus que 2 octets (code) + 8 octets dans l'index inversé
+- Index inversé : pour chaque mot, les (image, bloc_y, bloc_x) qui l'utilisent
+- Requête : chaque bloc de la requête vote pour (image, décalage) ; les
+  votes sont pondérés par l'idf du mot (les mots fréquents pèsent peu).
+  La requête est découpée avec plusieurs décalages de pixels (`pas`) car
+  le recadrage n'est en général pas aligné sur la grille 8x8
+- Vérification (optionnelle) : les meilleures images sont relues, la
+  position exacte est trouvée au pixel près par corrélation
+  (cv2.matchTemplate) dans une fenêtre de +/- 8 pixels autour de la
+  position votée, et les résultats sont reclassés par corrélation
+
+La région doit être à la même échelle que dans l'image indexée.
+
+Usage :
+    from region_search import RegionIndex
+    index = RegionIndex()
+    index.indexer_dossier("dataset")
+    index.rechercher(image_recadree, top_k=5)
+"""
+
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from dct_engine import ImageFeatureExtractor
+from instrumentation import profiler
+
+BLOCK_SIZE = 8
+NB_COEFFS = 9  # Coefficients AC gardés par bloc (les plus basses fréquences)
+CODEBOOK_SIZE = 1024
+# Écart-type minimum (niveaux de gris) d'un bloc pour qu'il soit indexé
+MIN_BLOCK_STD = 3.0
+# Nombre de blocs utilisés pour apprendre le dictionnaire
+TRAINING_BLOCKS = 50000
+# Entrées de l'index inversé lues au maximum par découpage de la requête
+MAX_POSTINGS = 100000
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def matrice_dct(n=BLOCK_SIZE):
+    """Matrice D de la DCT-II orthonormée : dct(bloc) = D @ bloc @ D.T (comme cv2.dct)"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    d = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    d[0] /= np.sqrt(2.0)
+    return d.astype(np.float32)
+
+
+def ordre_zigzag(n=BLOCK_SIZE):
+    """Indices (à plat) des coefficients d'un bloc n x n dans l'ordre zigzag JPEG"""
+    cases = sorted(
+        ((i, j) for i in range(n) for j in range(n)),
+        key=lambda c: (c[0] + c[1], c[0] if (c[0] + c[1]) % 2 else c[1]),
+    )
+    return np.array([i * n + j for i, j in cases])
+
+
+_DCT = matrice_dct()
+_AC = ordre_zigzag()[1 : NB_COEFFS + 1]  # Sans le coefficient DC
+
+
+def descripteurs_blocs(image, decalage=(0, 0)):
+    """
+    Descripteurs de tous les blocs 8x8 d'une image (calcul vectorisé)
+
+    Args:
+        image (numpy.ndarray): Image en niveaux de gris
+        decalage (tuple): (dy, dx) pixels ignorés en haut et à gauche
+
+    Returns:
+        tuple: (descripteurs (nh, nw, NB_COEFFS) de norme 1,
+        masque (nh, nw) des blocs non uniformes)
+    """
+    dy, dx = decalage
+    image = image[dy:, dx:]
+    nh, nw = image.shape[0] // BLOCK_SIZE, image.shape[1] // BLOCK_SIZE
+    blocs = (
+        image[: nh * BLOCK_SIZE, : nw * BLOCK_SIZE]
+        .astype(np.float32)
+        .reshape(nh, BLOCK_SIZE, nw, BLOCK_SIZE)
+        .swapaxes(1, 2)
+    )
+    with profiler.stage("dct_blocs"):
+        coefficients = (_DCT @ blocs @ _DCT.T).reshape(nh, nw, BLOCK_SIZE * BLOCK_SIZE)
+    ac = coefficients[:, :, _AC]
+    # Énergie AC totale d'un bloc = 8 x son écart-type (DCT orthonormée)
+    energie = np.sqrt(np.sum(coefficients[:, :, 1:] ** 2, axis=2))
+    informatifs = energie >= MIN_BLOCK_STD * BLOCK_SIZE
+    norme = np.linalg.norm(ac, axis=2, keepdims=True)
+    return ac / np.maximum(norme, 1e-6), informatifs
+
+
+def entrainer_dictionnaire(descripteurs, taille=CODEBOOK_SIZE, iterations=10, seed=0):
+    """
+    k-moyennes sphériques : centres de norme 1, affectation par produit scalaire
+
+    Args:
+        descripteurs (numpy.ndarray): (n, NB_COEFFS) de norme 1
+
+    Returns:
+        numpy.ndarray: Dictionnaire (taille, NB_COEFFS)
+    """
+    rng = np.random.default_rng(seed)
+    taille = min(taille, len(descripteurs))
+    centres = descripteurs[rng.choice(len(descripteurs), taille, replace=False)].copy()
+    for _ in range(iterations):
+        codes = np.argmax(descripteurs @ centres.T, axis=1)
+        sommes = np.zeros_like(centres)
+        np.add.at(sommes, codes, descripteurs)
+        normes = np.linalg.norm(sommes, axis=1, keepdims=True)
+        centres = sommes / np.maximum(normes, 1e-6)
+        # Mot inutilisé : on le réinitialise sur un bloc au hasard
+        vides = normes[:, 0] == 0
+        centres[vides] = descripteurs[rng.choice(len(descripteurs), vides.sum())]
+    return centres.astype(np.float32)
+
+
+class RegionIndex:
+    """
+    Index inversé des blocs quantifiés de toutes les images
+
+    Args:
+        taille_dictionnaire (int): Nombre de mots du dictionnaire
+        blocs_apprentissage (int): Blocs mis de côté pour apprendre le dictionnaire
+        max_entrees (int): Budget d'entrées lues par découpage de la requête ;
+            les blocs aux mots les plus rares votent en premier
+    """
+
+    def __init__(
+        self,
+        taille_dictionnaire=CODEBOOK_SIZE,
+        blocs_apprentissage=TRAINING_BLOCKS,
+        max_entrees=MAX_POSTINGS,
+    ):
+        self.taille_dictionnaire = taille_dictionnaire
+        self.blocs_apprentissage = blocs_apprentissage
+        self.max_entrees = max_entrees
+        self.extracteur = ImageFeatureExtractor(block_size=BLOCK_SIZE)
+        self.dictionnaire = None  # (taille, NB_COEFFS) float32
+        self.chemins = []
+        self.tailles = []  # (hauteur, largeur) de chaque image
+        self.grilles = []  # Codes (nh, nw) uint16 ; code_plat pour les blocs uniformes
+        self._en_attente = []  # (descripteurs, masque) avant apprentissage
+        self._postings = None
+
+    @property
+    def code_plat(self):
+        """Code des blocs uniformes (hors dictionnaire, jamais indexé)"""
+        return self.taille_dictionnaire
+
+    def __len__(self):
+        return len(self.chemins)
+
+    # ------------------------------------------------------------------
+    # Indexation
+    # ------------------------------------------------------------------
+    def _quantifier(self, descripteurs, masque):
+        codes = np.full(masque.shape, self.code_plat, dtype=np.uint16)
+        if masque.any():
+            codes[masque] = np.argmax(descripteurs[masque] @ self.dictionnaire.T, axis=1)
+        return codes
+
+    def _apprendre(self):
+        """Apprend le dictionnaire sur les blocs en attente puis les quantifie"""
+        echantillon = np.concatenate([d[m] for d, m in self._en_attente])
+        if len(echantillon) > self.blocs_apprentissage:
+            rng = np.random.default_rng(0)
+            echantillon = echantillon[
+                rng.choice(len(echantillon), self.blocs_apprentissage, replace=False)
+            ]
+        with profiler.stage("dictionnaire"):
+            self.dictionnaire = entrainer_dictionnaire(echantillon, self.taille_dictionnaire)
+        self.taille_dictionnaire = len(self.dictionnaire)
+        self.grilles.extend(self._quantifier(d, m) for d, m in self._en_attente)
+        self._en_attente = []
+
+    def ajouter(self, chemin, image):
+        """Ajoute une image (niveaux de gris) à l'index"""
+        descripteurs, masque = descripteurs_blocs(image)
+        self.chemins.append(str(chemin))
+        self.tailles.append(image.shape[:2])
+        self._postings = None
+        if self.dictionnaire is not None:
+            self.grilles.append(self._quantifier(descripteurs, masque))
+            return
+        # Dictionnaire pas encore appris : blocs gardés en mémoire (borné)
+        self._en_attente.append((descripteurs, masque))
+        if sum(m.sum() for _, m in self._en_attente) >= self.blocs_apprentissage:
+            self._apprendre()
+
+    def indexer_dossier(self, chemin_dossier):
+        """
+        Returns:
+            int: Nombre d'images indexées
+        """
+        for fichier in sorted(Path(chemin_dossier).iterdir()):
+            if fichier.suffix.lower() in EXTENSIONS:
+                image = self.extracteur.charger_image(fichier)
+                if image is not None:
+                    self.ajouter(fichier, image)
+        self.finaliser()
+        print(f"✅ {len(self)} images indexées par régions ({self.nb_blocs()} blocs)\n")
+        return len(self)
+
+    def finaliser(self):
+        """Apprend le dictionnaire s'il manque et construit l'index inversé"""
+        if self._en_attente:
+            self._apprendre()
+        if self._postings is None and self.grilles:
+            self._construire_postings()
+
+    def _construire_postings(self):
+        codes, images, ys, xs = [], [], [], []
+        for numero, grille in enumerate(self.grilles):
+            y, x = np.nonzero(grille != self.code_plat)
+            codes.append(grille[y, x])
+            images.append(np.full(len(y), numero, dtype=np.int32))
+            ys.append(y.astype(np.int16))
+            xs.append(x.astype(np.int16))
+        codes = np.concatenate(codes)
+        ordre = np.argsort(codes, kind="stable")
+        df = np.bincount(codes, minlength=self.taille_dictionnaire)
+        self._postings = {
+            "debut": np.concatenate([[0], np.cumsum(df)]),
+            "image": np.concatenate(images)[ordre],
+            "y": np.concatenate(ys)[ordre],
+            "x": np.concatenate(xs)[ordre],
+            # idf : un mot présent partout ne discrimine rien
+            "idf": np.log((len(codes) + 1) / (df + 1)).astype(np.float32),
+        }
+
+    def nb_blocs(self):
+        return sum(int((g != self.code_plat).sum()) for g in self.grilles)
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+    def _votes(self, image, decalage):
+        """
+        Votes des blocs de la requête (découpée à partir de `decalage`)
+
+        Returns:
+            tuple: (clés (image, oy, ox) encodées en int64, poids, poids total)
+        """
+        descripteurs, masque = descripteurs_blocs(image, decalage)
+        qy, qx = np.nonzero(masque)
+        if len(qy) == 0:
+            return np.zeros(0, np.int64), np.zeros(0, np.float32), 0.0
+        codes = np.argmax(descripteurs[masque] @ self.dictionnaire.T, axis=1)
+
+        p = self._postings
+        poids_total = float(p["idf"][codes].sum())
+        # Blocs les plus discriminants d'abord, dans la limite du budget d'entrées lues
+        ordre = np.argsort(-p["idf"][codes], kind="stable")
+        longueurs = p["debut"][codes[ordre] + 1] - p["debut"][codes[ordre]]
+        garder = ordre[: max(1, np.searchsorted(np.cumsum(longueurs), self.max_entrees))]
+        codes, qy, qx = codes[garder], qy[garder], qx[garder]
+        debuts = p["debut"][codes]
+        longueurs = p["debut"][codes + 1] - debuts
+        total = int(longueurs.sum())
+        # Indices de toutes les entrées des listes concernées, sans boucle Python
+        fin_precedente = np.concatenate([[0], np.cumsum(longueurs)[:-1]])
+        indices = np.repeat(debuts - fin_precedente, longueurs) + np.arange(total)
+
+        oy = p["y"][indices].astype(np.int64) - np.repeat(qy, longueurs)
+        ox = p["x"][indices].astype(np.int64) - np.repeat(qx, longueurs)
+        cles = (p["image"][indices].astype(np.int64) << 32) | ((oy + 32768) << 16) | (ox + 32768)
+        poids = np.repeat(p["idf"][codes], longueurs)
+        return cles, poids, poids_total
+
+    def rechercher(self, image_requete, top_k=5, pas=2, affiner=True):
+        """
+        Recherche les images contenant la région `image_requete`
+
+        Args:
+            image_requete (numpy.ndarray): Région en niveaux de gris
+            top_k (int): Nombre d'images à renvoyer
+            pas (int): Pas (pixels) des décalages essayés, de 1 (64 découpages) à 8 (un seul)
+            affiner (bool): Relire les images retenues pour préciser la position
+
+        Returns:
+            list: Dicts (chemin, x, y, largeur, hauteur, score, blocs), la meilleure
+            région de chaque image ; score = part (pondérée) des blocs de la
+            requête retrouvés à la même position relative. Avec `affiner`,
+            "correlation" donne la corrélation normalisée au pixel près.
+        """
+        if not 1 <= pas <= BLOCK_SIZE:
+            raise ValueError(f"pas doit être entre 1 et {BLOCK_SIZE} : {pas}")
+        self.finaliser()
+        if self._postings is None:
+            return []
+
+        meilleurs = {}  # {image: (score, x, y, blocs)}
+        with profiler.stage("votes_regions"):
+            for dy in range(0, BLOCK_SIZE, pas):
+                for dx in range(0, BLOCK_SIZE, pas):
+                    cles, poids, total = self._votes(image_requete, (dy, dx))
+                    if not total or not len(cles):
+                        continue
+                    uniques, inverse, nombres = np.unique(
+                        cles, return_inverse=True, return_counts=True
+                    )
+                    scores = np.bincount(inverse, weights=poids) / total
+                    # Meilleures positions d'abord (plusieurs peuvent viser la même image)
+                    for i in np.argsort(-scores)[: top_k * 4]:
+                        numero = int(uniques[i] >> 32)
+                        if numero in meilleurs and meilleurs[numero][0] >= scores[i]:
+                            continue
+                        oy = int((uniques[i] >> 16) & 0xFFFF) - 32768
+                        ox = int(uniques[i] & 0xFFFF) - 32768
+                        # Bloc (oy, ox) de l'image = pixel (dy, dx) de la requête
+                        meilleurs[numero] = (
+                            float(scores[i]),
+                            ox * BLOCK_SIZE - dx,
+                            oy * BLOCK_SIZE - dy,
+                            int(nombres[i]),
+                        )
+
+        hauteur, largeur = image_requete.shape[:2]
+        resultats = [
+            {
+                "chemin": self.chemins[numero],
+                "x": x,
+                "y": y,
+                "largeur": largeur,
+                "hauteur": hauteur,
+                "score": round(score, 4),
+                "blocs": blocs,
+            }
+            for numero, (score, x, y, blocs) in meilleurs.items()
+        ]
+        resultats.sort(key=lambda r: r["score"], reverse=True)
+        if not affiner:
+            return resultats[:top_k]
+
+        # Vérification : deux fois plus de candidats, reclassés par corrélation
+        resultats = resultats[: 2 * top_k]
+        with profiler.stage("affinage_regions"):
+            for resultat in resultats:
+                self.affiner(resultat, image_requete)
+        resultats.sort(key=lambda r: (r.get("correlation", -1.0), r["score"]), reverse=True)
+        return resultats[:top_k]
+
+    def affiner(self, resultat, image_requete, marge=BLOCK_SIZE):
+        """Précise (x, y) d'un résultat par corrélation autour de la position votée"""
+        image = self.extracteur.charger_image(resultat["chemin"])
+        if image is None:
+            return resultat
+        hauteur, largeur = image_requete.shape[:2]
+        x0 = max(0, resultat["x"] - marge)
+        y0 = max(0, resultat["y"] - marge)
+        fenetre = image[y0 : resultat["y"] + hauteur + marge, x0 : resultat["x"] + largeur + marge]
+        if fenetre.shape[0] < hauteur or fenetre.shape[1] < largeur:
+            return resultat  # Région qui déborde de l'image
+        correlations = cv2.matchTemplate(fenetre, image_requete, cv2.TM_CCOEFF_NORMED)
+        _, meilleure, _, (dx, dy) = cv2.minMaxLoc(correlations)
+        resultat.update(x=x0 + dx, y=y0 + dy, correlation=round(float(meilleure), 4))
+        return resultat
+
+    # ------------------------------------------------------------------
+    # Sauvegarde
+    # ------------------------------------------------------------------
+    def save(self, path):
+        """Écrit l'index (dictionnaire + grilles de codes) dans un fichier .npz"""
+        self.finaliser()
+        formes = np.array([g.shape for g in self.grilles], dtype=np.int32).reshape(-1, 2)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                dictionnaire=self.dictionnaire,
+                formes=formes,
+                tailles=np.array(self.tailles, dtype=np.int32).reshape(-1, 2),
+                codes=np.concatenate([g.ravel() for g in self.grilles])
+                if self.grilles
+                else np.zeros(0, np.uint16),
+                chemins=np.frombuffer(json.dumps(self.chemins).encode("utf-8"), np.uint8),
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            index = cls(taille_dictionnaire=len(data["dictionnaire"]))
+            index.dictionnaire = data["dictionnaire"]
+            index.chemins = json.loads(data["chemins"].tobytes().decode("utf-8"))
+            index.tailles = [tuple(t) for t in data["tailles"]]
+            codes = data["codes"]
+            position = 0
+            for nh, nw in data["formes"]:
+                index.grilles.append(codes[position : position + nh * nw].reshape(nh, nw))
+                position += nh * nw
+        return index
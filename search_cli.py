@@ -0,0 +1,446 @@
+"""
+Module : Interface en ligne de commande des moteurs d'images
+=============================================================
+
+Utilise les quatre moteurs sans interface graphique :
+- dct     : dct_engine.py
+- tp_dct  : tp_dct_comparaison_images.py
+- tp4     : TP-4/main.py (LocalStatsEngine)
+- tppre   : TP-pre/main.py (TextureSearchEngine)
+
+Commandes :
+    python search_cli.py index dataset --engine dct --index dct.bin
+    python search_cli.py index shard_000.tar --engine dct      # archive tar/zip (dct, tp_dct)
+    python search_cli.py query image.jpg --index dct.bin -k 5
+    python search_cli.py dedupe --index dct.bin
+    python search_cli.py dedupe --index tp_dct.bin --threshold 0.9999   # pas de seuil par défaut
+    python search_cli.py --profile /tmp/profil index dataset   # + profil.json / .folded
+    python search_cli.py region-index dataset                  # recherche de recadrages
+    python search_cli.py region-query logo.png -k 5
+
+L'index (fichier binaire, lu par mmap) contient le nom du moteur, les chemins et les
+caractéristiques : `query` et `dedupe` ne recalculent rien pour la base.
+Seul le moteur choisi est importé, et tkinter / matplotlib / pywt ne le
+sont jamais (ou seulement par TP-pre, qui a besoin de pywt) : mesurer
+le démarrage avec `python -X importtime search_cli.py query ...`.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from instrumentation import profiler
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX = "image_index.bin"
+DEFAULT_REGION_INDEX = "region_index.npz"
+HEADER_SIZE = struct.Struct("<Q")
+# Vecteurs comparés à la fois par produit matriciel (dedupe cosinus)
+TAILLE_BLOC = 256
+
+
+def charger_module(nom, chemin):
+    """Importe un fichier (TP-4/main.py, TP-pre/main.py) sous un nom unique"""
+    spec = importlib.util.spec_from_file_location(nom, chemin)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ============================================================================
+# Paires de voisins (dedupe)
+# ============================================================================
+def paires_cosinus(features, seuil):
+    """
+    Paires (i, j), i < j, de similarité cosinus >= seuil
+
+    Même calcul que calculer_similarite_cosinus (vecteurs tronqués à la
+    plus petite longueur) mais par blocs de produits matriciels : les
+    vecteurs sont triés par longueur et ceux de longueur L sont comparés
+    d'un coup à tous les vecteurs au moins aussi longs, tronqués à L.
+    """
+    longueurs = np.array([len(f) for f in features])
+    ordre = np.argsort(longueurs, kind="stable")
+    debuts = np.flatnonzero(np.diff(longueurs[ordre], prepend=-1))
+
+    def normaliser(indices, longueur):
+        bloc = np.stack([np.asarray(features[i][:longueur], dtype=np.float64) for i in indices])
+        normes = np.linalg.norm(bloc, axis=1, keepdims=True)
+        # Norme nulle : similarité 0, comme le comparateur
+        normes[normes == 0] = np.inf
+        return bloc / normes
+
+    for g, debut in enumerate(debuts):
+        fin = debuts[g + 1] if g + 1 < len(debuts) else len(ordre)
+        longueur = longueurs[ordre[debut]]
+        for a in range(debut, fin, TAILLE_BLOC):
+            lignes = normaliser(ordre[a:min(a + TAILLE_BLOC, fin)], longueur)
+            for b in range(a, len(ordre), TAILLE_BLOC):
+                colonnes = normaliser(ordre[b:b + TAILLE_BLOC], longueur)
+                similarites = lignes @ colonnes.T
+                for p, q in zip(*np.nonzero(similarites >= seuil)):
+                    # Positions dans l'ordre trié : chaque paire une seule fois
+                    if b + q > a + p:
+                        i, j = ordre[a + p], ordre[b + q]
+                        yield (i, j) if i < j else (j, i)
+
+
+def paires_rayon(features, rayon):
+    """Paires (i, j), i < j, à distance euclidienne <= rayon (ArbreKD.dans_rayon)"""
+    from arbre_kd import ArbreKD
+
+    points = np.asarray(features, dtype=np.float64)
+    arbre = ArbreKD(points)
+    for i, point in enumerate(points):
+        _, ids = arbre.dans_rayon(point, rayon)
+        for j in ids[ids > i]:
+            yield i, int(j)
+
+
+# ============================================================================
+# Adaptateurs : index (chemins, caractéristiques) <-> base de chaque moteur
+# ============================================================================
+class DctEngine:
+    """dct_engine.ImageSearchEngine (similarité cosinus, plus grand = mieux)"""
+
+    higher_is_better = True
+    default_threshold = 0.98
+
+    def __init__(self):
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        import dct_engine
+
+        self.moteur = dct_engine.ImageSearchEngine()
+
+    def index(self, dossier):
+        from sources_images import est_archive
+
+        if est_archive(dossier):
+            # Membres lus dans l'archive, chemins archive!membre
+            self.moteur.indexer_source(dossier)
+        else:
+            self.moteur.indexer_dossier(dossier)
+        donnees = self.moteur.base_de_donnees.values()
+        return [d["chemin"] for d in donnees], [d["features"] for d in donnees]
+
+    def load(self, chemins, features):
+        from sources_images import separer
+
+        # Même nom qu'à l'indexation : fichier, ou localisateur archive!membre
+        self.moteur.base_de_donnees = {
+            (c if separer(c)[1] is not None else os.path.basename(c)): {"chemin": c, "features": f}
+            for c, f in zip(chemins, features)
+        }
+
+    def query(self, chemin_image, top_k):
+        image = self.moteur.extracteur.charger_image(chemin_image)
+        if image is None:
+            raise ValueError(f"Image illisible : {chemin_image}")
+        resultats = self.moteur.rechercher_images_similaires(image, top_k)
+        # tp_dct renvoie toute la base triée : on coupe à top_k
+        return [(r["chemin"], float(r["similarite"])) for r in resultats[:top_k]]
+
+    def paires(self, features, seuil):
+        return paires_cosinus(features, seuil)
+
+
+class TpDctEngine(DctEngine):
+    """tp_dct_comparaison_images.ImageSearchEngine (DCT YCbCr)"""
+
+    # Pas de seuil par défaut : sur dataset/, deux photos sans rapport
+    # (pexels-pixabay / pexels-rbrigant44) atteignent 0.9995 alors qu'une
+    # copie réduite à 80 % et recompressée descend à 0.976
+    default_threshold = None
+
+    def __init__(self):
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        import tp_dct_comparaison_images
+
+        self.moteur = tp_dct_comparaison_images.ImageSearchEngine()
+
+
+class Tp4Engine:
+    """TP-4 LocalStatsEngine (distance euclidienne, plus petit = mieux)"""
+
+    higher_is_better = False
+    default_threshold = 1.0
+
+    def __init__(self):
+        module = charger_module("tp4_main", os.path.join(ROOT, "TP-4", "main.py"))
+        self.moteur = module.LocalStatsEngine()
+
+    def index(self, dossier):
+        self.moteur.index_folder(dossier)
+        descripteurs = self.moteur.database_descriptors
+        return list(descripteurs), list(descripteurs.values())
+
+    def load(self, chemins, features):
+        self.moteur.database_descriptors = dict(zip(chemins, features))
+
+    def query(self, chemin_image, top_k):
+        return [(c, float(d)) for c, d in self.moteur.search(chemin_image, top_k)]
+
+    def paires(self, features, seuil):
+        return paires_rayon(features, seuil)
+
+
+class TpPreEngine:
+    """TP-pre TextureSearchEngine (similarité 1 / (1 + distance))"""
+
+    higher_is_better = True
+    default_threshold = 0.9
+
+    def __init__(self):
+        module = charger_module("tppre_main", os.path.join(ROOT, "TP-pre", "main.py"))
+        self.module = module
+        self.moteur = module.TextureSearchEngine(auto_load=False)
+
+    def index(self, dossier):
+        self.moteur = self.module.TextureSearchEngine(dataset_folder=dossier)
+        self.moteur.build_features_database()
+        return list(self.moteur.image_paths), list(self.moteur.features_db)
+
+    def load(self, chemins, features):
+        self.moteur.image_paths = list(chemins)
+        self.moteur.features_db = np.array(features)
+
+    def query(self, chemin_image, top_k):
+        return [(c, float(s)) for c, s in self.moteur.search(chemin_image, top_k)]
+
+    def paires(self, features, seuil):
+        # 1 / (1 + d) >= seuil  <=>  d <= 1 / seuil - 1
+        return paires_rayon(features, 1 / seuil - 1 if seuil > 0 else np.inf)
+
+
+ENGINES = {
+    "dct": DctEngine,
+    "tp_dct": TpDctEngine,
+    "tp4": Tp4Engine,
+    "tppre": TpPreEngine,
+}
+
+
+# ============================================================================
+# Fichier d'index
+# ============================================================================
+def save_index(path, engine, chemins, features):
+    """
+    Écrit l'index : [8 octets : taille de l'en-tête][en-tête JSON][float64]
+
+    Les vecteurs (de tailles éventuellement différentes) sont mis bout à
+    bout ; l'en-tête donne le moteur, les chemins et les positions.
+    """
+    features = [np.asarray(f, dtype=np.float64).ravel() for f in features]
+    offsets = np.cumsum([0] + [len(f) for f in features]).tolist()
+    header = json.dumps(
+        {"engine": engine, "paths": list(chemins), "offsets": offsets}
+    ).encode("utf-8")
+    # Les données doivent commencer sur une frontière de 8 octets
+    header += b" " * (-(HEADER_SIZE.size + len(header)) % 8)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER_SIZE.pack(len(header)))
+        f.write(header)
+        for vecteur in features:
+            f.write(vecteur.tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_index(path):
+    """
+    Lit l'index par mmap (aucune copie des vecteurs)
+
+    Returns:
+        tuple: (nom du moteur, chemins, liste des vecteurs)
+    """
+    with open(path, "rb") as f:
+        (taille,) = HEADER_SIZE.unpack(f.read(HEADER_SIZE.size))
+        header = json.loads(f.read(taille))
+    data = np.memmap(path, dtype=np.float64, mode="r", offset=HEADER_SIZE.size + taille)
+    offsets = header["offsets"]
+    features = [data[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+    return header["engine"], header["paths"], features
+
+
+# ============================================================================
+# Commandes
+# ============================================================================
+def cmd_index(args):
+    debut = time.perf_counter()
+    moteur = ENGINES[args.engine]()
+    chemins, features = moteur.index(args.folder)
+    save_index(args.index, args.engine, chemins, features)
+    print(
+        f"✅ {len(chemins)} images indexées avec {args.engine} en"
+        f" {time.perf_counter() - debut:.2f}s -> {args.index}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _ouvrir(args):
+    nom, chemins, features = load_index(args.index)
+    moteur = ENGINES[nom]()
+    moteur.load(chemins, features)
+    return nom, moteur, chemins, features
+
+
+def cmd_query(args):
+    nom, moteur, _, _ = _ouvrir(args)
+    resultats = moteur.query(args.image, args.top_k)
+    if args.json:
+        print(json.dumps({"engine": nom, "results": resultats}))
+    else:
+        for rang, (chemin, score) in enumerate(resultats, 1):
+            print(f"{rang:>3}. {score:10.4f}  {chemin}")
+    return 0
+
+
+def cmd_dedupe(args):
+    """Groupes d'images quasi identiques selon le score du moteur"""
+    nom, moteur, chemins, features = _ouvrir(args)
+    seuil = args.threshold if args.threshold is not None else moteur.default_threshold
+    if seuil is None:
+        print(f"❌ Le moteur {nom} n'a pas de seuil par défaut : préciser --threshold", file=sys.stderr)
+        return 2
+
+    parent = list(range(len(chemins)))
+
+    def racine(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in moteur.paires(features, seuil):
+        parent[racine(j)] = racine(i)
+
+    groupes = {}
+    for i, chemin in enumerate(chemins):
+        groupes.setdefault(racine(i), []).append(chemin)
+    doublons = [g for g in groupes.values() if len(g) > 1]
+
+    if args.json:
+        print(json.dumps({"engine": nom, "threshold": seuil, "groups": doublons}))
+    else:
+        for groupe in doublons:
+            print("\n".join(["🔁 " + groupe[0]] + ["   " + c for c in groupe[1:]]))
+        print(f"{len(doublons)} groupe(s) de doublons (seuil {seuil})", file=sys.stderr)
+    return 0
+
+
+def _region_index():
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import region_search
+
+    return region_search.RegionIndex
+
+
+def cmd_region_index(args):
+    debut = time.perf_counter()
+    index = _region_index()(taille_dictionnaire=args.codebook)
+    index.indexer_dossier(args.folder)
+    index.save(args.index)
+    print(
+        f"✅ {len(index)} images ({index.nb_blocs()} blocs) en"
+        f" {time.perf_counter() - debut:.2f}s -> {args.index}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def cmd_region_query(args):
+    import cv2
+
+    image = cv2.imread(args.image, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise SystemExit(f"Image illisible : {args.image}")
+    index = _region_index().load(args.index)
+    resultats = index.rechercher(image, args.top_k, pas=args.step)
+    if args.json:
+        print(json.dumps({"results": resultats}))
+    else:
+        for rang, r in enumerate(resultats, 1):
+            print(
+                f"{rang:>3}. {r['score']:7.4f} {r.get('correlation', float('nan')):7.4f}"
+                f"  {r['chemin']} @ ({r['x']}, {r['y']}) {r['largeur']}x{r['hauteur']}"
+            )
+    return 0
+
+
+def pas_decalage(valeur):
+    """Type argparse de --step : entier de 1 à 8 (taille d'un bloc DCT)"""
+    try:
+        pas = int(valeur)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"entier attendu : {valeur!r}") from None
+    if not 1 <= pas <= 8:
+        raise argparse.ArgumentTypeError(f"doit être entre 1 et 8 : {pas}")
+    return pas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Moteurs de recherche d'images (sans interface)")
+    parser.add_argument(
+        "--profile", metavar="PREFIX",
+        help="Mesurer chaque étape et écrire PREFIX.json et PREFIX.folded",
+    )
+    sous = parser.add_subparsers(dest="command", required=True)
+
+    p = sous.add_parser("index", help="Indexer un dossier d'images (ou une archive tar/zip)")
+    p.add_argument("folder")
+    p.add_argument("--engine", choices=sorted(ENGINES), default="dct")
+    p.add_argument("--index", default=DEFAULT_INDEX)
+    p.set_defaults(func=cmd_index)
+
+    p = sous.add_parser("query", help="Rechercher les images les plus proches")
+    p.add_argument("image")
+    p.add_argument("--index", default=DEFAULT_INDEX)
+    p.add_argument("-k", "--top-k", type=int, default=5)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_query)
+
+    p = sous.add_parser("dedupe", help="Trouver les images en double dans l'index")
+    p.add_argument("--index", default=DEFAULT_INDEX)
+    p.add_argument("--threshold", type=float, default=None)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_dedupe)
+
+    p = sous.add_parser("region-index", help="Indexer les blocs pour chercher des recadrages")
+    p.add_argument("folder")
+    p.add_argument("--index", default=DEFAULT_REGION_INDEX)
+    p.add_argument("--codebook", type=int, default=1024, help="Taille du dictionnaire")
+    p.set_defaults(func=cmd_region_index)
+
+    p = sous.add_parser("region-query", help="Trouver les images contenant une région")
+    p.add_argument("image")
+    p.add_argument("--index", default=DEFAULT_REGION_INDEX)
+    p.add_argument("-k", "--top-k", type=int, default=5)
+    p.add_argument("--step", type=pas_decalage, default=2, help="Pas des décalages (1 à 8 pixels)")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_region_query)
+
+    args = parser.parse_args(argv)
+    if args.profile:
+        # Avant la création des moteurs : instrument() n'agit qu'à ce moment
+        profiler.enable()
+    try:
+        return args.func(args)
+    finally:
+        if args.profile:
+            profiler.dump(args.profile)
+            print(f"📊 Profil : {args.profile}.json, {args.profile}.folded", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
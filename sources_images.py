@@ -0,0 +1,235 @@
+"""
+Module : Sources d'images (dossiers, archives tar/zip, octets en mémoire)
+==========================================================================
+
+Les moteurs DCT (dct_engine, tp_dct_comparaison_images) lisaient les
+images uniquement depuis des fichiers (cv2.imread). Ce module leur
+permet d'indexer directement :
+- les membres d'une archive tar (éventuellement compressée : .tar.gz,
+  .tar.xz...) ou zip, lus à la suite sans extraction sur le disque
+  (tar en flux : un seul passage, pas de retour en arrière)
+- des octets déjà en mémoire (bytes, bytearray, memoryview, mmap)
+
+Le décodage passe par cv2.imdecode sur une vue np.frombuffer des octets
+(aucune copie avant le décodeur).
+
+Une image d'archive est désignée dans l'index par un localisateur
+`archive!membre` (ex. `shards/000012.tar!photos/chat.jpg`) : charger_image
+l'accepte comme un chemin, et relit le membre dans l'archive (la liste
+des membres d'une archive est gardée pour les lectures suivantes).
+
+Le manifeste écrit par TP1-scraping/sites_test/normalize_images.py
+(manifest.json) est lu par lire_manifeste : les moteurs s'en servent
+pour ne pas décoder deux fois une image présente en plusieurs copies
+(même empreinte SHA-1).
+
+Usage :
+    for localisateur, nom, octets in parcourir("shards/000012.tar"):
+        image = decoder_octets(octets, cv2.IMREAD_GRAYSCALE)
+"""
+
+import functools
+import json
+import os
+import tarfile
+import threading
+import zipfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+EXTENSIONS_IMAGES = (".jpg", ".jpeg", ".png", ".bmp")
+EXTENSIONS_ARCHIVES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".zip")
+SEPARATEUR = "!"  # archive!membre
+NOM_MANIFESTE = "manifest.json"  # normalize_images.MANIFEST_NAME
+
+
+def est_archive(chemin):
+    """True si le chemin désigne une archive tar ou zip (d'après son extension)"""
+    return str(chemin).lower().endswith(EXTENSIONS_ARCHIVES)
+
+
+def est_image(nom, extensions=EXTENSIONS_IMAGES):
+    return str(nom).lower().endswith(tuple(extensions))
+
+
+def localisateur(archive, membre):
+    """Localisateur `archive!membre` d'une image d'archive"""
+    return f"{archive}{SEPARATEUR}{membre}"
+
+
+def separer(chemin):
+    """
+    Sépare un localisateur en (archive, membre)
+
+    Returns:
+        tuple: (archive, membre), ou (chemin, None) pour un fichier ordinaire
+    """
+    chemin = str(chemin)
+    position = chemin.find(SEPARATEUR)
+    while position >= 0:
+        if est_archive(chemin[:position]):
+            return chemin[:position], chemin[position + 1 :]
+        position = chemin.find(SEPARATEUR, position + 1)
+    return chemin, None
+
+
+def decoder_octets(donnees, mode=cv2.IMREAD_COLOR):
+    """
+    Décode une image depuis des octets en mémoire
+
+    Args:
+        donnees: bytes, bytearray, memoryview ou mmap (fichier image complet)
+        mode (int): cv2.IMREAD_COLOR ou cv2.IMREAD_GRAYSCALE
+
+    Returns:
+        numpy.ndarray: Image, ou None si les octets ne sont pas une image
+    """
+    vue = np.frombuffer(donnees, dtype=np.uint8)  # Vue, sans copie
+    if vue.size == 0:
+        return None
+    return cv2.imdecode(vue, mode)
+
+
+class _Archive:
+    """Archive ouverte en lecture, avec la liste de ses membres"""
+
+    def __init__(self, chemin):
+        self.verrou = threading.Lock()  # Une seule lecture à la fois (position du fichier)
+        if chemin.lower().endswith(".zip"):
+            self.zip = zipfile.ZipFile(chemin)
+            self.tar = None
+        else:
+            self.zip = None
+            self.tar = tarfile.open(chemin)
+            self.membres = {_nom_membre(m.name): m for m in self.tar.getmembers() if m.isfile()}
+
+    def lire(self, membre):
+        with self.verrou:
+            if self.zip is not None:
+                return self.zip.read(membre)
+            return self.tar.extractfile(self.membres[membre]).read()
+
+
+@functools.lru_cache(maxsize=8)
+def _ouvrir_archive(chemin, date_modification):
+    # date_modification : archive rouverte si elle a été réécrite
+    return _Archive(chemin)
+
+
+def _nom_membre(nom):
+    return nom[2:] if nom.startswith("./") else nom
+
+
+def lire_octets(chemin):
+    """
+    Octets d'un fichier, ou d'un membre d'archive (localisateur archive!membre)
+
+    Raises:
+        OSError: Fichier ou archive illisible
+        KeyError: Membre absent de l'archive
+    """
+    archive, membre = separer(chemin)
+    if membre is None:
+        return Path(archive).read_bytes()
+    return _ouvrir_archive(archive, os.path.getmtime(archive)).lire(membre)
+
+
+def decoder(source, mode=cv2.IMREAD_COLOR):
+    """
+    Charge une image depuis un chemin, un localisateur archive!membre ou
+    des octets en mémoire
+
+    Returns:
+        numpy.ndarray: Image, ou None si elle n'a pas pu être lue ou décodée
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        return decoder_octets(source, mode)  # Octets en mémoire
+    if separer(source)[1] is None:
+        return cv2.imread(str(source), mode)
+    try:
+        return decoder_octets(lire_octets(source), mode)
+    except (OSError, KeyError, tarfile.TarError, zipfile.BadZipFile):
+        return None
+
+
+def lire_manifeste(dossier):
+    """
+    Entrées encore valides du manifeste de normalisation d'un dossier
+
+    Une entrée n'est gardée que si le fichier a toujours la taille et la
+    date de modification enregistrées (sinon l'empreinte est périmée).
+
+    Returns:
+        dict: {chemin relatif ("/"): entrée (width, height, mode, bytes,
+        mtime_ns, sha1)} ; vide sans manifeste lisible
+    """
+    try:
+        with open(os.path.join(dossier, NOM_MANIFESTE), encoding="utf-8") as f:
+            images = json.load(f)["images"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+    valides = {}
+    for relatif, entree in images.items():
+        try:
+            stat = os.stat(os.path.join(dossier, relatif))
+            if entree["bytes"] == stat.st_size and entree["mtime_ns"] == stat.st_mtime_ns:
+                valides[relatif] = entree
+        except (OSError, KeyError, TypeError):
+            continue
+    return valides
+
+
+def decrire(source):
+    """Texte d'une source pour les messages (taille pour des octets en mémoire)"""
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+    return f"<{len(source)} octets en mémoire>"
+
+
+def parcourir(source, extensions=EXTENSIONS_IMAGES):
+    """
+    Images d'une source, lues une à une (sans les décoder)
+
+    Args:
+        source: Dossier, archive tar/zip (chemin), flux tar ouvert en
+            binaire (ex. sys.stdin.buffer), dictionnaire {nom: octets}, ou
+            liste de ces sources (parcourues à la suite, ex. des shards)
+        extensions (tuple): Extensions des images retenues
+
+    Yields:
+        tuple: (localisateur, nom, octets) ; localisateur = chemin du
+        fichier, `archive!membre`, ou None pour des octets en mémoire ;
+        nom = nom du fichier, ou chemin du membre dans l'archive
+    """
+    if isinstance(source, dict):
+        for nom, octets in source.items():
+            yield None, nom, octets
+    elif isinstance(source, (list, tuple)):
+        for element in source:
+            yield from parcourir(element, extensions)
+    elif hasattr(source, "read"):
+        yield from _parcourir_tar(tarfile.open(fileobj=source, mode="r|*"), None, extensions)
+    elif str(source).lower().endswith(".zip"):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and est_image(info.filename, extensions):
+                    yield localisateur(source, info.filename), info.filename, archive.read(info)
+    elif est_archive(source):
+        # Mode flux "r|*" : lecture séquentielle, compression détectée
+        with tarfile.open(source, mode="r|*") as archive:
+            yield from _parcourir_tar(archive, source, extensions)
+    else:
+        for fichier in Path(source).iterdir():
+            if fichier.is_file() and est_image(fichier.name, extensions):
+                yield str(fichier), fichier.name, fichier.read_bytes()
+
+
+def _parcourir_tar(archive, chemin, extensions):
+    for membre in archive:
+        nom = _nom_membre(membre.name)
+        if membre.isfile() and est_image(nom, extensions):
+            octets = archive.extractfile(membre).read()
+            yield (localisateur(chemin, nom) if chemin is not None else None), nom, octets
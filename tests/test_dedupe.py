@@ -0,0 +1,54 @@
+"""
+dedupe : paires par blocs / par rayon == comparaison de toutes les paires
+"""
+
+import itertools
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import dct_engine  # noqa: E402
+import search_cli  # noqa: E402
+
+
+@pytest.fixture
+def vecteurs():
+    """Vecteurs proches d'une même base, de longueurs différentes"""
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=40)
+    features = [base[: rng.integers(20, 41)] for _ in range(50)]
+    features = [f + rng.normal(scale=0.3, size=len(f)) for f in features]
+    features[3] = np.zeros(30)
+    return features
+
+
+@pytest.mark.parametrize("seuil", [0.8, 0.9, 0.95])
+def test_paires_cosinus(vecteurs, seuil, monkeypatch):
+    # Blocs plus petits que la base : plusieurs produits par longueur
+    monkeypatch.setattr(search_cli, "TAILLE_BLOC", 7)
+    similarite = dct_engine.ImageSearchEngine().comparateur.calculer_similarite_cosinus
+    attendues = {
+        (i, j)
+        for i, j in itertools.combinations(range(len(vecteurs)), 2)
+        if similarite(vecteurs[i], vecteurs[j]) >= seuil
+    }
+    trouvees = {(int(i), int(j)) for i, j in search_cli.paires_cosinus(vecteurs, seuil)}
+    assert attendues and trouvees == attendues
+
+
+@pytest.mark.parametrize("rayon", [0.5, 1.0, 2.0])
+def test_paires_rayon(rayon):
+    points = np.random.default_rng(1).normal(size=(200, 4))
+    attendues = {
+        (i, j)
+        for i, j in itertools.combinations(range(len(points)), 2)
+        if np.linalg.norm(points[i] - points[j]) <= rayon
+    }
+    trouvees = set(search_cli.paires_rayon(points, rayon))
+    assert attendues and trouvees == attendues
@@ -0,0 +1,61 @@
+"""
+indexer_source : images de plusieurs archives ayant un membre de même nom
+"""
+
+import io
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import dct_engine  # noqa: E402
+import tp_dct_comparaison_images  # noqa: E402
+
+
+def image_jpeg(graine):
+    rng = np.random.default_rng(graine)
+    image = rng.integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+@pytest.fixture
+def archives(tmp_path):
+    """a.tar et b.zip contiennent chacune un img_0001.jpg différent"""
+    tar_path = tmp_path / "a.tar"
+    with tarfile.open(tar_path, "w") as archive:
+        donnees = image_jpeg(1)
+        info = tarfile.TarInfo("img_0001.jpg")
+        info.size = len(donnees)
+        archive.addfile(info, io.BytesIO(donnees))
+    zip_path = tmp_path / "b.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("img_0001.jpg", image_jpeg(2))
+    return str(tar_path), str(zip_path)
+
+
+@pytest.mark.parametrize("module", [dct_engine, tp_dct_comparaison_images])
+def test_membres_de_meme_nom(module, archives):
+    tar_path, zip_path = archives
+    moteur = module.ImageSearchEngine()
+
+    # Liste de shards, puis une archive après l'autre
+    assert moteur.indexer_source([tar_path, zip_path]) == 2
+    attendus = {f"{tar_path}!img_0001.jpg", f"{zip_path}!img_0001.jpg"}
+    assert set(moteur.base_de_donnees) == attendus
+
+    moteur.indexer_source(tar_path)
+    moteur.indexer_source(zip_path, reinitialiser=False)
+    assert set(moteur.base_de_donnees) == attendus
+    for nom, donnees in moteur.base_de_donnees.items():
+        assert donnees["chemin"] == nom
+
+    features = [d["features"] for d in moteur.base_de_donnees.values()]
+    assert not np.array_equal(*features)
@@ -1,10 +1,22 @@
 import numpy as np
 import cv2
-from scipy.fftpack import dct
 from pathlib import Path
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk
+
+from dct_symetries import TRANSFORMATIONS, variantes_diedrales
+from instrumentation import profiler
+from recherche_progressive import IndexProgressif
+from sources_images import decoder, lire_manifeste, parcourir
+
+# tkinter et PIL ne sont importés qu'à la création de l'interface
+# (voir importer_interface) : le moteur reste utilisable sans affichage
+tk = ttk = filedialog = messagebox = Image = ImageTk = None
+
+
+def importer_interface():
+    global tk, ttk, filedialog, messagebox, Image, ImageTk
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+    from PIL import Image, ImageTk
 
 #  Lecture image BGR
 #  Conversion BGR → RGB
@@ -94,15 +106,32 @@ class ImageFeatureExtractor:
             ]
         )
 
+        # Sans effet si le profilage est désactivé (voir instrumentation.py)
+        profiler.instrument(
+            self,
+            charger_image="charger_image",
+            extraire_caracteristiques="extraction",
+            appliquer_dct_2d="dct",
+            parcours_zigzag="zigzag",
+            quantifier_coefficients="quantification",
+        )
+
     def charger_image(self, chemin_image):
-        image = cv2.imread(str(chemin_image), cv2.IMREAD_COLOR)
-        if image is not None:
+        # Chemin, localisateur archive!membre ou octets en mémoire (voir sources_images.py)
+        image = decoder(chemin_image, cv2.IMREAD_COLOR)
+        if image is None:
+            profiler.count("echecs_decodage")
+            return None
+        profiler.count("images_decodees")
+        profiler.count("octets_decodes", image.nbytes)
+        with profiler.stage("bgr_vers_rgb"):
             image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        return image
+        return profiler.track_array("image", image)
 
     def appliquer_dct_2d(self, bloc):
-        # applique la DCT 2D sur un bloc 8x8
-        return dct(dct(bloc.T, norm="ortho").T, norm="ortho")
+        # applique la DCT 2D sur un bloc 8x8 (DCT-II orthonormée, comme
+        # scipy.fftpack.dct(..., norm="ortho") sans le coût d'import de scipy)
+        return cv2.dct(bloc)
 
     def parcours_zigzag(self, bloc_dct):
         """
@@ -135,14 +164,17 @@ class ImageFeatureExtractor:
         new_w = (w // 8) * 8
 
         if new_h != h or new_w != w:
-            image_resized = cv2.resize(image, (new_w, new_h))
+            with profiler.stage("redimensionnement"):
+                image_resized = cv2.resize(image, (new_w, new_h))
         else:
             image_resized = image
 
         """  conversion RGB → YCbCr"""
-        image_ycbcr = cv2.cvtColor(image_resized, cv2.COLOR_RGB2YCrCb).astype(
-            np.float32
-        )
+        with profiler.stage("rgb_vers_ycbcr"):
+            image_ycbcr = cv2.cvtColor(image_resized, cv2.COLOR_RGB2YCrCb).astype(
+                np.float32
+            )
+        profiler.track_array("image_ycbcr", image_ycbcr)
 
         """  séparation des canaux Y, Cb, Cr"""
         canal_Y = image_ycbcr[:, :, 0]
@@ -204,7 +236,45 @@ class ImageFeatureExtractor:
         descripteur_final = np.concatenate(
             [descripteur_Y, descripteur_Cb, descripteur_Cr]
         )
-        return descripteur_final
+        return profiler.track_array("descripteur", descripteur_final)
+
+    def extraire_variantes(self, image, nb_coefficients=8):
+        """
+        descripteurs de l'image et de ses 7 symétries (miroirs, rotations,
+        transpositions) en une seule extraction, voir dct_symetries.py
+        """
+        h, w, c = image.shape
+        new_h = (h // 8) * 8
+        new_w = (w // 8) * 8
+        if new_h != h or new_w != w:
+            image = cv2.resize(image, (new_w, new_h))
+        image_ycbcr = cv2.cvtColor(image, cv2.COLOR_RGB2YCrCb).astype(np.float32)
+
+        # Blocs DCT complets de chaque canal : (canal, lignes, colonnes, 8, 8)
+        blocs = np.array(
+            [
+                [
+                    [self.appliquer_dct_2d(canal[i : i + 8, j : j + 8]) for j in range(0, new_w, 8)]
+                    for i in range(0, new_h, 8)
+                ]
+                for canal in cv2.split(image_ycbcr)
+            ]
+        ).reshape(3, new_h // 8, new_w // 8, 8, 8)
+
+        # Indices zigzag dans un bloc aplati (8 * ligne + colonne)
+        zigzag = (self.zigzag_indices[:, 0] * 8 + self.zigzag_indices[:, 1])[:nb_coefficients]
+
+        variantes = []
+        for canaux in zip(*(variantes_diedrales(b) for b in blocs)):
+            parties = []
+            for variante in canaux:
+                # Même quantification que quantifier_coefficients, pour tous les blocs
+                coeffs = variante.reshape(-1, 64)[:, zigzag]
+                normes = np.linalg.norm(coeffs, axis=1, keepdims=True)
+                coeffs = np.where(normes > 1e-10, coeffs / np.maximum(normes, 1e-10), coeffs)
+                parties.append(coeffs.ravel())
+            variantes.append(np.concatenate(parties))
+        return np.array(variantes, dtype=np.float32)
 
 
 class ImageComparator:
@@ -237,6 +307,17 @@ class ImageComparator:
         similarite = dot_product / norm_product
         return similarite
 
+    def calculer_similarites_variantes(self, variantes, features):
+        """
+        similarité cosinus de chaque variante (ligne) avec un vecteur
+        """
+        min_len = min(variantes.shape[1], len(features))
+        v = variantes[:, :min_len]
+        f = features[:min_len]
+
+        normes = np.linalg.norm(v, axis=1) * np.linalg.norm(f)
+        return np.divide(v @ f, normes, out=np.zeros(len(v)), where=normes >= 1e-10)
+
 
 class ImageSearchEngine:
 
@@ -244,6 +325,12 @@ class ImageSearchEngine:
         self.extracteur = ImageFeatureExtractor(block_size=8)
         self.comparateur = ImageComparator()
         self.base_de_donnees = {}  # Dictionnaire pour stocker les images
+        self._progressif = None  # Index de la recherche progressive, construit à la demande
+        profiler.instrument(
+            self,
+            indexer_dossier="indexation",
+            rechercher_images_similaires="recherche",
+        )
 
     def indexer_dossier(self, chemin_dossier):
         print("Indexation des images en cours...")
@@ -255,13 +342,26 @@ class ImageSearchEngine:
             ".bmp",
         }  # Set plus rapide que list
         self.base_de_donnees.clear()
+        self._progressif = None
 
         fichiers = list(Path(chemin_dossier).iterdir())
         total = len([f for f in fichiers if f.suffix.lower() in extensions_images])
+        # Manifeste de normalisation : les copies d'une même image (même
+        # SHA-1) reprennent les caractéristiques de la première, sans décodage
+        manifeste = lire_manifeste(chemin_dossier)
+        par_empreinte = {}  # {sha1: nom de la première image indexée}
 
         for idx, fichier in enumerate(fichiers, 1):
             if fichier.suffix.lower() in extensions_images:
                 try:
+                    empreinte = manifeste.get(fichier.name, {}).get("sha1")
+                    if empreinte in par_empreinte:
+                        original = self.base_de_donnees[par_empreinte[empreinte]]
+                        self.base_de_donnees[fichier.name] = {**original, "chemin": str(fichier)}
+                        profiler.count("images_indexees")
+                        profiler.count("doublons_manifeste")
+                        continue
+
                     # Charger l'image
                     image = self.extracteur.charger_image(fichier)
                     if image is None:
@@ -275,6 +375,9 @@ class ImageSearchEngine:
                         "chemin": str(fichier),
                         "features": features,
                     }
+                    if empreinte is not None:
+                        par_empreinte[empreinte] = fichier.name
+                    profiler.count("images_indexees")
 
                     # Afficher la progression
                     if idx % 5 == 0 or idx == total:
@@ -283,14 +386,67 @@ class ImageSearchEngine:
                         )
 
                 except Exception as e:
+                    profiler.count("echecs_indexation")
                     print(f"Erreur avec {fichier.name}: {e}")
 
         print(f"\n✅ {len(self.base_de_donnees)} images indexées avec succès\n")
         return len(self.base_de_donnees)
 
-    def rechercher_images_similaires(self, image_requete, top_k=5):
+    def indexer_source(self, source, reinitialiser=True):
+        """
+        Indexe une archive tar/zip (ou une liste d'archives), des octets en
+        mémoire ({nom: octets}) ou un dossier, sans fichier temporaire :
+        "chemin" = localisateur archive!membre (None pour des octets) ;
+        une image d'archive est aussi nommée par ce localisateur (deux
+        archives peuvent contenir un membre de même nom)
+        reinitialiser=False : ajouter à la base (une archive après l'autre)
+        """
+        print("Indexation de la source en cours...")
+        if reinitialiser:
+            self.base_de_donnees.clear()
+        self._progressif = None
+
+        nb_images = 0
+        for chemin, nom, octets in parcourir(source):
+            try:
+                image = self.extracteur.charger_image(octets)
+                if image is None:
+                    print(f"Erreur avec {nom}: image illisible")
+                    continue
+
+                self.base_de_donnees[chemin or nom] = {
+                    "chemin": chemin,
+                    "features": self.extracteur.extraire_caracteristiques(image),
+                }
+                nb_images += 1
+                profiler.count("images_indexees")
+
+                if nb_images % 100 == 0:
+                    print(f"Progression: {nb_images} images indexées")
+
+            except Exception as e:
+                profiler.count("echecs_indexation")
+                print(f"Erreur avec {nom}: {e}")
+
+        print(f"\n✅ {nb_images} images indexées ({len(self.base_de_donnees)} dans la base)\n")
+        return nb_images
+
+    def rechercher_images_similaires(self, image_requete, top_k=5, invariant=False, progressif=False):
+        """
+        invariant : comparer aussi les 8 symétries de la requête (miroirs,
+        rotations de 90°, transpositions) et garder la meilleure
+        progressif : seulement les top_k meilleures, exactes, en abandonnant
+        les images qui ne peuvent plus y entrer (voir recherche_progressive.py)
+        """
         if len(self.base_de_donnees) == 0:
             return []
+        if progressif and invariant:
+            raise ValueError("progressif ne se combine pas avec invariant")
+
+        if invariant:
+            return self._rechercher_invariant(image_requete)
+        if progressif:
+            return self._rechercher_progressif(image_requete, top_k)
 
         # Extraire les caractéristiques de l'image de requête
         features_requete = self.extracteur.extraire_caracteristiques(image_requete)
@@ -300,24 +456,77 @@ class ImageSearchEngine:
         resultats = []
 
         # Comparer avec toutes les images de la base
-        for nom_image, donnees in self.base_de_donnees.items():
-            features_db = donnees["features"]
+        with profiler.stage("score"):
+            for nom_image, donnees in self.base_de_donnees.items():
+                features_db = donnees["features"]
 
-            # Calculer la similarité (plus important que la distance)
-            similarite = self.comparateur.calculer_similarite_cosinus(
-                features_requete, features_db
-            )
+                # Calculer la similarité (plus important que la distance)
+                similarite = self.comparateur.calculer_similarite_cosinus(
+                    features_requete, features_db
+                )
 
-            resultats.append(
-                {
-                    "nom": nom_image,
-                    "chemin": donnees["chemin"],
-                    "similarite": similarite,
-                }
-            )
+                resultats.append(
+                    {
+                        "nom": nom_image,
+                        "chemin": donnees["chemin"],
+                        "similarite": similarite,
+                    }
+                )
+        profiler.count("comparaisons", nb_images)
 
         # Trier par similarité (du plus grand au plus petit) - plus rapide avec key
-        resultats.sort(key=lambda x: x["similarite"], reverse=True)
+        with profiler.stage("tri"):
+            resultats.sort(key=lambda x: x["similarite"], reverse=True)
+
+        return resultats
+
+    def _rechercher_progressif(self, image_requete, top_k):
+        if self._progressif is None or len(self._progressif) != len(self.base_de_donnees):
+            self._progressif = IndexProgressif(
+                list(self.base_de_donnees),
+                [d["features"] for d in self.base_de_donnees.values()],
+                nb_coefficients=8,  # Coefficients quantifiés par bloc et par canal
+            )
+        features_requete = self.extracteur.extraire_caracteristiques(image_requete)
+
+        with profiler.stage("score"):
+            meilleurs = self._progressif.rechercher(features_requete, top_k)
+        profiler.count("comparaisons", len(self._progressif))
+        profiler.count("valeurs_lues", self._progressif.stats["valeurs_lues"])
+
+        return [
+            {
+                "nom": nom_image,
+                "chemin": self.base_de_donnees[nom_image]["chemin"],
+                "similarite": similarite,
+            }
+            for nom_image, similarite in meilleurs
+        ]
+
+    def _rechercher_invariant(self, image_requete):
+        # Une extraction, 8 descripteurs (un par symétrie)
+        variantes = self.extracteur.extraire_variantes(image_requete)
+
+        resultats = []
+        with profiler.stage("score"):
+            for nom_image, donnees in self.base_de_donnees.items():
+                similarites = self.comparateur.calculer_similarites_variantes(
+                    variantes, donnees["features"]
+                )
+                meilleure = int(np.argmax(similarites))
+
+                resultats.append(
+                    {
+                        "nom": nom_image,
+                        "chemin": donnees["chemin"],
+                        "similarite": similarites[meilleure],
+                        "transformation": TRANSFORMATIONS[meilleure],
+                    }
+                )
+        profiler.count("comparaisons", len(resultats) * len(variantes))
+
+        with profiler.stage("tri"):
+            resultats.sort(key=lambda x: x["similarite"], reverse=True)
 
         return resultats
 
@@ -325,6 +534,7 @@ class ImageSearchEngine:
 class SearchEngineGUI:
 
     def __init__(self, root):
+        importer_interface()
         self.root = root
         self.root.title("Moteur de Recherche d'Images - DCT ")
         self.root.geometry("1000x700")
@@ -505,7 +715,7 @@ class SearchEngineGUI:
         for i, res in enumerate(resultats):
             try:
                 # Charger en couleur
-                img = cv2.imread(res["chemin"], cv2.IMREAD_COLOR)
+                img = decoder(res["chemin"], cv2.IMREAD_COLOR)  # Fichier ou archive!membre
                 img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
                 img_pil = Image.fromarray(img)
                 # Augmentation de la taille des résultats (200x200 au lieu de 150x150)
@@ -532,6 +742,7 @@ class SearchEngineGUI:
 
 
 def main():
+    importer_interface()
     root = tk.Tk()
     app = SearchEngineGUI(root)
     root.mainloop()